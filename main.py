@@ -1,7 +1,8 @@
 import argparse
+import sqlite3
 import sys
 
-from modules.db import init_db, export_db, import_db
+from modules.db import init_db, export_db, import_db, connection_stats
 from modules import inventory, stock
 
 VERSION = "0.1"
@@ -28,8 +29,67 @@ def remove_command(args):
 
 
 def export_command(args):
-    export_db(args.file)
-    print(f"Datenbank nach {args.file} exportiert")
+    if args.format is None:
+        target = args.file or "inventory_backup.db"
+        export_db(target)
+        print(f"Datenbank nach {target} exportiert")
+        return
+    from modules import exporter
+    target = args.file or f"{args.table}.{args.format}"
+    try:
+        result = exporter.export(target, args.format, args.table)
+    except (OSError, ValueError) as exc:
+        print(f"Fehler beim Export: {exc}", file=sys.stderr)
+        return
+    if target != "-":
+        print(f"{result['rows']} Zeilen ({args.table}) nach {target} exportiert")
+
+
+def backup_command(args):
+    """Online-Sicherung beider Datenbanken mit Fortschrittsanzeige."""
+    from modules import backup
+
+    def progress(schema, remaining, total):
+        done = total - remaining
+        print(f"\r{schema}: {done}/{total} Seiten", end="", file=sys.stderr, flush=True)
+        if remaining == 0:
+            print(file=sys.stderr)
+
+    try:
+        if args.incremental:
+            result = backup.backup_incremental(
+                args.dir, compression=args.compression, pages=args.pages, progress=progress
+            )
+        else:
+            files = backup.backup(args.file, pages=args.pages, progress=progress)
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"Fehler bei der Sicherung: {exc}")
+        return
+    if args.incremental:
+        print(
+            f"Sicherung {result['timestamp']} erstellt: {result['new_pages']} von "
+            f"{result['pages']} Seiten neu, {result['bytes_written']} Bytes geschrieben"
+        )
+        return
+    print("Sicherung erstellt: " + ", ".join(str(path) for path in files.values()))
+
+
+def restore_command(args):
+    """Inkrementelle Sicherung zurückspielen."""
+    from modules import backup
+    if args.list:
+        for name in backup.list_manifests(args.dir):
+            print(name)
+        return
+    try:
+        name = backup.restore_incremental(args.dir, at=args.at, target=args.file)
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"Fehler bei der Wiederherstellung: {exc}")
+        return
+    if args.file:
+        print(f"Sicherung {name} nach {args.file} wiederhergestellt")
+    else:
+        print(f"Sicherung {name} wiederhergestellt")
 
 
 def import_command(args):
@@ -40,26 +100,83 @@ def import_command(args):
         print(f"Fehler beim Import: {exc}")
 
 
+def merge_command(args):
+    """Fremde Inventardatenbank mit der eigenen zusammenführen."""
+    from modules import merge
+    try:
+        result = merge.merge_database(args.file, args.stock_file)
+    except (ValueError, sqlite3.Error) as exc:
+        print(f"Fehler beim Zusammenführen: {exc}")
+        return
+    print(
+        f"{result['items']} Artikel übernommen ({result['remapped']} mit neuer ID), "
+        f"{result['categories']} neue Kategorien, {result['movements']} Bestandsbewegungen"
+    )
+
+
+def import_items_command(args):
+    """Artikel aus CSV/JSONL importieren."""
+    from modules import importer
+    try:
+        result = importer.import_items(
+            importer.iter_records(args.file, args.format),
+            batch_size=args.batch_size,
+        )
+    except (OSError, ValueError) as exc:
+        print(f"Fehler beim Import: {exc}")
+        return
+    print(
+        f"{result['imported']} Artikel importiert, "
+        f"{result['movements']} Bestandsbewegungen angelegt"
+    )
+    if result["error_count"]:
+        print(f"{result['error_count']} Zeilen übersprungen:")
+        for line_no, message in result["errors"]:
+            print(f"  Zeile {line_no}: {message}")
+        if result["error_count"] > len(result["errors"]):
+            print(f"  ... (+{result['error_count'] - len(result['errors'])} weitere)")
+
+
 def tui_command(args: argparse.Namespace) -> None:
     """Start TUI."""
     try:
         from modules import tui
         from modules.db import init_db
-        from modules import stock
         
         # Initialize databases
         init_db()
-        stock.init_db()
         
         # Start TUI
-        tui.main()
+        tui.main(virtual=True if args.virtual else None)
     except ImportError as exc:
         print(f"TUI konnte nicht geladen werden: {exc}")
         return
 
 
+def _search_page(args, query):
+    """Eine Trefferseite holen; Rückgabe ``None`` bei ungültigem Cursor."""
+    try:
+        rows, cursor = inventory.search_page(query, args.limit, args.after)
+    except ValueError as exc:
+        print(f"Fehler: {exc}")
+        return None
+    return rows, cursor, inventory.count_search(query)
+
+
+def _print_cursor(cursor):
+    if cursor:
+        print(f"Weitere Treffer: --after '{cursor}'")
+
+
 def search_command(args):
-    results = inventory.search_items(args.term)
+    if args.fuzzy:
+        from modules import fuzzy
+        results, cursor, total = fuzzy.search(args.term, args.limit), None, None
+    else:
+        page = _search_page(args, args.term)
+        if page is None:
+            return
+        results, cursor, total = page
     if not results:
         print("Keine Artikel gefunden.")
         return
@@ -67,8 +184,11 @@ def search_command(args):
         from tabulate import tabulate
     except ImportError:
         print(results)
-        return
-    print(tabulate(results, headers="keys", tablefmt="github"))
+    else:
+        print(tabulate(results, headers="keys", tablefmt="github"))
+    if total is not None:
+        print(f"{len(results)} von {total} Treffern")
+    _print_cursor(cursor)
 
 
 def advanced_search_command(args):
@@ -78,27 +198,46 @@ def advanced_search_command(args):
         print('  python main.py fts "exact phrase"')
         print("  python main.py fts 'ESP32 OR Arduino'")
         print("  python main.py fts 'mikro* AND sensor'")
-        print("  python main.py fts 'NOT defekt'")
+        print("  python main.py fts 'NOT status:defekt'")
+        print("  python main.py fts 'kategorie:MCU shop:Reichelt'")
         return
 
-    results = inventory.search_items_fts(args.query)
-    if not results:
-        print(f"No FTS results for: {args.query}")
-        print("Trying fallback search...")
-        results = inventory.search_items_like(args.query)
-
+    page = _search_page(args, args.query)
+    if page is None:
+        return
+    results, cursor, total = page
     if not results:
         print("No results found.")
         return
 
     try:
         from tabulate import tabulate
-        print(f"Found {len(results)} results:")
-        headers = list(results[0].keys())
-        print(tabulate(results, headers=headers, tablefmt="github"))
+        print(f"Found {total} results, showing {len(results)}:")
+        print(tabulate(results, headers="keys", tablefmt="github"))
     except ImportError:
         for item in results:
             print(f"ID {item['id']}: {item['name']} ({item['kategorie']})")
+    _print_cursor(cursor)
+
+
+def fts_maint_command(args):
+    """Volltextindex warten und Segmentzahl/Größe vorher/nachher ausgeben."""
+    from modules import fts
+    try:
+        if args.action == "stats":
+            before = after = fts.stats(args.table)
+            result = {"ok": True}
+        else:
+            result = fts.maintain(args.action, args.value, args.table)
+            before, after = result["before"], result["after"]
+    except (ValueError, sqlite3.Error) as exc:
+        print(f"Fehler: {exc}")
+        return
+    print(f"vorher:  {before['segments']} Segmente, {before['size']} Bytes")
+    if args.action != "stats":
+        print(f"nachher: {after['segments']} Segmente, {after['size']} Bytes")
+    if args.action == "integrity-check":
+        print("Index in Ordnung" if result["ok"] else f"Index fehlerhaft: {result['error']}")
 
 
 def filter_command(args):
@@ -179,7 +318,7 @@ def stock_show_command(args):
 def stock_low_command(args):
     """Artikel mit niedrigem Bestand anzeigen."""
     try:
-        items = stock.get_low_stock_items(args.threshold)
+        items = inventory.list_low_stock(args.threshold)
         if not items:
             print("Keine Artikel mit niedrigem Bestand gefunden")
             return
@@ -190,17 +329,83 @@ def stock_low_command(args):
             print(tabulate(items, headers="keys", tablefmt="grid"))
         except ImportError:
             for item in items:
-                print(f"ID {item['item_id']}: {item['current_stock']}")
+                print(f"ID {item['id']}: {item['name']} {item['current_stock']}")
+    except Exception as e:
+        print(f"Fehler: {e}")
+
+
+def stock_import_command(args):
+    """Bestandsbewegungen aus CSV/JSONL importieren."""
+    from modules import importer
+    try:
+        records = (record for _, record in importer.iter_records(args.file, args.format))
+        result = stock.add_movements(records, chunk_size=args.chunk_size)
+    except (OSError, ValueError) as exc:
+        print(f"Fehler beim Import: {exc}")
+        return
+    print(f"{result['inserted']} Bestandsbewegungen importiert")
+    if result["error_count"]:
+        print(f"{result['error_count']} Datensätze abgewiesen:")
+        for position, message in result["errors"]:
+            print(f"  Datensatz {position}: {message}")
+        if result["error_count"] > len(result["errors"]):
+            print(f"  ... (+{result['error_count'] - len(result['errors'])} weitere)")
+
+
+def stock_recompute_command(args):
+    """Salden aus dem Bewegungsjournal neu aufbauen."""
+    try:
+        drift = stock.recompute_balances()
+        if args.verify:
+            if not drift:
+                print("Keine Abweichungen gefunden")
+            for entry in drift:
+                stored = entry['stored'] or {}
+                ledger = entry['ledger'] or {}
+                print(
+                    f"Artikel {entry['item_id']}: gespeichert {stored.get('current', '-')}, "
+                    f"laut Bewegungen {ledger.get('current', '-')}"
+                )
+        print(f"Salden neu aufgebaut ({len(drift)} Abweichungen korrigiert)")
     except Exception as e:
         print(f"Fehler: {e}")
 
 
+def stock_search_command(args):
+    """Volltextsuche in den Notizen der Bestandsbewegungen."""
+    try:
+        rows, cursor = stock.search_movements(args.query, args.limit, args.after)
+        total = stock.count_movement_search(args.query)
+    except ValueError as exc:
+        print(f"Fehler: {exc}")
+        return
+    if not rows:
+        print("Keine Bewegungen gefunden.")
+        return
+    columns = ("id", "item_id", "item_name", "movement_type", "quantity",
+               "movement_date", "snippet")
+    rows = [{key: row[key] for key in columns} for row in rows]
+    try:
+        from tabulate import tabulate
+    except ImportError:
+        print(rows)
+    else:
+        print(tabulate(rows, headers="keys", tablefmt="github"))
+    print(f"{len(rows)} von {total} Treffern")
+    _print_cursor(cursor)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="CLI Warenwirtschaftssystem",
         formatter_class=argparse.RawTextHelpFormatter
     )
     parser.add_argument("--version", action="version", version=VERSION)
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Anzahl geöffneter Verbindungen und ausgeführter Statements ausgeben"
+    )
     subparsers = parser.add_subparsers(dest="command")
 
     # Artikel-Management
@@ -223,17 +428,128 @@ def main() -> None:
     remove_cmd.set_defaults(func=remove_command)
 
     # Datenbank-Management
-    export_cmd = subparsers.add_parser("export", help="Datenbank exportieren")
-    export_cmd.add_argument("--file", default="inventory_backup.db", help="Zieldatei (.db)")
+    export_cmd = subparsers.add_parser(
+        "export",
+        help="Datenbank exportieren",
+        description="""Ohne --format wird die Datenbankdatei kopiert. Mit --format
+werden die Zeilen als CSV oder JSONL gestreamt (--file - schreibt auf stdout)."""
+    )
+    export_cmd.add_argument(
+        "--file",
+        help="Zieldatei (Standard: inventory_backup.db bzw. <tabelle>.<format>)"
+    )
+    export_cmd.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        help="Zeilenweise als CSV/JSONL exportieren"
+    )
+    export_cmd.add_argument(
+        "--table",
+        choices=["items", "movements", "joined"],
+        default="items",
+        help="Artikel, Bestandsbewegungen oder Artikel mit Bestand (Standard: items)"
+    )
     export_cmd.set_defaults(func=export_command)
 
+    backup_cmd = subparsers.add_parser(
+        "backup",
+        help="Online-Sicherung beider Datenbanken",
+        description="""Sichert inventory.db und stock.db (als <datei>_stock.db) über die
+SQLite-Backup-API, ohne Schreiber zu blockieren."""
+    )
+    backup_cmd.add_argument("--file", default="inventory_backup.db", help="Zieldatei (.db)")
+    backup_cmd.add_argument(
+        "--pages",
+        type=int,
+        default=256,
+        help="Seiten pro Kopierschritt (Standard: 256)"
+    )
+    backup_cmd.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Nur geänderte Seiten komprimiert im Sicherungsverzeichnis ablegen"
+    )
+    backup_cmd.add_argument(
+        "--dir",
+        default="backups",
+        help="Sicherungsverzeichnis für --incremental (Standard: backups)"
+    )
+    backup_cmd.add_argument(
+        "--compression",
+        choices=["gzip", "lzma"],
+        default="gzip",
+        help="Kompression neuer Seiten (Standard: gzip)"
+    )
+    backup_cmd.set_defaults(func=backup_command)
+
+    restore_cmd = subparsers.add_parser(
+        "restore",
+        help="Inkrementelle Sicherung wiederherstellen",
+        description="""Setzt inventory.db und stock.db aus einer inkrementellen Sicherung
+zusammen. Ohne --file werden die laufenden Datenbanken überschrieben."""
+    )
+    restore_cmd.add_argument(
+        "--dir",
+        default="backups",
+        help="Sicherungsverzeichnis (Standard: backups)"
+    )
+    restore_cmd.add_argument(
+        "--at",
+        metavar="TIMESTAMP",
+        help="Letzte Sicherung bis zu diesem Zeitpunkt, z. B. 20240501 oder 2024-05-01T12:00"
+    )
+    restore_cmd.add_argument("--file", help="Stattdessen nach <datei> und <datei>_stock.db schreiben")
+    restore_cmd.add_argument("--list", action="store_true", help="Vorhandene Sicherungen auflisten")
+    restore_cmd.set_defaults(func=restore_command)
+
     import_cmd = subparsers.add_parser("import", help="Datenbank importieren")
     import_cmd.add_argument("--file", required=True, help="Quelldatei (.db)")
     import_cmd.set_defaults(func=import_command)
 
+    merge_cmd = subparsers.add_parser(
+        "merge",
+        help="Andere Inventardatenbank hinzufügen statt überschreiben",
+        description="""Übernimmt Artikel, Kategorien und Bestandsbewegungen aus einer anderen
+Datenbank. Kategorien werden über den Namen zusammengeführt, kollidierende
+Artikel-IDs neu vergeben."""
+    )
+    merge_cmd.add_argument("--file", required=True, help="Quelldatei (.db)")
+    merge_cmd.add_argument(
+        "--stock-file",
+        help="Bestandsdatei der Quelle (Standard: <datei>_stock.db, falls vorhanden)"
+    )
+    merge_cmd.set_defaults(func=merge_command)
+
+    import_items_cmd = subparsers.add_parser(
+        "import-items",
+        help="Artikel aus CSV/JSONL importieren",
+        description="""Importiert Artikel zeilenweise aus einer CSV- oder JSONL-Datei.
+
+Spalten: name (Pflicht), kategorie, status, shop, notiz,
+datum_bestellt, datum_eingetroffen, anzahl (Anfangsmenge)"""
+    )
+    import_items_cmd.add_argument("file", help="Quelldatei (.csv oder .jsonl)")
+    import_items_cmd.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        help="Dateiformat (Standard: anhand der Endung)"
+    )
+    import_items_cmd.add_argument(
+        "--batch-size",
+        type=int,
+        default=5000,
+        help="Zeilen pro Schreibblock (Standard: 5000)"
+    )
+    import_items_cmd.set_defaults(func=import_items_command)
+
     # Suchen und Filtern
     search_cmd = subparsers.add_parser("search", help="Artikel suchen")
     search_cmd.add_argument("term", help="Suchbegriff")
+    search_cmd.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help="Tippfehler tolerieren (ESP23 findet ESP32), sortiert nach Editierdistanz"
+    )
     search_cmd.set_defaults(func=search_command)
 
     fts_cmd = subparsers.add_parser(
@@ -243,11 +559,42 @@ def main() -> None:
   python main.py fts "exakter begriff"
   python main.py fts 'ESP32 OR Arduino'
   python main.py fts 'mikro* AND sensor'
-  python main.py fts 'NOT defekt'"""
+  python main.py fts 'NOT status:defekt'
+  python main.py fts 'kategorie:MCU shop:"Reichelt Elektronik"'"""
     )
     fts_cmd.add_argument("query", nargs="?", help="Suchanfrage (mit Anführungszeichen für Phrasen)")
     fts_cmd.set_defaults(func=advanced_search_command)
 
+    for cmd in (search_cmd, fts_cmd):
+        cmd.add_argument(
+            "--limit",
+            type=int,
+            default=50,
+            help="Treffer pro Seite (Standard: 50)"
+        )
+        cmd.add_argument("--after", metavar="CURSOR", help="Cursor der vorherigen Seite")
+
+    fts_maint_cmd = subparsers.add_parser(
+        "fts-maint",
+        help="Volltextindex warten",
+        description="""Aktionen:
+  stats                 Segmente und Indexgröße anzeigen
+  rebuild               Index aus den Artikeln neu aufbauen
+  optimize              alle Segmente zu einem zusammenführen
+  integrity-check       Index gegen die Artikeltabelle prüfen
+  automerge N           Segmente ab N gleicher Stufe automatisch mischen (0-16, 0 = aus)
+  crisismerge N         Zwangsmischen ab N Segmenten einer Stufe (2-64)""",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    fts_maint_cmd.add_argument(
+        "action",
+        choices=["stats", "rebuild", "optimize", "integrity-check", "automerge", "crisismerge"],
+        help="Wartungsaktion"
+    )
+    fts_maint_cmd.add_argument("value", nargs="?", type=int, help="Wert für automerge/crisismerge")
+    fts_maint_cmd.add_argument("--table", default="items_fts", help="Volltextindex (Standard: items_fts)")
+    fts_maint_cmd.set_defaults(func=fts_maint_command)
+
     filter_cmd = subparsers.add_parser("filter", help="Artikel nach Kategorie/Status filtern")
     filter_cmd.add_argument("--category", help="Nach Kategorie filtern")
     filter_cmd.add_argument("--status", help="Nach Status filtern")
@@ -283,7 +630,16 @@ Beispiele:
     python main.py stock show 100000
   
   Artikel mit niedrigem Bestand (unter 10):
-    python main.py stock low --threshold 10""")
+    python main.py stock low --threshold 10
+
+  Bewegungen aus einer Datei importieren:
+    python main.py stock import bewegungen.csv
+
+  Salden aus den Bewegungen neu aufbauen und Abweichungen zeigen:
+    python main.py stock recompute --verify
+
+  Bewegungen nach Notizen durchsuchen:
+    python main.py stock search 'projekt* typ:verbaut'""")
     stock_sub = stock_cmd.add_subparsers(dest="stock_cmd")
 
     stock_add = stock_sub.add_parser(
@@ -323,17 +679,95 @@ Beispiele:
     )
     stock_low.set_defaults(func=stock_low_command)
 
+    stock_import = stock_sub.add_parser(
+        "import",
+        help="Bestandsbewegungen aus CSV/JSONL importieren",
+        description="""Importiert Bestandsbewegungen blockweise.
+
+Spalten: item_id, movement_type, quantity, notes, reference_date"""
+    )
+    stock_import.add_argument("file", help="Quelldatei (.csv oder .jsonl)")
+    stock_import.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        help="Dateiformat (Standard: anhand der Endung)"
+    )
+    stock_import.add_argument(
+        "--chunk-size",
+        type=int,
+        default=5000,
+        help="Bewegungen pro Transaktion (Standard: 5000)"
+    )
+    stock_import.set_defaults(func=stock_import_command)
+
+    stock_recompute = stock_sub.add_parser(
+        "recompute",
+        help="Salden neu berechnen",
+        description="Baut die Bestandssalden aus allen Bewegungen neu auf"
+    )
+    stock_recompute.add_argument(
+        "--verify",
+        action="store_true",
+        help="Abweichungen zwischen Salden und Bewegungen einzeln ausgeben"
+    )
+    stock_recompute.set_defaults(func=stock_recompute_command)
+
+    stock_search = stock_sub.add_parser(
+        "search",
+        help="Bewegungen nach Notizen durchsuchen",
+        description="""Volltextsuche in den Notizen der Bestandsbewegungen.
+
+Felder: typ:<bewegungsart>, artikel:<id>"""
+    )
+    stock_search.add_argument("query", help="Suchbegriff")
+    stock_search.add_argument(
+        "--limit",
+        type=int,
+        default=50,
+        help="Treffer pro Seite (Standard: 50)"
+    )
+    stock_search.add_argument("--after", help="Cursor der vorherigen Seite")
+    stock_search.set_defaults(func=stock_search_command)
+
     # TUI starten
     tui_cmd = subparsers.add_parser("tui", help="Textoberfläche starten")
+    tui_cmd.add_argument(
+        "--virtual",
+        action="store_true",
+        help="Tabelle seitenweise laden (Standard ab 2000 Artikeln)"
+    )
     tui_cmd.set_defaults(command="tui", func=tui_command)
 
     args = parser.parse_args()
+    if getattr(args, "fuzzy", False) and args.after:
+        # Die unscharfe Suche liefert nur die besten --limit Treffer, ohne Cursor
+        search_cmd.error("--after kann nicht mit --fuzzy kombiniert werden")
     if hasattr(args, "func"):
         if args.command != "tui":
             init_db()
-            if args.command == "stock":
-                stock.init_db()
         args.func(args)
+        if args.stats:
+            stats = connection_stats()
+            print(
+                f"Verbindungen: {stats['connections']}, Statements: {stats['statements']}",
+                file=sys.stderr
+            )
+            cache = inventory.search_cache_stats()
+            if cache["hits"] or cache["misses"]:
+                print(
+                    f"Such-Cache: {cache['hits']} Treffer, {cache['misses']} Fehlzugriffe, "
+                    f"{cache['entries']} Einträge",
+                    file=sys.stderr
+                )
+            if args.command == "tui":
+                from modules import aio
+                queue = aio.stats()
+                print(
+                    f"DB-Thread: {queue['completed']} Aufrufe, Warteschlange max. "
+                    f"{queue['max_queue_depth']}, Wartezeit Ø {queue['wait_ms_avg']:.1f} ms "
+                    f"(max. {queue['wait_ms_max']:.1f} ms)",
+                    file=sys.stderr
+                )
     else:
         parser.print_help()
 
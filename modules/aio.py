@@ -0,0 +1,219 @@
+"""Asynchrone Fassade über :mod:`inventory` und :mod:`stock` für die TUI.
+
+Alle Datenbankaufrufe laufen nacheinander in einem eigenen Thread mit
+eigener Verbindung; die Event-Loop wartet nur auf das Ergebnis und bleibt
+auch bei langsamer Platte oder gesperrter Datenbank bedienbar. Da alle
+Aufrufe denselben Thread nutzen, sieht ein Lesezugriff jeden zuvor
+abgeschickten Schreibzugriff::
+
+    item = await aio.inventory.get_item(item_id)
+    await aio.stock.add_movement(item_id, "eingang", 5)
+    rows = await aio.run(eigene_funktion, arg)
+
+Die Warteschlange ist begrenzt (:data:`QUEUE_SIZE`); ist sie voll, wartet
+der Aufrufer, ohne die Loop zu blockieren. :func:`stats` liefert
+Warteschlangenlänge sowie Warte- und Laufzeiten.
+"""
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from types import ModuleType
+from typing import Any, Callable, Optional
+
+from . import db
+from . import inventory as _inventory
+from . import stock as _stock
+
+# Aufträge, die höchstens auf den DB-Thread warten
+QUEUE_SIZE = 64
+
+# Wartezeit zwischen zwei Versuchen, wenn die Warteschlange voll ist (Sekunden)
+_FULL_BACKOFF = (0.001, 0.05)
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "future", "loop", "submitted", "conn")
+
+    def __init__(self, fn, args, kwargs, future, loop) -> None:
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.loop = loop
+        self.submitted = time.perf_counter()
+        self.conn = None
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class DBExecutor:
+    """Führt Funktionen in einem eigenen Datenbank-Thread aus."""
+
+    def __init__(self, max_queue: int = QUEUE_SIZE) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Schützt _running/job.conn: der DB-Thread wechselt Aufträge nur unter
+        # dieser Sperre, ein Abbruch unterbricht also nie den nächsten Auftrag
+        self._running_lock = threading.Lock()
+        self._running: Optional[_Job] = None
+        # Zähler werden vom DB-Thread und vom Event-Loop-Thread geschrieben
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, Any] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """Zähler von :meth:`stats` zurücksetzen."""
+        with self._stats_lock:
+            self._stats.update({
+                "submitted": 0, "completed": 0, "failed": 0, "cancelled": 0,
+                "max_queue_depth": 0, "full_waits": 0,
+                "wait_total": 0.0, "wait_max": 0.0, "run_total": 0.0, "run_max": 0.0,
+            })
+
+    def stats(self) -> dict[str, Any]:
+        """Warteschlangenlänge, Anzahl Aufträge und Warte-/Laufzeiten in ms."""
+        with self._stats_lock:
+            s = dict(self._stats)
+        done = max(s["completed"] + s["failed"], 1)
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": s["max_queue_depth"],
+            "submitted": s["submitted"],
+            "completed": s["completed"],
+            "failed": s["failed"],
+            "cancelled": s["cancelled"],
+            "full_waits": s["full_waits"],
+            "wait_ms_avg": s["wait_total"] * 1000 / done,
+            "wait_ms_max": s["wait_max"] * 1000,
+            "run_ms_avg": s["run_total"] * 1000 / done,
+            "run_ms_max": s["run_max"] * 1000,
+        }
+
+    def _ensure_thread(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            started = time.perf_counter()
+            if job.future.cancelled():
+                with self._stats_lock:
+                    self._stats["cancelled"] += 1
+                continue
+            wait = started - job.submitted
+            with self._stats_lock:
+                self._stats["wait_total"] += wait
+                self._stats["wait_max"] = max(self._stats["wait_max"], wait)
+            result = error = None
+            try:
+                conn = db.connection()
+                with self._running_lock:
+                    job.conn = conn
+                    self._running = job
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as exc:
+                error = exc
+            finally:
+                with self._running_lock:
+                    self._running = None
+                    job.conn = None
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self._stats["failed" if error is not None else "completed"] += 1
+                self._stats["run_total"] += elapsed
+                self._stats["run_max"] = max(self._stats["run_max"], elapsed)
+            try:
+                job.loop.call_soon_threadsafe(_resolve, job.future, result, error)
+            except RuntimeError:
+                # Event-Loop bereits geschlossen
+                pass
+
+    async def _submit(self, fn: Callable, args: tuple, kwargs: dict, interruptible: bool) -> Any:
+        self._ensure_thread()
+        loop = asyncio.get_running_loop()
+        job = _Job(fn, args, kwargs, loop.create_future(), loop)
+        delay = _FULL_BACKOFF[0]
+        while True:
+            try:
+                self._queue.put_nowait(job)
+                break
+            except queue.Full:
+                # Gegendruck: warten, ohne die Loop zu blockieren
+                with self._stats_lock:
+                    self._stats["full_waits"] += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _FULL_BACKOFF[1])
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            if interruptible:
+                with self._running_lock:
+                    if self._running is job:
+                        job.conn.interrupt()
+            raise
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """``fn(*args, **kwargs)`` im DB-Thread ausführen und das Ergebnis liefern."""
+        return await self._submit(fn, args, kwargs, interruptible=False)
+
+    async def run_interruptible(self, fn: Callable, *args, **kwargs) -> Any:
+        """Wie :meth:`run`; wird der Aufrufer abgebrochen, wird auch die
+        laufende SQL-Anweisung abgebrochen (nur für Lesezugriffe)."""
+        return await self._submit(fn, args, kwargs, interruptible=True)
+
+    def close(self) -> None:
+        """DB-Thread nach den wartenden Aufträgen beenden."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+class AsyncModule:
+    """Stellt die Funktionen eines Moduls als Coroutinen bereit."""
+
+    def __init__(self, module: ModuleType, executor: DBExecutor) -> None:
+        self._module = module
+        self._executor = executor
+
+    def __getattr__(self, name: str) -> Callable:
+        fn = getattr(self._module, name)
+        if not callable(fn) or isinstance(fn, type):
+            raise AttributeError(f"{self._module.__name__}.{name} ist keine Funktion")
+
+        async def call(*args, **kwargs):
+            return await self._executor.run(fn, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = fn.__doc__
+        setattr(self, name, call)
+        return call
+
+
+executor = DBExecutor()
+inventory = AsyncModule(_inventory, executor)
+stock = AsyncModule(_stock, executor)
+run = executor.run
+run_interruptible = executor.run_interruptible
+stats = executor.stats
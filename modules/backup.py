@@ -0,0 +1,340 @@
+"""Online-Sicherung beider Datenbanken über die SQLite-Backup-API.
+
+Die Sicherung läuft über eine eigene Verbindung, an die ``stock.db`` wie
+gewohnt angehängt ist. Vor dem Kopieren wird eine Lesetransaktion über
+beide Schemata geöffnet: Im WAL-Modus blockiert sie keine Schreiber, hält
+aber den Stand fest, sodass ``inventory.db`` und ``stock.db`` zueinander
+passen und parallele Änderungen die Sicherung nicht neu starten. Kopiert
+wird blockweise (``pages`` Seiten pro Schritt) mit Fortschrittsmeldung.
+
+Inkrementelle Sicherungen (:func:`backup_incremental`) lesen die Seiten
+dieses Stands direkt aus den Datenbankdateien (ohne Zwischenkopie) und
+legen nur Seiten, deren Hash noch nicht im Sicherungsverzeichnis liegt,
+komprimiert als Objekt ab::
+
+    <verzeichnis>/objects/ab/abcdef....gz   Seiteninhalt (gzip oder lzma)
+    <verzeichnis>/manifests/<zeitstempel>.json
+
+Das Manifest listet je Datenbank die Seitengröße und die Hashes aller
+Seiten; :func:`restore_incremental` setzt daraus beide Dateien wieder
+zusammen.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import lzma
+import sqlite3
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from . import db
+
+# Seiten pro Kopierschritt (bei 4 KiB-Seiten 1 MiB)
+PAGES_PER_STEP = 256
+
+# Versuche, einen vollständig in die Dateien übernommenen Stand zu lesen
+SNAPSHOT_ATTEMPTS = 3
+
+# Fortschritt: (schema, verbleibende Seiten, Seiten gesamt)
+Progress = Callable[[str, int, int], None]
+
+
+def stock_backup_path(target: str | Path) -> Path:
+    """Pfad der Bestandssicherung neben ``target`` (``x.db`` -> ``x_stock.db``)."""
+    target = Path(target)
+    return target.with_name(f"{target.stem}_stock{target.suffix or '.db'}")
+
+
+def _open_source() -> sqlite3.Connection:
+    conn = sqlite3.connect(db.DB_FILE, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    conn.execute(f"ATTACH DATABASE ? AS {db.STOCK_SCHEMA}", (str(db.STOCK_DB_FILE),))
+    return conn
+
+
+def _copy(source: sqlite3.Connection, schema: str, target: Path,
+          pages: int, progress: Optional[Progress]) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    dest = sqlite3.connect(target)
+    try:
+        callback = None
+        if progress is not None:
+            def callback(status, remaining, total):
+                progress(schema, remaining, total)
+        source.backup(dest, pages=pages, progress=callback, name=schema, sleep=0)
+    finally:
+        dest.close()
+
+
+def backup(target: str | Path, pages: int = PAGES_PER_STEP,
+           progress: Optional[Progress] = None) -> dict[str, Path]:
+    """Sichert ``inventory.db`` nach ``target`` und ``stock.db`` daneben.
+
+    Rückgabe: die geschriebenen Dateien je Schema.
+    """
+    target = Path(target)
+    files = {"main": target, db.STOCK_SCHEMA: stock_backup_path(target)}
+    source = _open_source()
+    try:
+        # Lesetransaktion auf beiden Schemata: gemeinsamer Stand für die Sicherung
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM main.sqlite_master LIMIT 1").fetchall()
+        source.execute(f"SELECT 1 FROM {db.STOCK_SCHEMA}.sqlite_master LIMIT 1").fetchall()
+        for schema, path in files.items():
+            _copy(source, schema, path, pages, progress)
+        source.execute("COMMIT")
+    finally:
+        source.close()
+    return files
+
+
+def restore(source: str | Path) -> None:
+    """Spielt eine mit :func:`backup` erstellte Sicherung zurück.
+
+    Fehlt die Bestandssicherung neben ``source``, bleibt ``stock.db``
+    unverändert.
+    """
+    source = Path(source)
+    files = {db.DB_FILE: source}
+    stock_source = stock_backup_path(source)
+    if stock_source.exists():
+        files[db.STOCK_DB_FILE] = stock_source
+    db.close_connections()
+    for live, backup_file in files.items():
+        src = sqlite3.connect(f"file:{backup_file}?mode=ro", uri=True)
+        dest = sqlite3.connect(live)
+        try:
+            dest.execute("PRAGMA busy_timeout = 5000")
+            src.backup(dest, pages=PAGES_PER_STEP, sleep=0)
+        finally:
+            dest.close()
+            src.close()
+
+
+COMPRESSORS = {
+    "gzip": (".gz", gzip.compress, gzip.decompress),
+    "lzma": (".xz", lzma.compress, lzma.decompress),
+}
+
+# Zeitstempel der Manifeste; lexikographisch sortierbar
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+
+_DB_NAMES = {"main": "inventory.db", db.STOCK_SCHEMA: "stock.db"}
+
+
+def _page_size(path: Path) -> int:
+    with open(path, "rb") as fh:
+        header = fh.read(18)
+    size = int.from_bytes(header[16:18], "big")
+    # Der Wert 1 steht für 65536
+    return 65536 if size == 1 else size
+
+
+def _object_path(directory: Path, digest: str, suffix: str) -> Path:
+    return directory / "objects" / digest[:2] / f"{digest}{suffix}"
+
+
+def _find_object(directory: Path, digest: str) -> Optional[Path]:
+    for suffix, _, _ in COMPRESSORS.values():
+        path = _object_path(directory, digest, suffix)
+        if path.exists():
+            return path
+    return None
+
+
+def _open_file_snapshot(source: sqlite3.Connection) -> bool:
+    """Lesetransaktion öffnen, deren Stand vollständig in den Dateien steht.
+
+    Ein passiver Checkpoint überträgt das WAL in die Datenbankdateien; die
+    anschließende Lesetransaktion verhindert, dass spätere Checkpoints
+    neuere Seiten hineinschreiben. Hat zwischen Checkpoint und Beginn der
+    Transaktion niemand geschrieben (``data_version`` unverändert), sind
+    die Dateien genau dieser Stand. Schlägt das wiederholt fehl (z. B.
+    wegen eines lang laufenden Lesers), ist das Ergebnis ``False``.
+    """
+    for _ in range(SNAPSHOT_ATTEMPTS):
+        before = [source.execute(f"PRAGMA {schema}.data_version").fetchone()[0] for schema in _DB_NAMES]
+        complete = True
+        for schema in _DB_NAMES:
+            busy, log, checkpointed = source.execute(f"PRAGMA {schema}.wal_checkpoint(PASSIVE)").fetchone()
+            complete = complete and not busy and log == checkpointed
+        source.execute("BEGIN")
+        after = [source.execute(f"PRAGMA {schema}.data_version").fetchone()[0] for schema in _DB_NAMES]
+        if complete and before == after:
+            return True
+        source.execute("COMMIT")
+    return False
+
+
+def _store_pages(path: Path, directory: Path, compression: str, stats: dict,
+                 page_count: Optional[int] = None, step: int = PAGES_PER_STEP,
+                 progress: Optional[Callable[[int, int], None]] = None) -> dict[str, Any]:
+    """Seiten von ``path`` (ohne ``page_count``: die ganze Datei) ablegen."""
+    suffix, compress, _ = COMPRESSORS[compression]
+    page_size = _page_size(path)
+    if page_count is None:
+        page_count = path.stat().st_size // page_size
+    digests = []
+    with open(path, "rb") as fh:
+        for number in range(page_count):
+            if progress is not None and number % step == 0:
+                progress(page_count - number, page_count)
+            page = fh.read(page_size)
+            if len(page) < page_size:
+                raise ValueError(f"{path} ist kürzer als {page_count} Seiten")
+            digest = hashlib.sha256(page).hexdigest()
+            digests.append(digest)
+            stats["pages"] += 1
+            if _find_object(directory, digest) is None:
+                target = _object_path(directory, digest, suffix)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                data = compress(page)
+                tmp = target.with_name(target.name + ".tmp")
+                tmp.write_bytes(data)
+                tmp.replace(target)
+                stats["new_pages"] += 1
+                stats["bytes_written"] += len(data)
+    if progress is not None:
+        progress(0, page_count)
+    return {"page_size": page_size, "pages": digests}
+
+
+def _store_live_pages(directory: Path, compression: str, stats: dict, pages: int,
+                      progress: Optional[Progress]) -> Optional[dict[str, Any]]:
+    """Seiten beider Datenbanken direkt aus den Dateien ablegen; ``None``, wenn
+    kein vollständig übernommener Stand zu bekommen war."""
+    paths = {"main": db.DB_FILE, db.STOCK_SCHEMA: db.STOCK_DB_FILE}
+    source = _open_source()
+    try:
+        if not _open_file_snapshot(source):
+            return None
+        files = {}
+        for schema, path in paths.items():
+            page_count = source.execute(f"PRAGMA {schema}.page_count").fetchone()[0]
+            callback = None
+            if progress is not None:
+                def callback(remaining, total, schema=schema):
+                    progress(schema, remaining, total)
+            files[schema] = _store_pages(path, directory, compression, stats,
+                                         page_count, pages, callback)
+        source.execute("COMMIT")
+        return files
+    finally:
+        source.close()
+
+
+def backup_incremental(directory: str | Path, compression: str = "gzip",
+                       pages: int = PAGES_PER_STEP,
+                       progress: Optional[Progress] = None) -> dict[str, Any]:
+    """Inkrementelle Sicherung beider Datenbanken nach ``directory``.
+
+    Die Seiten werden innerhalb einer Lesetransaktion direkt aus den
+    Datenbankdateien gelesen, es entsteht keine Kopie der Datenbanken
+    (siehe :func:`_open_file_snapshot`). Nur wenn sich das WAL nicht in die
+    Dateien übernehmen lässt (dauerhaft parallele Leser oder Schreiber),
+    wird wie bei :func:`backup` ein temporärer Schnappschuss geschrieben.
+
+    Rückgabe: ``timestamp``, ``manifest``, ``pages`` (gesamt), ``new_pages``,
+    ``bytes_written`` (komprimiert) und ``snapshot`` (``True``, wenn der
+    temporäre Schnappschuss nötig war).
+    """
+    if compression not in COMPRESSORS:
+        raise ValueError(f"Kompression muss einer von {list(COMPRESSORS)} sein")
+    directory = Path(directory)
+    manifests = directory / "manifests"
+    manifests.mkdir(parents=True, exist_ok=True)
+    stats: dict[str, Any] = {"pages": 0, "new_pages": 0, "bytes_written": 0, "snapshot": False}
+    files = _store_live_pages(directory, compression, stats, pages, progress)
+    if files is None:
+        stats["snapshot"] = True
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            snapshot = backup(Path(tmp) / "snapshot.db", pages=pages, progress=progress)
+            files = {
+                schema: _store_pages(path, directory, compression, stats)
+                for schema, path in snapshot.items()
+            }
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+    manifest = manifests / f"{timestamp}.json"
+    counter = 1
+    while manifest.exists():
+        manifest = manifests / f"{timestamp}-{counter}.json"
+        counter += 1
+    tmp_manifest = manifest.with_name(manifest.name + ".tmp")
+    tmp_manifest.write_text(
+        json.dumps({"created": timestamp, "files": files}), encoding="utf-8"
+    )
+    # Manifest zuletzt schreiben: eine abgebrochene Sicherung ist unsichtbar
+    tmp_manifest.replace(manifest)
+    stats["timestamp"] = manifest.stem
+    stats["manifest"] = manifest
+    return stats
+
+
+def list_manifests(directory: str | Path) -> list[str]:
+    """Zeitstempel aller inkrementellen Sicherungen, älteste zuerst."""
+    manifests = Path(directory) / "manifests"
+    if not manifests.is_dir():
+        return []
+    return sorted(path.stem for path in manifests.glob("*.json"))
+
+
+def _select_manifest(directory: Path, at: Optional[str]) -> str:
+    names = list_manifests(directory)
+    if at in names:
+        return at
+    if at:
+        # ``2024-05-01 12:00`` und ``20240501T1200`` sind gleichwertig
+        at = at.replace("-", "").replace(":", "").replace(" ", "T")
+        names = [name for name in names if name[:len(at)] <= at]
+    if not names:
+        raise ValueError(f"Keine Sicherung in {directory}" + (f" bis {at}" if at else ""))
+    return names[-1]
+
+
+def _rebuild(directory: Path, entry: dict, target: Path) -> None:
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        for digest in entry["pages"]:
+            path = _find_object(directory, digest)
+            if path is None:
+                raise ValueError(f"Seite {digest} fehlt in der Sicherung")
+            decompress = next(
+                d for suffix, _, d in COMPRESSORS.values() if path.name.endswith(suffix)
+            )
+            page = decompress(path.read_bytes())
+            if len(page) != entry["page_size"] or hashlib.sha256(page).hexdigest() != digest:
+                raise ValueError(f"Seite {digest} ist beschädigt")
+            fh.write(page)
+    tmp.replace(target)
+
+
+def restore_incremental(directory: str | Path, at: Optional[str] = None,
+                        target: str | Path | None = None) -> str:
+    """Stellt den Stand einer inkrementellen Sicherung wieder her.
+
+    ``at`` wählt die letzte Sicherung bis zu diesem Zeitpunkt (auch nur
+    Datum möglich), sonst die neueste. Mit ``target`` werden die Dateien
+    dorthin geschrieben (``stock.db`` wie bei :func:`backup` daneben),
+    sonst in die laufenden Datenbanken zurückgespielt. Rückgabe: der
+    Zeitstempel der verwendeten Sicherung.
+    """
+    directory = Path(directory)
+    name = _select_manifest(directory, at)
+    manifest = json.loads((directory / "manifests" / f"{name}.json").read_text(encoding="utf-8"))
+    files = manifest["files"]
+    if target is not None:
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _rebuild(directory, files["main"], target)
+        _rebuild(directory, files[db.STOCK_SCHEMA], stock_backup_path(target))
+        return name
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        rebuilt = Path(tmp) / _DB_NAMES["main"]
+        _rebuild(directory, files["main"], rebuilt)
+        _rebuild(directory, files[db.STOCK_SCHEMA], stock_backup_path(rebuilt))
+        restore(rebuilt)
+    return name
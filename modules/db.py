@@ -1,44 +1,209 @@
 from __future__ import annotations
 
+import atexit
+import os
 import sqlite3
+import threading
 from pathlib import Path
 
-DB_FILE = Path(__file__).parent.parent / "database" / "inventory.db"
+DATA_DIR = Path(os.environ.get("WWS_DATA_DIR") or Path(__file__).parent.parent / "database")
+DB_FILE = DATA_DIR / "inventory.db"
+STOCK_DB_FILE = DATA_DIR / "stock.db"
 DB_FILE.parent.mkdir(exist_ok=True)  # Stelle sicher, dass der Ordner existiert
 
+# Name, unter dem stock.db an die Inventar-Verbindung angehängt wird
+STOCK_SCHEMA = "stock"
+
+# Einmalig pro verwalteter Verbindung gesetzte Pragmas. WAL erlaubt paralleles
+# Lesen (TUI) während ein anderer Prozess schreibt; synchronous=NORMAL ist im
+# WAL-Modus sicher und spart ein fsync pro Commit.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 67108864",
+)
+
+# Pragmas, die je Datenbankschema gelten und für angehängte Dateien
+# wiederholt werden müssen
+_SCHEMA_PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size")
+
+_local = threading.local()
+_lock = threading.Lock()
+_managed: list[sqlite3.Connection] = []
+_generation = 0
+_stats = {"connections": 0, "statements": 0}
+# data_version(): last seen state per (connection, schemas) and the
+# process-wide counter per schemas that forms the token
+_seen_versions: dict[tuple[int, tuple[str, ...]], tuple[int, ...]] = {}
+_version_counters: dict[tuple[str, ...], int] = {}
+
+
 def get_connection() -> sqlite3.Connection:
-    """Get a database connection with row factory."""
+    """Get a new, unmanaged database connection with row factory.
+
+    The caller owns the connection and must close it. Regular queries should
+    use :func:`connection` instead.
+    """
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     return conn
 
+
+def _count_statement(sql: str) -> None:
+    # Trigger-Anweisungen werden als "-- TRIGGER ..." gemeldet und nicht gezählt
+    if not sql.startswith("--"):
+        # Läuft in jedem Thread mit verwalteter Verbindung (aio, Pager)
+        with _lock:
+            _stats["statements"] += 1
+
+
+def _open_managed(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if path == DB_FILE:
+        # Bestandsdaten als Schema "stock" anhängen, damit Artikel und
+        # Bestände in einer Abfrage verknüpft werden können
+        conn.execute("ATTACH DATABASE ? AS " + STOCK_SCHEMA, (str(STOCK_DB_FILE),))
+        for pragma in PRAGMAS:
+            name = pragma.split()[1]
+            if name in _SCHEMA_PRAGMAS:
+                conn.execute(pragma.replace(name, f"{STOCK_SCHEMA}.{name}", 1))
+    conn.set_trace_callback(_count_statement)
+    with _lock:
+        _managed.append(conn)
+        _stats["connections"] += 1
+    return conn
+
+
+def connection(db_file: Path | str | None = None) -> sqlite3.Connection:
+    """Return the long-lived connection of the current thread for ``db_file``.
+
+    Each thread gets one connection per database file, opened on first use
+    with :data:`PRAGMAS` applied. The connection is shared: callers must not
+    close it and should wrap writes in ``with conn:`` so that errors roll back.
+
+    The inventory connection (the default) has ``stock.db`` attached as schema
+    :data:`STOCK_SCHEMA`, so ``stock.stock_balances`` etc. can be joined
+    directly with ``items``.
+    """
+    path = Path(db_file) if db_file is not None else DB_FILE
+    cache = getattr(_local, "connections", None)
+    if cache is None or _local.generation != _generation:
+        cache = _local.connections = {}
+        _local.generation = _generation
+    conn = cache.get(path)
+    if conn is None:
+        conn = cache[path] = _open_managed(path)
+    return conn
+
+
+def close_connections() -> None:
+    """Close all managed connections of all threads.
+
+    Needed before database files are replaced or removed; the next call to
+    :func:`connection` opens fresh connections.
+    """
+    global _generation
+    with _lock:
+        conns = list(_managed)
+        _managed.clear()
+        _seen_versions.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(close_connections)
+
+
+def connection_stats() -> dict[str, int]:
+    """Number of connections opened and statements run since the last reset."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_connection_stats() -> None:
+    """Reset the counters reported by :func:`connection_stats`."""
+    with _lock:
+        _stats["connections"] = 0
+        _stats["statements"] = 0
+
+
+def data_version(conn: sqlite3.Connection | None = None,
+                 schemas: tuple[str, ...] = ("main",)) -> int:
+    """Token that changes whenever ``items`` & co. may have changed.
+
+    ``PRAGMA data_version`` only reflects commits of *other* connections and
+    its values differ between connections, so they cannot be the token
+    themselves. Instead the last ``data_version``/``total_changes`` seen per
+    connection is remembered, and any change (or a connection seen for the
+    first time) advances a process-wide counter. That counter is the token,
+    so tokens are comparable across threads. Pass
+    ``schemas=("main", STOCK_SCHEMA)`` to also track ``stock.db``.
+    """
+    conn = conn or connection()
+    versions = [conn.execute(f"PRAGMA {schema}.data_version").fetchone()[0] for schema in schemas]
+    state = (*versions, conn.total_changes)
+    key = (id(conn), schemas)
+    with _lock:
+        if _seen_versions.get(key) != state:
+            _seen_versions[key] = state
+            _version_counters[schemas] = _version_counters.get(schemas, 0) + 1
+        return _version_counters[schemas]
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> list[str]:
+    """Return the ``EXPLAIN QUERY PLAN`` details for ``sql``."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
 def export_db(target: str) -> None:
-    """Export database to file."""
-    import shutil
-    shutil.copy2(DB_FILE, target)
+    """Export both databases (``stock.db`` next to ``target``).
+
+    Uses the online backup API, see :mod:`modules.backup`.
+    """
+    from . import backup
+    backup.backup(target)
+
 
 def import_db(source: str) -> None:
-    """Import database from file."""
-    import shutil
-    shutil.copy2(source, DB_FILE)
-    # Verify database
-    conn = get_connection()
+    """Import database from file (and its ``stock.db`` backup, if present)."""
+    from . import backup
+    # Verify database before touching the live files
+    try:
+        conn = sqlite3.connect(f"file:{Path(source).resolve()}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        raise ValueError(f"Ungültige Datenbankdatei: {e}")
     try:
         cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM items")
         cur.execute("SELECT COUNT(*) FROM categories")
     except sqlite3.Error as e:
-        # Clean up corrupted file
-        DB_FILE.unlink(missing_ok=True)
         raise ValueError(f"Ungültige Datenbankdatei: {e}")
     finally:
         conn.close()
+    backup.restore(source)
+
 
 def init_db() -> None:
-    """Initialize the database."""
-    from . import migrations
-    conn = get_connection()
+    """Initialize both databases.
+
+    ``stock.db`` is migrated first because inventory migrations may move data
+    into the attached stock schema.
+    """
+    from . import migrations, stock
+    stock.init_db()
+    conn = connection()
     try:
         migrations.run_migrations(conn)
-    finally:
-        conn.close()
\ No newline at end of file
+    except Exception:
+        conn.rollback()
+        raise
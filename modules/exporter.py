@@ -0,0 +1,81 @@
+"""Export von Artikeln und Bestandsbewegungen als CSV oder JSONL.
+
+Die Zeilen werden blockweise per ``fetchmany`` gelesen und direkt
+geschrieben; der Speicherbedarf hängt nur von der Blockgröße ab, nicht von
+der Größe des Journals. Die Bestandsspalten der Tabelle ``joined`` kommen
+aus ``stock.stock_balances`` in derselben Abfrage.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import sys
+from typing import Any, Iterator, TextIO
+
+from .db import connection
+from .inventory import _ITEMS_WITH_STOCK
+
+FETCH_SIZE = 1000
+
+FORMATS = ("csv", "jsonl")
+
+# Exportierbare Tabellen und ihre Abfragen (stabil sortiert)
+TABLES = {
+    "items": "SELECT * FROM items ORDER BY id",
+    "movements": "SELECT * FROM stock.stock_movements ORDER BY id",
+    "joined": f"{_ITEMS_WITH_STOCK} ORDER BY items.id",
+}
+
+
+def iter_rows(table: str = "items", fetch_size: int = FETCH_SIZE) -> Iterator[tuple]:
+    """Liefert zuerst die Spaltennamen, danach die Zeilen als Tupel."""
+    if table not in TABLES:
+        raise ValueError(f"Tabelle muss einer von {list(TABLES)} sein")
+    cur = connection().cursor()
+    cur.execute(TABLES[table])
+    yield tuple(col[0] for col in cur.description)
+    while True:
+        rows = cur.fetchmany(fetch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield tuple(row)
+
+
+def write_csv(rows: Iterator[tuple], fh: TextIO) -> int:
+    """Schreibt Kopfzeile und Zeilen als CSV; Rückgabe: Anzahl Datenzeilen."""
+    writer = csv.writer(fh)
+    writer.writerow(next(rows))
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterator[tuple], fh: TextIO) -> int:
+    """Schreibt ein JSON-Objekt pro Zeile; Rückgabe: Anzahl Datenzeilen."""
+    columns = next(rows)
+    count = 0
+    for row in rows:
+        fh.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        fh.write("\n")
+        count += 1
+    return count
+
+
+_WRITERS = {"csv": write_csv, "jsonl": write_jsonl}
+
+
+def export(target: str, fmt: str = "csv", table: str = "items",
+           fetch_size: int = FETCH_SIZE) -> dict[str, Any]:
+    """Exportiert ``table`` nach ``target`` (``-`` für die Standardausgabe)."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Format muss einer von {list(FORMATS)} sein")
+    rows = iter_rows(table, fetch_size)
+    if target == "-":
+        count = _WRITERS[fmt](rows, sys.stdout)
+    else:
+        with open(target, "w", newline="", encoding="utf-8") as fh:
+            count = _WRITERS[fmt](rows, fh)
+    return {"rows": count, "table": table, "format": fmt}
@@ -0,0 +1,75 @@
+"""Wartung der FTS5-Volltextindizes.
+
+FTS5 legt neue Einträge in Segmenten ab und führt sie im Hintergrund
+zusammen (``automerge``). Viele Segmente machen Suchen langsamer;
+``optimize`` fasst alles zu einem Segment zusammen, ``rebuild`` baut den
+Index aus der Inhaltstabelle neu auf. :func:`stats` liefert Segmentzahl
+und Indexgröße, um die Wirkung zu prüfen.
+"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Optional
+
+from .db import connection
+from .inventory import FTS_TABLES
+
+# Befehle ohne Parameter
+COMMANDS = ("rebuild", "optimize", "integrity-check")
+
+# Einstellungen mit Parameter und erlaubtem Bereich (siehe FTS5-Doku)
+SETTINGS = {
+    "automerge": (0, 16),
+    "crisismerge": (2, 64),
+}
+
+
+def _check_table(table: str) -> None:
+    if table not in FTS_TABLES:
+        raise ValueError(f"Index muss einer von {list(FTS_TABLES)} sein")
+
+
+def stats(table: str = FTS_TABLES[0]) -> dict[str, int]:
+    """Anzahl Segmente und Größe der Indexdaten in Bytes."""
+    _check_table(table)
+    cur = connection().cursor()
+    cur.execute(f"SELECT COUNT(DISTINCT segid) FROM {table}_idx")
+    segments = cur.fetchone()[0]
+    cur.execute(f"SELECT COALESCE(SUM(LENGTH(block)), 0) FROM {table}_data")
+    size = cur.fetchone()[0]
+    return {"segments": segments, "size": size}
+
+
+def maintain(command: str, value: Optional[int] = None,
+             table: str = FTS_TABLES[0]) -> dict[str, Any]:
+    """Führt einen Wartungsbefehl aus.
+
+    Rückgabe: ``before`` und ``after`` (siehe :func:`stats`) sowie ``ok``,
+    das bei ``integrity-check`` angibt, ob der Index zum Inhalt passt.
+    """
+    _check_table(table)
+    if command in SETTINGS:
+        low, high = SETTINGS[command]
+        if value is None or not low <= value <= high:
+            raise ValueError(f"{command} erwartet einen Wert von {low} bis {high}")
+    elif command not in COMMANDS:
+        raise ValueError(f"Befehl muss einer von {list(COMMANDS) + list(SETTINGS)} sein")
+
+    result: dict[str, Any] = {"before": stats(table), "ok": True}
+    conn = connection()
+    try:
+        with conn:
+            if command == "integrity-check":
+                # rank = 1: auch gegen die Inhaltstabelle prüfen
+                conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)")
+            elif command in SETTINGS:
+                conn.execute(f"INSERT INTO {table}({table}, rank) VALUES (?, ?)", (command, value))
+            else:
+                conn.execute(f"INSERT INTO {table}({table}) VALUES (?)", (command,))
+    except sqlite3.DatabaseError as exc:
+        if command != "integrity-check":
+            raise
+        result["ok"] = False
+        result["error"] = str(exc)
+    result["after"] = stats(table)
+    return result
@@ -0,0 +1,156 @@
+"""Fehlertolerante Artikelsuche (``ESP23`` findet ``ESP32``).
+
+Die Wörter aller Artikelnamen stehen in einem Bigramm-Index im Speicher.
+Für ein Suchwort werden nur Wörter mit genügend gemeinsamen Bigrammen und
+passender Länge als Kandidaten betrachtet (q-Gramm-Lemma) und erst diese
+per Levenshtein-Distanz geprüft; es wird also nie jeder Name verglichen.
+
+Der Index wird beim ersten Zugriff aufgebaut und verworfen, sobald sich die
+Datenbank ändert (:func:`modules.db.data_version`).
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Optional
+
+from . import db
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def max_distance(word: str) -> int:
+    """Erlaubte Tippfehler je nach Wortlänge."""
+    if len(word) <= 2:
+        return 0
+    return 1 if len(word) <= 4 else 2
+
+
+def _bigrams(word: str) -> set[str]:
+    padded = f"^{word}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def levenshtein(a: str, b: str, limit: int) -> int:
+    """Editierdistanz; bricht ab, sobald sie ``limit`` übersteigt (dann ``limit + 1``)."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _rank(pair: tuple[int, int]) -> tuple[int, int]:
+    return pair[1], pair[0]
+
+
+class FuzzyIndex:
+    """Bigramm-Index über die Wörter der Artikelnamen."""
+
+    def __init__(self, rows) -> None:
+        self.words: dict[str, set[int]] = defaultdict(set)
+        for item_id, name in rows:
+            for word in _WORD_RE.findall((name or "").lower()):
+                self.words[word].add(item_id)
+        # (Wortlänge, Bigramm) -> Wörter; Kandidaten anderer Länge entfallen so
+        self.postings: dict[tuple[int, str], list[str]] = defaultdict(list)
+        for word in self.words:
+            for gram in _bigrams(word):
+                self.postings[len(word), gram].append(word)
+
+    def similar(self, word: str, distance: Optional[int] = None) -> dict[str, int]:
+        """Wörter des Index mit Distanz <= ``distance`` zu ``word``."""
+        if distance is None:
+            distance = max_distance(word)
+        if distance == 0:
+            return {word: 0} if word in self.words else {}
+        grams = _bigrams(word)
+        found = {}
+        for length in range(max(1, len(word) - distance), len(word) + distance + 1):
+            shared: dict[str, int] = defaultdict(int)
+            for gram in grams:
+                for candidate in self.postings.get((length, gram), ()):
+                    shared[candidate] += 1
+            # Jede Editieroperation zerstört höchstens zwei Bigramm-Vorkommen;
+            # gezählt werden verschiedene Bigramme (``2222`` hat nur drei)
+            needed = len(grams) - 2 * distance
+            for candidate, count in shared.items():
+                if count >= needed:
+                    dist = levenshtein(word, candidate, distance)
+                    if dist <= distance:
+                        found[candidate] = dist
+        return found
+
+    def search(self, text: str, limit: Optional[int] = None) -> list[tuple[int, int]]:
+        """``(item_id, distanz)`` für Artikel, die jedes Suchwort enthalten.
+
+        Sortiert nach Distanz und ID; mit ``limit`` nur die besten Treffer.
+        """
+        scores: Optional[dict[int, int]] = None
+        for word in _WORD_RE.findall(text.lower()):
+            best: dict[int, int] = {}
+            for candidate, dist in self.similar(word).items():
+                for item_id in self.words[candidate]:
+                    if dist < best.get(item_id, dist + 1):
+                        best[item_id] = dist
+            if scores is None:
+                scores = best
+            else:
+                scores = {i: scores[i] + d for i, d in best.items() if i in scores}
+            if not scores:
+                return []
+        pairs = ((item_id, dist) for item_id, dist in (scores or {}).items())
+        if limit is None:
+            return sorted(pairs, key=_rank)
+        return heapq.nsmallest(limit, pairs, key=_rank)
+
+
+_lock = threading.Lock()
+_cache: dict[str, Any] = {"token": None, "index": None}
+
+
+def get_index() -> FuzzyIndex:
+    """Aktueller Index; wird bei Datenänderungen neu aufgebaut."""
+    conn = db.connection()
+    token = db.data_version(conn)
+    with _lock:
+        if _cache["token"] != token or _cache["index"] is None:
+            rows = conn.execute("SELECT id, name FROM items").fetchall()
+            _cache["index"] = FuzzyIndex(rows)
+            _cache["token"] = token
+        return _cache["index"]
+
+
+def search(text: str, limit: int = 20) -> list[dict]:
+    """Artikel zu ``text`` trotz Tippfehlern, sortiert nach Editierdistanz.
+
+    Jeder Treffer enthält zusätzlich ``distance`` (Summe über alle Suchwörter).
+    """
+    hits = get_index().search(text, limit)
+    if not hits:
+        return []
+    cur = db.connection().cursor()
+    cur.execute(
+        "SELECT * FROM items WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps([item_id for item_id, _ in hits]),),
+    )
+    rows = {row["id"]: dict(row) for row in cur.fetchall()}
+    results = []
+    for item_id, distance in hits:
+        if item_id in rows:
+            rows[item_id]["distance"] = distance
+            results.append(rows[item_id])
+    return results
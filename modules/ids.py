@@ -0,0 +1,138 @@
+"""Vergabe von Artikel-IDs.
+
+Freie IDs unterhalb der höchsten vergebenen ID stehen als Bereiche in
+``item_id_gaps`` (gepflegt per Trigger beim Löschen und Anlegen von
+Artikeln). Die höchste vergebene oder reservierte ID ist der
+``sqlite_sequence``-Eintrag von ``items``. Beides wird per Index gelesen,
+die Vergabe kostet also unabhängig von der Artikelzahl O(log n).
+"""
+from __future__ import annotations
+
+import sqlite3
+
+# Sechsstellige Artikelnummern (siehe Migration v4)
+ID_BASE = 100000
+
+
+def _high_water_mark(cur: sqlite3.Cursor) -> int:
+    cur.execute(
+        """
+        SELECT MAX(
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'items'), 0),
+            COALESCE((SELECT MAX(id) FROM items), 0),
+            ?
+        )
+        """,
+        (ID_BASE - 1,),
+    )
+    return cur.fetchone()[0]
+
+
+def high_water_mark(conn: sqlite3.Connection) -> int:
+    """Höchste vergebene oder reservierte ID (mindestens ``ID_BASE - 1``)."""
+    return _high_water_mark(conn.cursor())
+
+
+def record_gaps_above(conn: sqlite3.Connection, above: int) -> None:
+    """Trägt Lücken oberhalb von ``above`` in ``item_id_gaps`` ein.
+
+    Für Inserts mit expliziten IDs oberhalb der bisherigen Höchstmarke, z. B.
+    beim Zusammenführen von Datenbanken; unterhalb von ``above`` pflegen die
+    Trigger die Lücken bereits.
+    """
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO item_id_gaps (start_id, end_id)
+        SELECT prev_id + 1, id - 1 FROM (
+            SELECT id, COALESCE(LAG(id) OVER (ORDER BY id), ?) AS prev_id
+            FROM items WHERE id > ?
+        )
+        WHERE id > prev_id + 1
+        """,
+        (above, above),
+    )
+
+
+def _set_high_water_mark(cur: sqlite3.Cursor, value: int) -> None:
+    cur.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'items'", (value,))
+    if cur.rowcount == 0:
+        cur.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('items', ?)", (value,))
+
+
+def next_item_id(conn: sqlite3.Connection) -> int:
+    """Kleinste freie ID ab ``ID_BASE``.
+
+    Muss in derselben Schreibtransaktion aufgerufen werden, in der der
+    Artikel angelegt wird; der Insert-Trigger entfernt die ID dann aus
+    ``item_id_gaps``.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT MIN(start_id) FROM item_id_gaps")
+    gap = cur.fetchone()[0]
+    if gap is not None:
+        return gap
+    return _high_water_mark(cur) + 1
+
+
+def reserve_ids(conn: sqlite3.Connection, count: int) -> range:
+    """Reserviert ``count`` aufeinanderfolgende IDs oberhalb aller vergebenen.
+
+    Die Reservierung wird in ``sqlite_sequence`` vermerkt, damit andere
+    Prozesse die IDs nicht erneut vergeben. Läuft bereits eine Transaktion,
+    gilt die Reservierung mit deren Commit; sonst wird sofort committet.
+    """
+    if count <= 0:
+        return range(0)
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        cur = conn.cursor()
+        first = _high_water_mark(cur) + 1
+        _set_high_water_mark(cur, first + count - 1)
+        if own_transaction:
+            conn.commit()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+    return range(first, first + count)
+
+
+def release_ids(conn: sqlite3.Connection, ids: range) -> None:
+    """Gibt nicht benutzte IDs eines reservierten Blocks als Lücke zurück."""
+    if not ids:
+        return
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO item_id_gaps (start_id, end_id) VALUES (?, ?)",
+            (ids.start, ids.stop - 1),
+        )
+
+
+class IdBlock:
+    """Reservierter ID-Block, aus dem nacheinander IDs entnommen werden.
+
+    Für Massenimporte und parallel arbeitende Prozesse: pro Block ist nur
+    eine Reservierung nötig. Nicht verbrauchte IDs gibt :meth:`release`
+    zurück.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, count: int) -> None:
+        self._conn = conn
+        self._ids = reserve_ids(conn, count)
+        self._used = 0
+
+    def __len__(self) -> int:
+        return len(self._ids) - self._used
+
+    def take(self) -> int:
+        if self._used >= len(self._ids):
+            raise ValueError("ID-Block erschöpft")
+        item_id = self._ids[self._used]
+        self._used += 1
+        return item_id
+
+    def release(self) -> None:
+        release_ids(self._conn, self._ids[self._used:])
+        self._used = len(self._ids)
@@ -0,0 +1,175 @@
+"""Massenimport von Artikeln aus CSV- oder JSONL-Dateien.
+
+Die Datei wird zeilenweise gelesen und in Blöcken geschrieben, der
+Speicherbedarf hängt also nur von der Blockgröße ab. Der gesamte Import
+läuft in einer Transaktion über ``inventory.db`` und die angehängte
+``stock.db``; der Volltextindex wird einmal am Ende neu aufgebaut.
+
+Erkannte Spalten: ``name`` (Pflicht), ``kategorie``, ``status``, ``shop``,
+``notiz``, ``datum_bestellt``, ``datum_eingetroffen`` und ``anzahl``
+(Anfangsmenge, erzeugt eine Bestandsbewegung).
+"""
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from . import ids
+from .db import connection
+from .inventory import ItemValidator, VALID_STATUS, cached_validate_date, fts_sync_suspended
+
+BATCH_SIZE = 5000
+
+# Anzahl der Fehlermeldungen, die im Ergebnis aufbewahrt werden
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(path: str | Path) -> str:
+    """``csv`` oder ``jsonl`` anhand der Dateiendung."""
+    suffix = Path(path).suffix.lower()
+    if suffix in {".jsonl", ".ndjson", ".json"}:
+        return "jsonl"
+    return "csv"
+
+
+def iter_records(path: str | Path, fmt: str | None = None) -> Iterator[tuple[int, dict]]:
+    """Liefert ``(zeilennummer, datensatz)`` für jede Zeile der Datei."""
+    fmt = fmt or detect_format(path)
+    with open(path, newline="", encoding="utf-8") as fh:
+        if fmt == "jsonl":
+            for line_no, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield line_no, {"__error__": f"Ungültiges JSON: {exc.msg}"}
+                    continue
+                if not isinstance(record, dict):
+                    record = {"__error__": "Zeile ist kein JSON-Objekt"}
+                yield line_no, record
+        else:
+            reader = csv.DictReader(fh)
+            for record in reader:
+                # Kopfzeile ist Zeile 1
+                yield reader.line_num, record
+
+
+def _text(record: dict, key: str) -> str:
+    value = record.get(key)
+    return "" if value is None else str(value).strip()
+
+
+def _validate(record: dict) -> dict[str, Any]:
+    """Prüft einen Datensatz und liefert die normalisierten Werte."""
+    if "__error__" in record:
+        raise ValueError(record["__error__"])
+    status = _text(record, "status") or "bestellt"
+    if status not in VALID_STATUS:
+        raise ValueError(f"Status muss einer von {VALID_STATUS} sein")
+    anzahl = _text(record, "anzahl")
+    return {
+        "name": ItemValidator.validate_name(_text(record, "name")),
+        "kategorie": _text(record, "kategorie") or "Standard",
+        "status": status,
+        "shop": _text(record, "shop"),
+        "notiz": _text(record, "notiz"),
+        "datum_bestellt": cached_validate_date(_text(record, "datum_bestellt")),
+        "datum_eingetroffen": cached_validate_date(_text(record, "datum_eingetroffen")),
+        "anzahl": ItemValidator.validate_amount(anzahl) if anzahl else 0,
+    }
+
+
+class _CategoryMap:
+    """Kategorienamen -> ID, einmal geladen und bei Bedarf ergänzt."""
+
+    def __init__(self, cur) -> None:
+        self._cur = cur
+        cur.execute("SELECT name, id FROM categories")
+        self._ids = {name: cat_id for name, cat_id in cur.fetchall()}
+
+    def resolve(self, name: str) -> int:
+        cat_id = self._ids.get(name)
+        if cat_id is None:
+            self._cur.execute("INSERT INTO categories (name) VALUES (?)", (name,))
+            cat_id = self._ids[name] = self._cur.lastrowid
+        return cat_id
+
+
+def import_items(
+    records: Iterable[tuple[int, dict]],
+    batch_size: int = BATCH_SIZE,
+) -> dict[str, Any]:
+    """Importiert Datensätze aus :func:`iter_records`.
+
+    Ungültige Zeilen werden übersprungen und gemeldet, ohne den Import
+    abzubrechen. Rückgabe: ``imported``, ``movements``, ``error_count`` und
+    ``errors`` (höchstens ``MAX_REPORTED_ERRORS`` Paare aus Zeile und Meldung).
+    """
+    result: dict[str, Any] = {"imported": 0, "movements": 0, "error_count": 0, "errors": []}
+    conn = connection()
+    with conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        cur = conn.cursor()
+        categories = _CategoryMap(cur)
+        with fts_sync_suspended(conn):
+            batch: list[dict] = []
+            for line_no, record in records:
+                try:
+                    batch.append(_validate(record))
+                except ValueError as exc:
+                    result["error_count"] += 1
+                    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append((line_no, str(exc)))
+                    continue
+                if len(batch) >= batch_size:
+                    _write_batch(cur, categories, batch, result)
+                    batch = []
+            if batch:
+                _write_batch(cur, categories, batch, result)
+    return result
+
+
+def _write_batch(cur, categories: _CategoryMap, batch: list[dict], result: dict) -> None:
+    item_ids = ids.reserve_ids(cur.connection, len(batch))
+    items = []
+    movements = []
+    for item_id, row in zip(item_ids, batch):
+        items.append((
+            item_id,
+            row["name"],
+            row["kategorie"],
+            categories.resolve(row["kategorie"]),
+            row["status"],
+            row["shop"],
+            row["notiz"],
+            row["datum_bestellt"],
+            row["datum_eingetroffen"],
+        ))
+        if row["anzahl"]:
+            # Wie beim interaktiven Anlegen: bestellt -> Bestellung, sonst Eingang
+            if row["status"] == "bestellt":
+                movements.append((item_id, "bestellung", row["anzahl"], row["datum_bestellt"]))
+            else:
+                movements.append((item_id, "eingang", row["anzahl"], row["datum_eingetroffen"]))
+    cur.executemany(
+        """
+        INSERT INTO items (
+            id, name, kategorie, category_id, status, shop,
+            notiz, datum_bestellt, datum_eingetroffen
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        items,
+    )
+    cur.executemany(
+        """
+        INSERT INTO stock.stock_movements (item_id, movement_type, quantity, reference_date, notes)
+        VALUES (?, ?, ?, ?, 'Initiale Menge beim Import')
+        """,
+        movements,
+    )
+    result["imported"] += len(items)
+    result["movements"] += len(movements)
@@ -1,10 +1,17 @@
 """Datenbankoperationen für das CLI-Warenwirtschaftssystem."""
 from __future__ import annotations
 
-from typing import Any, Optional
+import inspect
+import json
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from typing import Any, Iterator, NamedTuple, Optional
 from datetime import datetime
-from . import db
-from .db import get_connection
+from . import db, ids
+from .db import connection
 
 class ItemValidator:
     @staticmethod
@@ -42,6 +49,9 @@ class ItemValidator:
                 continue
         raise ValueError("Datum muss Format YYYY-MM-DD oder DD.MM.YYYY haben")
 
+# Datumsprüfung mit Cache für Massenimporte, in denen sich Daten stark wiederholen
+cached_validate_date = lru_cache(maxsize=4096)(ItemValidator.validate_date)
+
 VALID_STATUS = [
     'bestellt',
     'eingetroffen',
@@ -180,14 +190,14 @@ def add_item_interactive() -> int:
 
 def show_all_items() -> None:
     """Alle Artikel anzeigen."""
-    rows = list_items()
+    # Artikel samt Bestand in einer Abfrage
+    rows = list_items_with_stock()
     if not rows:
         print("Keine Artikel vorhanden")
         return
 
     try:
         from tabulate import tabulate
-        from . import stock
 
         # Formatierte Daten für die Tabelle vorbereiten
         formatted_rows = []
@@ -195,9 +205,6 @@ def show_all_items() -> None:
             # Konvertiere sqlite3.Row in dict für einfacheren Zugriff
             row_dict = dict(zip(row.keys(), row))
             
-            # Hole Bestandsinfo
-            stock_info = stock.get_item_stock(row_dict['id'])
-            
             # Kürze lange Texte
             name = row_dict['name']
             if len(name) > 20:
@@ -211,8 +218,8 @@ def show_all_items() -> None:
                 'ID': f"{row_dict['id']:06d}",
                 'Name': name,
                 'Kategorie': row_dict.get('kategorie', 'N/A'),
-                'Bestand': stock_info['current_stock'],
-                'Bestellt': stock_info['ordered_quantity'],
+                'Bestand': row_dict['current_stock'],
+                'Bestellt': row_dict['ordered_quantity'],
                 'Status': row_dict['status'],
                 'Shop': row_dict.get('shop', '-') or '-',
                 'Notiz': notiz or '-'
@@ -229,17 +236,14 @@ def show_all_items() -> None:
     except ImportError:
         for row in rows:
             row_dict = dict(zip(row.keys(), row))
-            stock_info = stock.get_item_stock(row_dict['id'])
-            print(f"{row_dict['id']:6d} | {row_dict['name'][:20]} | {row_dict['kategorie']} | Bestand: {stock_info['current_stock']} | {row_dict['status']}")
+            print(f"{row_dict['id']:6d} | {row_dict['name'][:20]} | {row_dict['kategorie']} | Bestand: {row_dict['current_stock']} | {row_dict['status']}")
 
 
 def show_item_by_id(item_id: int) -> None:
     """Zeigt alle Informationen zu einem Artikel."""
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT * FROM items WHERE id=?", (item_id,))
     row = cur.fetchone()
-    conn.close()
     if row:
         for key in row.keys():
             print(f"{key}: {row[key]}")
@@ -279,7 +283,7 @@ def update_item(item_id: int) -> None:
         return
 
     try:
-        conn = get_connection()
+        conn = connection()
         cur = conn.cursor()
         
         print("Leer lassen oder '-' eingeben, um Feld unverändert zu lassen.")
@@ -352,59 +356,53 @@ def update_item(item_id: int) -> None:
         notiz = notiz if notiz and notiz != "-" else item.get('notiz', '')
 
         # Update durchführen
-        cur.execute(
-            """
-            UPDATE items SET
-                name = ?,
-                category_id = ?,
-                anzahl = ?,
-                status = ?,
-                shop = ?,
-                notiz = ?,
-                datum_bestellt = ?,
-                datum_eingetroffen = ?
-            WHERE id = ?
-            """,
-            (
-                name,
-                category_id,
-                anzahl,
-                status,
-                shop,
-                notiz,
-                datum_bestellt,
-                datum_eingetroffen,
-                item_id,
-            ),
-        )
-        conn.commit()
+        with conn:
+            conn.execute(
+                """
+                UPDATE items SET
+                    name = ?,
+                    category_id = ?,
+                    anzahl = ?,
+                    status = ?,
+                    shop = ?,
+                    notiz = ?,
+                    datum_bestellt = ?,
+                    datum_eingetroffen = ?
+                WHERE id = ?
+                """,
+                (
+                    name,
+                    category_id,
+                    anzahl,
+                    status,
+                    shop,
+                    notiz,
+                    datum_bestellt,
+                    datum_eingetroffen,
+                    item_id,
+                ),
+            )
         print(f"Artikel {item_id} aktualisiert")
 
     except Exception as e:
         print(f"Fehler beim Aktualisieren: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
 
 
 def remove_item(item_id: int) -> None:
     """Löscht einen Artikel nach Bestätigung."""
-    conn = get_connection()
+    conn = connection()
     cur = conn.cursor()
     cur.execute("SELECT 1 FROM items WHERE id=?", (item_id,))
     row = cur.fetchone()
     if not row:
         print("Artikel nicht gefunden.")
-        conn.close()
         return
     confirm = input(f"Artikel {item_id} wirklich löschen? (y/N) ")
     if confirm.lower() == "y":
-        cur.execute("DELETE FROM items WHERE id=?", (item_id,))
-        conn.commit()
+        remove_item_by_id(item_id)
         print("Artikel gelöscht.")
     else:
         print("Abgebrochen.")
-    conn.close()
 
 
 # --- Backend-Funktionen für die TUI --------------------------------------------
@@ -415,21 +413,283 @@ def list_items(sort_by: str = "id", descending: bool = False) -> list[Any]:
     if sort_by not in allowed:
         sort_by = "id"
     order = "DESC" if descending else "ASC"
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute(f"SELECT * FROM items ORDER BY {sort_by} {order}")
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
+
+
+# Artikel mit Bestandszahlen aus der angehängten Bestandsdatenbank
+_ITEMS_WITH_STOCK = """
+    SELECT items.*,
+        COALESCE(b.current, 0) AS current_stock,
+        COALESCE(b.ordered, 0) AS ordered_quantity,
+        COALESCE(b.used, 0) AS used_quantity,
+        COALESCE(b.defect, 0) AS defect_quantity
+    FROM items
+    LEFT JOIN stock.stock_balances b ON b.item_id = items.id
+"""
+
+
+def list_items_with_stock(sort_by: str = "id", descending: bool = False,
+                          flt: Optional[ItemFilter] = None) -> list[Any]:
+    """Wie :func:`list_items`, zusätzlich mit Bestandsspalten (eine Abfrage).
+
+    ``flt`` schränkt die Liste ein (siehe :class:`ItemFilter`).
+    """
+    allowed = {"id", "name", "status", "kategorie", "anzahl"}
+    if sort_by not in allowed:
+        sort_by = "id"
+    order = "DESC" if descending else "ASC"
+    condition, params = _filter_sql(flt)
+    cur = connection().cursor()
+    cur.execute(f"{_ITEMS_WITH_STOCK} WHERE {condition} ORDER BY items.{sort_by} {order}", params)
+    return cur.fetchall()
+
+
+def count_items(flt: Optional[ItemFilter] = None) -> int:
+    """Anzahl aller (bzw. der von ``flt`` erfassten) Artikel."""
+    condition, params = _filter_sql(flt)
+    cur = connection().cursor()
+    cur.execute(f"SELECT COUNT(*) FROM items WHERE {condition}", params)
+    return cur.fetchone()[0]
+
+
+def list_items_page(after_id: Optional[int], limit: int,
+                    flt: Optional[ItemFilter] = None) -> list[dict]:
+    """Bis zu ``limit`` Artikel mit Bestand nach ID ``after_id`` (Keyset-Paginierung)."""
+    condition, params = _filter_sql(flt)
+    cur = connection().cursor()
+    cur.execute(
+        f"{_ITEMS_WITH_STOCK} WHERE items.id > ? AND {condition} ORDER BY items.id LIMIT ?",
+        [after_id if after_id is not None else -1, *params, limit],
+    )
+    return [dict(row) for row in cur.fetchall()]
+
+
+def item_position(item_id: int, flt: Optional[ItemFilter] = None) -> int:
+    """Position von ``item_id`` in der nach ID sortierten Artikelliste."""
+    condition, params = _filter_sql(flt)
+    cur = connection().cursor()
+    cur.execute(f"SELECT COUNT(*) FROM items WHERE id < ? AND {condition}", [item_id, *params])
+    return cur.fetchone()[0]
+
+
+def item_id_at(position: int, flt: Optional[ItemFilter] = None,
+               anchor: Optional[tuple[int, Optional[int]]] = None) -> Optional[int]:
+    """ID an ``position`` der nach ID sortierten Artikelliste (Umkehrung von :func:`item_position`).
+
+    SQLite kann eine Position nicht über den Index anspringen: ``OFFSET``
+    zählt die Zeilen ab. ``anchor = (position, id)`` ist eine bekannte Stelle
+    (z. B. eine Seitengrenze), ab der vorwärts oder rückwärts gezählt wird;
+    ``(anzahl, None)`` zählt vom Ende der Liste. Ohne ``anchor`` wird ab dem
+    Anfang gezählt.
+    """
+    anchor_position, anchor_id = anchor if anchor is not None else (-1, None)
+    if position < 0:
+        return None
+    if position == anchor_position:
+        return anchor_id
+    if position > anchor_position:
+        op, order, skip = ">", "", position - anchor_position - 1
+    else:
+        op, order, skip = "<", " DESC", anchor_position - position - 1
+    condition, params = _filter_sql(flt)
+    if anchor_id is not None:
+        condition = f"id {op} ? AND {condition}"
+        params = [anchor_id, *params]
+    cur = connection().cursor()
+    cur.execute(
+        f"SELECT id FROM items WHERE {condition} ORDER BY id{order} LIMIT 1 OFFSET ?", [*params, skip]
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+# Stand der Änderungsprotokolle ``(item_changes, stock.balance_changes)``
+ChangeToken = tuple[int, int]
+
+
+def change_token() -> ChangeToken:
+    """Aktueller Stand der Änderungsprotokolle für :func:`changes_since`."""
+    cur = connection().cursor()
+    cur.execute(
+        """
+        SELECT (SELECT COALESCE(MAX(seq), 0) FROM item_changes),
+               (SELECT COALESCE(MAX(seq), 0) FROM stock.balance_changes)
+        """
+    )
+    return tuple(cur.fetchone())
+
+
+def changes_since(token: Optional[ChangeToken],
+                  flt: Optional[ItemFilter] = None) -> tuple[Optional[dict[int, Optional[dict]]], ChangeToken]:
+    """Seit ``token`` geänderte Artikel samt Bestandsspalten.
+
+    Rückgabe: ``{item_id: zeile}`` wie bei :func:`list_items_with_stock`
+    (``None`` für gelöschte oder nicht mehr von ``flt`` erfasste Artikel)
+    und der neue Stand. Ist ``token``
+    ``None`` oder neuer als die Protokolle (z. B. nach einem Import), ist
+    das Ergebnis ``None``: dann muss komplett neu geladen werden.
+    """
+    current = change_token()
+    if token is None or token[0] > current[0] or token[1] > current[1]:
+        return None, current
+    if token == current:
+        return {}, current
+    cur = connection().cursor()
+    cur.execute(
+        """
+        SELECT item_id FROM item_changes WHERE seq > ? AND seq <= ?
+        UNION
+        SELECT item_id FROM stock.balance_changes WHERE seq > ? AND seq <= ?
+        """,
+        (token[0], current[0], token[1], current[1]),
+    )
+    changes: dict[int, Optional[dict]] = {row[0]: None for row in cur.fetchall()}
+    condition, params = _filter_sql(flt)
+    cur.execute(
+        f"{_ITEMS_WITH_STOCK} WHERE items.id IN (SELECT value FROM json_each(?)) AND {condition}",
+        [json.dumps(list(changes)), *params],
+    )
+    for row in cur:
+        changes[row["id"]] = dict(row)
+    return changes, current
+
+
+# Letzte Bewegungen je Artikel (wie stock._HISTORY_SQL, für mehrere Artikel)
+_DETAIL_MOVEMENTS = 10
+
+
+def get_item_details(item_ids) -> dict[int, dict]:
+    """Stammdaten, Bestand und letzte Bewegungen mehrerer Artikel.
+
+    Liefert ``{item_id: zeile}`` wie bei :func:`list_items_with_stock`,
+    zusätzlich ``movements`` (neueste zuerst, wie
+    :func:`stock.get_item_stock`). Nicht vorhandene Artikel fehlen. Zwei
+    Abfragen unabhängig von der Anzahl der Artikel.
+    """
+    ids = json.dumps([int(i) for i in item_ids])
+    cur = connection().cursor()
+    cur.execute(f"{_ITEMS_WITH_STOCK} WHERE items.id IN (SELECT value FROM json_each(?))", (ids,))
+    details = {row["id"]: dict(row, movements=[]) for row in cur.fetchall()}
+    if not details:
+        return details
+    cur.execute(
+        """
+        SELECT item_id, movement_type, quantity, movement_date, reference_date, notes
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY item_id ORDER BY movement_date DESC, id DESC
+            ) AS n
+            FROM stock.stock_movements
+            WHERE item_id IN (SELECT value FROM json_each(?))
+        )
+        WHERE n <= ?
+        ORDER BY item_id, n
+        """,
+        (json.dumps(list(details)), _DETAIL_MOVEMENTS),
+    )
+    for row in cur:
+        movement = dict(row)
+        details[movement.pop("item_id")]["movements"].append(movement)
+    return details
+
+
+class DetailCache:
+    """Artikeldetails (:func:`get_item_details`) für die Detailansicht der TUI.
+
+    :meth:`peek` liest nur den Speicher und ist für die Oberfläche gedacht;
+    :meth:`load` läuft im DB-Thread, prüft zuerst den
+    :func:`db.data_version`-Stand beider Datenbanken (Cache leeren, wenn
+    sich etwas geändert hat) und lädt fehlende Artikel in einer Abfrage
+    nach. Die gelieferten Dictionaries gehören dem Cache und dürfen nicht
+    verändert werden.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, dict] = OrderedDict()
+        self._token: Any = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "invalidations": 0}
+
+    def peek(self, item_id: int) -> Optional[dict]:
+        """Details aus dem Speicher oder ``None``; ohne Datenbankzugriff."""
+        with self._lock:
+            details = self._entries.get(item_id)
+            if details is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(item_id)
+            self._stats["hits"] += 1
+            return details
+
+    def load(self, item_ids) -> dict[int, dict]:
+        """Details für ``item_ids``, fehlende bzw. veraltete werden nachgeladen.
+
+        Gelöschte Artikel fehlen im Ergebnis.
+        """
+        ids = list(dict.fromkeys(int(i) for i in item_ids))
+        token = db.data_version(schemas=("main", db.STOCK_SCHEMA))
+        with self._lock:
+            if token != self._token:
+                if self._entries:
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._token = token
+            missing = [i for i in ids if i not in self._entries]
+        loaded = get_item_details(missing) if missing else {}
+        with self._lock:
+            if self._token == token:
+                if missing:
+                    self._stats["loads"] += 1
+                self._entries.update(loaded)
+                for item_id in ids:
+                    if item_id in self._entries:
+                        self._entries.move_to_end(item_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            result = {i: self._entries.get(i, loaded.get(i)) for i in ids}
+        return {i: details for i, details in result.items() if details is not None}
+
+    def invalidate(self, item_ids=None) -> None:
+        """Einträge (ohne ``item_ids``: alle) verwerfen."""
+        with self._lock:
+            if item_ids is None:
+                self._entries.clear()
+            else:
+                for item_id in item_ids:
+                    self._entries.pop(int(item_id), None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+detail_cache = DetailCache()
+
+def list_low_stock(threshold: int = 5) -> list[dict]:
+    """Artikel mit Bestand <= ``threshold`` samt Stammdaten."""
+    cur = connection().cursor()
+    cur.execute(
+        """
+        SELECT items.id, items.name, items.kategorie, items.status,
+               b.current AS current_stock, b.ordered AS ordered_quantity
+        FROM stock.stock_balances b
+        JOIN items ON items.id = b.item_id
+        WHERE b.current <= ?
+        ORDER BY b.current, items.id
+        """,
+        (threshold,),
+    )
+    return [dict(row) for row in cur.fetchall()]
 
 
 def get_item(item_id: int) -> Optional[dict[str, Any]]:
     """Liefert einen Artikel als Dictionary oder ``None``."""
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT * FROM items WHERE id=?", (item_id,))
     row = cur.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
@@ -440,24 +700,9 @@ def add_item(data: dict) -> int:
     elif data["status"] not in VALID_STATUS:
         raise ValueError(f"Status muss einer von {VALID_STATUS} sein")
 
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        # Ermittele freie ID (kleinste Lccke ab 1, sonst max+1)
-        cur.execute("SELECT id FROM items ORDER BY id")
-        existing_ids = [row[0] for row in cur.fetchall()]
-        if not existing_ids:
-            next_id = 1
-        else:
-            expected = 1
-            next_id = None
-            for rid in existing_ids:
-                if rid > expected:
-                    next_id = expected
-                    break
-                expected = rid + 1
-            if next_id is None:
-                next_id = existing_ids[-1] + 1
+    conn = connection()
+    with conn:
+        cur = conn.cursor()
         # Prüfe/Setze Kategorie
         if not data.get("category_id"):
             # Standardkategorie
@@ -499,6 +744,12 @@ def add_item(data: dict) -> int:
                 except ValueError:
                     raise ValueError(f"Ungültiges Datumsformat für {date_field}")
 
+        # Schreibsperre vor der ID-Vergabe, damit parallele Prozesse nicht
+        # dieselbe freie ID erhalten
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        # Ermittele freie ID (kleinste Lücke ab 100000, sonst nächste freie)
+        next_id = ids.next_item_id(conn)
         cur.execute(
             """
             INSERT INTO items (
@@ -519,19 +770,14 @@ def add_item(data: dict) -> int:
             ),
         )
         
-        item_id = next_id
-        conn.commit()
-        return item_id
-
-    finally:
-        conn.close()
+        return next_id
 
 
 def update_item_fields(item_id: int, data: dict[str, Any]) -> None:
     """Aktualisiert die angegebenen Felder eines Artikels."""
     if not data:
         return
-    conn = get_connection()
+    conn = connection()
     cur = conn.cursor()
     fields = []
     values: list[Any] = []
@@ -559,152 +805,724 @@ def update_item_fields(item_id: int, data: dict[str, Any]) -> None:
         fields.append(f"{key}=?")
         values.append(value)
     values.append(item_id)
-    cur.execute(f"UPDATE items SET {', '.join(fields)} WHERE id=?", values)
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(f"UPDATE items SET {', '.join(fields)} WHERE id=?", values)
 
 
 def remove_item_by_id(item_id: int) -> None:
-    """Löscht einen Artikel anhand seiner ID."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM items WHERE id=?", (item_id,))
-    conn.commit()
-    conn.close()
+    """Löscht einen Artikel samt Bewegungen und Saldo in einer Transaktion.
 
+    Die ID wird wiederverwendet (:mod:`modules.ids`); ohne die Bestandsdaten
+    zu löschen, erbte der nächste neue Artikel Bestand und Historie.
+    """
+    conn = connection()
+    with conn:
+        conn.execute("DELETE FROM items WHERE id=?", (item_id,))
+        conn.execute("DELETE FROM stock.stock_movements WHERE item_id=?", (item_id,))
+        conn.execute("DELETE FROM stock.stock_balances WHERE item_id=?", (item_id,))
 
-def search_items(search_term: str) -> list[dict]:
-    """Full-text search with FTS5 and LIKE fallback."""
-    if not search_term.strip():
-        return list_items()
-
-    # Try FTS first
-    fts_results = search_items_fts(search_term)
-    if fts_results:
-        return fts_results
 
-    # Fallback to LIKE search
-    return search_items_like(search_term)
+# Volltext-Indizes über ``items``; ihre Sync-Trigger heißen ``<tabelle>_*``
+FTS_TABLES = ("items_fts", "items_trgm")
 
+# Kürzere Suchbegriffe kann der Trigramm-Index nicht beantworten
+TRIGRAM_MIN_LENGTH = 3
 
-def search_items_fts(search_term: str) -> list[dict]:
-    """Advanced FTS5 search with ranking."""
-    conn = get_connection()
-    cur = conn.cursor()
 
-    escaped_term = search_term.replace('"', '""')
+@contextmanager
+def fts_sync_suspended(conn):
+    """Setzt die FTS-Sync-Trigger für einen Massenimport aus.
 
-    try:
+    Muss innerhalb einer Transaktion von ``conn`` verwendet werden: die
+    Trigger werden gelöscht und am Ende wiederhergestellt, danach wird jeder
+    Index einmal komplett neu aufgebaut statt pro Zeile gepflegt. Da alles in
+    derselben Transaktion passiert, sehen andere Verbindungen die Trigger nie
+    fehlen.
+    """
+    cur = conn.cursor()
+    triggers = []
+    for table in FTS_TABLES:
         cur.execute(
             """
-            SELECT items.*, items_fts.rank
-            FROM items_fts 
-            JOIN items ON items.id = items_fts.rowid
-            WHERE items_fts MATCH ?
-            ORDER BY items_fts.rank
-            LIMIT 50
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'trigger' AND tbl_name = 'items' AND name GLOB ?
             """,
-            (escaped_term,),
+            (f"{table}_*",),
         )
-        results = cur.fetchall()
+        triggers.extend(cur.fetchall())
+    for name, _ in triggers:
+        cur.execute(f'DROP TRIGGER "{name}"')
+    try:
+        yield
+    finally:
+        for _, sql in triggers:
+            cur.execute(sql)
+    for table in FTS_TABLES:
+        cur.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+# --- Suchsyntax -----------------------------------------------------------------
+#
+# Begriffe, "Phrasen", Präfixe (mikro*), OR/AND/NOT, Klammern und Feldfilter
+# (kategorie:MCU, shop:"Reichelt Elektronik"). Volltextfelder werden zu
+# FTS5-Spaltenfiltern, strukturierte Felder (status:) zu SQL-Bedingungen.
+# Steht ein strukturiertes Feld in einer Gruppe, unter OR oder NOT, wird der
+# ganze Teilausdruck zu SQL; Volltextteile darin werden zu Unterabfragen.
+# Jeder Begriff wird als FTS5-String quotiert; die erzeugte Anfrage ist
+# daher immer gültig, auch bei unausgeglichenen Anführungszeichen/Klammern.
+
+FTS_FIELDS = ("name", "kategorie", "shop", "notiz")
+
+# Feld -> Spalte
+STRUCTURED_FIELDS = {"status": "items.status"}
+
+_OPERATORS = ("OR", "AND", "NOT")
+_FIELD_RE = re.compile(r"(\w+):(?=[^\s)])")
+_WORD_RE = re.compile(r'[^\s()"]+')
+
+
+class CompiledQuery(NamedTuple):
+    """Ergebnis von :func:`compile_query`."""
+
+    match: Optional[str]
+    """FTS5-Ausdruck für ``items_fts MATCH`` oder ``None``."""
+    exclude: Optional[str]
+    """FTS5-Ausdruck für auszuschließende Artikel (nur bei reinem ``NOT``)."""
+    where: tuple[str, ...]
+    """SQL-Bedingungen; Volltext-Unterabfragen darin über :meth:`conditions` einsetzen."""
+    params: tuple[Any, ...]
+
+    @property
+    def empty(self) -> bool:
+        return self.match is None and self.exclude is None and not self.where
+
+    def conditions(self, fts: str, rowid: str) -> list[str]:
+        """``where`` für die Volltexttabelle ``fts`` (ggf. mit Schema), deren
+        ``rowid`` der Spalte ``rowid`` des Aufrufers entspricht."""
+        return [
+            condition.format(rowid=rowid, fts=fts, fts_name=fts.rpartition(".")[2])
+            for condition in self.where
+        ]
+
+
+def _tokenize(text: str, fields: tuple[str, ...]) -> list[tuple]:
+    tokens: list[tuple] = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+            continue
+        if c in "()":
+            tokens.append((c,))
+            i += 1
+            continue
+        field = None
+        m = _FIELD_RE.match(text, i)
+        if m and m.group(1).lower() in fields:
+            field = m.group(1).lower()
+            i = m.end()
+            c = text[i]
+        if c == '"':
+            end = text.find('"', i + 1)
+            if end < 0:
+                end = n
+            value = text[i + 1:end]
+            i = end + 1
+            prefix = i < n and text[i] == "*"
+            if prefix:
+                i += 1
+        elif c == "(":
+            # Feldfilter vor einer Gruppe gilt für die ganze Gruppe
+            tokens.append(("(", field))
+            i += 1
+            continue
+        else:
+            value = _WORD_RE.match(text, i).group()
+            i += len(value)
+            if field is None and value in _OPERATORS:
+                tokens.append(("op", value))
+                continue
+            # Freie Wörter immer als Präfix, Feldwerte nur mit *
+            prefix = value.endswith("*") or field is None
+            value = value.rstrip("*")
+        tokens.append(("term", value, prefix, field))
+    return tokens
+
+
+class _Parser:
+    """Rekursiver Abstieg: OR < AND (auch implizit) < NOT."""
+
+    def __init__(self, tokens: list[tuple]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[tuple]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse(self) -> Optional[tuple]:
+        parts = []
+        while self.pos < len(self.tokens):
+            node = self.parse_or(None)
+            if node is not None:
+                parts.append(node)
+            if self.peek() == (")",):
+                # Überzählige schließende Klammer
+                self.pos += 1
+        return _and(parts)
+
+    def parse_or(self, field: Optional[str]) -> Optional[tuple]:
+        parts = [self.parse_and(field)]
+        while self.peek() == ("op", "OR"):
+            self.pos += 1
+            parts.append(self.parse_and(field))
+        parts = [part for part in parts if part is not None]
+        if len(parts) > 1:
+            return ("or", parts)
+        return parts[0] if parts else None
+
+    def parse_and(self, field: Optional[str]) -> Optional[tuple]:
+        parts = []
+        while True:
+            token = self.peek()
+            if token is None or token == (")",) or token == ("op", "OR"):
+                break
+            if token == ("op", "AND"):
+                self.pos += 1
+                continue
+            node = self.parse_not(field)
+            if node is not None:
+                parts.append(node)
+        return _and(parts)
+
+    def parse_not(self, field: Optional[str]) -> Optional[tuple]:
+        if self.peek() == ("op", "NOT"):
+            self.pos += 1
+            operand = self.parse_not(field)
+            if operand is None:
+                return None
+            # Doppelte Verneinung aufheben ("NOT NOT esp" ist "esp")
+            return operand[1] if operand[0] == "not" else ("not", operand)
+        token = self.peek()
+        if token is None or token[0] == "op":
+            return None
+        self.pos += 1
+        if token[0] == "(":
+            node = self.parse_or(token[1] if len(token) > 1 and token[1] else field)
+            if self.peek() == (")",):
+                self.pos += 1
+            return node
+        _, value, prefix, own_field = token
+        return ("term", value, prefix, own_field or field)
+
+
+def _and(parts: list) -> Optional[tuple]:
+    if len(parts) > 1:
+        return ("and", parts)
+    return parts[0] if parts else None
+
+
+def _emit(node: tuple, structured: dict[str, str]) -> Optional[str]:
+    """FTS5-Ausdruck für ``node``; ``None`` wenn nicht darstellbar/leer."""
+    kind = node[0]
+    if kind == "term":
+        _, value, prefix, field = node
+        if not value or field in structured:
+            return None
+        phrase = '"' + value.replace('"', '""') + '"' + ("*" if prefix else "")
+        return f"{field} : {phrase}" if field else phrase
+    if kind == "or":
+        parts = [p for p in (_emit(child, structured) for child in node[1]) if p is not None]
+        if not parts:
+            return None
+        return " OR ".join(f"({p})" for p in parts) if len(parts) > 1 else parts[0]
+    if kind == "and":
+        positive = [_emit(c, structured) for c in node[1] if c[0] != "not"]
+        negative = [_emit(c[1], structured) for c in node[1] if c[0] == "not"]
+        positive = [p for p in positive if p is not None]
+        if not positive:
+            # FTS5 kennt kein alleinstehendes NOT
+            return None
+        expr = " AND ".join(f"({p})" for p in positive) if len(positive) > 1 else positive[0]
+        for neg in negative:
+            if neg is not None:
+                expr = f"({expr}) NOT ({neg})"
+        return expr
+    return None
+
+
+# Volltext-Teilausdruck innerhalb einer SQL-Bedingung, siehe CompiledQuery.conditions
+_FTS_SUBQUERY = "{rowid} IN (SELECT rowid FROM {fts} WHERE {fts_name} MATCH ?)"
+
+
+def _has_structured(node: tuple, structured: dict[str, str]) -> bool:
+    if node[0] == "term":
+        return node[3] in structured
+    if node[0] == "not":
+        return _has_structured(node[1], structured)
+    return any(_has_structured(child, structured) for child in node[1])
+
+
+def _sql(node: tuple, structured: dict[str, str]) -> Optional[tuple[str, list[Any]]]:
+    """SQL-Bedingung und Parameter für ``node``; ``None`` wenn leer."""
+    kind = node[0]
+    if kind == "term" and node[3] in structured:
+        _, value, prefix, field = node
+        if prefix:
+            return f"{structured[field]} LIKE ?", [value.replace("%", "").replace("_", "") + "%"]
+        return f"{structured[field]} = ?", [value]
+    if not _has_structured(node, structured):
+        match = _emit(node, structured)
+        if match is not None:
+            return _FTS_SUBQUERY, [match]
+        if kind == "term":
+            return None
+    if kind == "not":
+        operand = _sql(node[1], structured)
+        return (f"NOT ({operand[0]})", operand[1]) if operand is not None else None
+    parts = [part for part in (_sql(child, structured) for child in node[1]) if part is not None]
+    if not parts:
+        return None
+    joiner = " OR " if kind == "or" else " AND "
+    params = [param for _, part_params in parts for param in part_params]
+    return joiner.join(f"({sql})" for sql, _ in parts), params
+
+
+@lru_cache(maxsize=512)
+def compile_query(
+    text: str,
+    fields: tuple[str, ...] = FTS_FIELDS,
+    structured: tuple[tuple[str, str], ...] = tuple(STRUCTURED_FIELDS.items()),
+) -> CompiledQuery:
+    """Übersetzt eine Suchanfrage in FTS5-Ausdruck und SQL-Filter.
+
+    ``fields`` sind die FTS-Spalten für Feldfilter, ``structured`` ordnet
+    strukturierten Feldern ihre SQL-Spalte zu (Standard: Artikelsuche).
+    """
+    columns = dict(structured)
+    root = _Parser(_tokenize(text, fields + tuple(columns))).parse()
+    if root is None:
+        return CompiledQuery(None, None, (), ())
+    conjuncts = root[1] if root[0] == "and" else [root]
+    where: list[str] = []
+    params: list[Any] = []
+    rest = []
+    for node in conjuncts:
+        negated = node[0] == "not"
+        term = node[1] if negated else node
+        if term[0] == "term" and term[3] in columns:
+            column = columns[term[3]]
+            if term[2]:
+                where.append(f"{column} {'NOT LIKE' if negated else 'LIKE'} ?")
+                params.append(term[1].replace("%", "").replace("_", "") + "%")
+            else:
+                where.append(f"{column} {'<>' if negated else '='} ?")
+                params.append(term[1])
+            continue
+        if _has_structured(node, columns):
+            # Strukturiertes Feld in Gruppe/OR/NOT: ganzer Teilausdruck als SQL
+            condition = _sql(node, columns)
+            if condition is not None:
+                where.append(condition[0])
+                params.extend(condition[1])
+            continue
+        rest.append(node)
+    match = exclude = None
+    if rest:
+        match = _emit(_and(rest) if len(rest) > 1 else ("and", rest), columns)
+        if match is None:
+            negative = [_emit(n[1], columns) for n in rest if n[0] == "not"]
+            negative = [n for n in negative if n is not None]
+            if negative:
+                exclude = " OR ".join(f"({n})" for n in negative) if len(negative) > 1 else negative[0]
+    return CompiledQuery(match, exclude, tuple(where), tuple(params))
+
+
+class ItemFilter(NamedTuple):
+    """Filter der Artikelliste (TUI): Suchanfrage, Kategorie und Status.
+
+    ``text`` nutzt die Suchsyntax von :func:`compile_query`; freie Wörter
+    sind Präfixe, sodass die Liste schon während der Eingabe passt.
+    """
 
-        if not results and not any(op in search_term for op in ['"', '*', 'OR', 'AND']):
-            wildcard_term = f"{escaped_term}*"
-            cur.execute(
-                """
-                SELECT items.*, items_fts.rank
-                FROM items_fts 
-                JOIN items ON items.id = items_fts.rowid
-                WHERE items_fts MATCH ?
-                ORDER BY items_fts.rank
-                LIMIT 50
-                """,
-                (wildcard_term,),
-            )
-            results = cur.fetchall()
+    text: str = ""
+    category_id: Optional[int] = None
+    status: str = ""
 
-    except Exception:
-        results = []
+    @property
+    def empty(self) -> bool:
+        return not self.text.strip() and self.category_id is None and not self.status
 
-    conn.close()
-    return [dict(row) for row in results]
 
+def _filter_sql(flt: Optional[ItemFilter]) -> tuple[str, list[Any]]:
+    """Bedingung über ``items`` und Parameter für ``flt`` (``"1"`` ohne Filter)."""
+    if flt is None or flt.empty:
+        return "1", []
+    conditions: list[str] = []
+    params: list[Any] = []
+    query = compile_query(flt.text)
+    if query.match is not None:
+        conditions.append("items.id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+        params.append(query.match)
+    elif query.exclude is not None:
+        conditions.append("items.id NOT IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+        params.append(query.exclude)
+    conditions.extend(query.conditions("items_fts", "items.id"))
+    params.extend(query.params)
+    if flt.category_id is not None:
+        conditions.append("items.category_id = ?")
+        params.append(flt.category_id)
+    if flt.status:
+        conditions.append("items.status = ?")
+        params.append(flt.status)
+    return " AND ".join(conditions) or "1", params
+
+
+# Einträge pro Seite, wenn nichts anderes angegeben ist
+SEARCH_PAGE_SIZE = 50
+
+
+class SearchCache:
+    """LRU-Cache für Suchergebnisse, gültig bis zur nächsten Datenänderung.
+
+    Alle Einträge gehören zu einem :func:`db.data_version`-Stand; ändert er
+    sich, wird der Cache geleert. Verdrängt wird nach Anzahl der Einträge
+    und nach Gesamtzahl der zwischengespeicherten Zeilen.
+    """
 
-def search_items_like(search_term: str) -> list[dict]:
-    """Fallback LIKE search (original implementation)."""
-    conn = get_connection()
-    cur = conn.cursor()
-    pattern = f"%{search_term}%"
-    cur.execute(
-        """
-        SELECT * FROM items
-        WHERE name LIKE ? OR kategorie LIKE ? OR status LIKE ?
-           OR notiz LIKE ? OR shop LIKE ?
-        ORDER BY id
-        """,
-        (pattern, pattern, pattern, pattern, pattern),
-    )
-    rows = cur.fetchall()
-    conn.close()
+    def __init__(self, max_entries: int = 256, max_rows: int = 20000) -> None:
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()
+        self._rows = 0
+        self._token: Any = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: tuple, compute, size=len):
+        token = db.data_version()
+        with self._lock:
+            if token != self._token:
+                if self._entries:
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._rows = 0
+                self._token = token
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+        value = compute()
+        rows = size(value)
+        with self._lock:
+            if self._token == token and rows <= self.max_rows:
+                self._entries[key] = (value, rows)
+                self._rows += rows
+                while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._rows -= evicted
+                    self._stats["evictions"] += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), rows=self._rows)
+
+
+search_cache = SearchCache()
+
+
+def _cached_search(size, copy):
+    """Ergebnisse von ``func`` in :data:`search_cache` ablegen.
+
+    Schlüssel sind Funktionsname und alle Argumente (Standardwerte ergänzt,
+    Leerraum im Suchtext normalisiert). ``copy`` liefert für jeden Aufruf
+    eine eigene Kopie, damit Aufrufer den Cache nicht verändern.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = list(bound.arguments.values())
+            values[0] = " ".join(values[0].split())
+            key = (func.__name__, *values)
+            return copy(search_cache.get(key, lambda: func(*values), size))
+        return wrapper
+    return decorator
+
+
+def _copy_rows(rows: list[dict]) -> list[dict]:
     return [dict(row) for row in rows]
 
 
+def _copy_page(page: tuple[list[dict], Optional[str]]) -> tuple[list[dict], Optional[str]]:
+    return _copy_rows(page[0]), page[1]
+
+
+def search_cache_stats() -> dict[str, int]:
+    """Treffer/Fehlzugriffe, Verdrängungen und Größe des Such-Caches."""
+    return search_cache.stats()
+
+
+def search_items(search_term: str) -> list[dict]:
+    """Volltextsuche; ohne Treffer Teilstring-Suche über den Trigramm-Index."""
+    if not search_term.strip():
+        return list_items()
+    return list(iter_search(search_term))
+
+
+def _fts_parts(query: CompiledQuery) -> tuple[str, list[Any], Optional[str]]:
+    """``FROM ... WHERE ...``, Parameter und Rang-Ausdruck einer Volltextsuche."""
+    params = list(query.params)
+    if query.match is not None:
+        sql = """
+            FROM items_fts
+            JOIN items ON items.id = items_fts.rowid
+            WHERE items_fts MATCH ?
+        """
+        params.insert(0, query.match)
+        rank = "items_fts.rank"
+    else:
+        sql = "FROM items WHERE 1"
+        if query.exclude is not None:
+            sql += " AND items.id NOT IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)"
+            params.insert(0, query.exclude)
+        rank = None
+    for condition in query.conditions("items_fts", "items.id"):
+        sql += f" AND {condition}"
+    return sql, params, rank
+
+
+def _substring_parts(search_term: str) -> tuple[str, list[Any], None]:
+    """Wie :func:`_fts_parts` für die Teilstring-Suche (ohne Ranking)."""
+    if len(search_term) >= TRIGRAM_MIN_LENGTH:
+        sql = """
+            FROM items_trgm
+            JOIN items ON items.id = items_trgm.rowid
+            WHERE items_trgm MATCH ?
+        """
+        return sql, ['"' + search_term.replace('"', '""') + '"'], None
+    pattern = f"%{search_term}%"
+    sql = """
+        FROM items
+        WHERE (name LIKE ? OR kategorie LIKE ? OR status LIKE ?
+           OR notiz LIKE ? OR shop LIKE ?)
+    """
+    return sql, [pattern] * 5, None
+
+
+def _page(parts: tuple[str, list[Any], Optional[str]], limit: int,
+          after: Optional[tuple[float, int]]) -> tuple[list[dict], Optional[tuple[float, int]]]:
+    """Eine Seite nach ``(rang, id)``; liefert Zeilen und Schlüssel der letzten."""
+    sql, params, rank = parts
+    params = list(params)
+    if rank is None:
+        # Ohne Ranking genügt die ID als Schlüssel
+        sql = f"SELECT items.*, 0 AS rank {sql}"
+        if after is not None:
+            sql += " AND items.id > ?"
+            params.append(after[1])
+        sql += " ORDER BY items.id LIMIT ?"
+    else:
+        sql = f"SELECT items.*, {rank} AS rank {sql}"
+        if after is not None:
+            sql += f" AND ({rank}, items.id) > (?, ?)"
+            params.extend(after)
+        sql += f" ORDER BY {rank}, items.id LIMIT ?"
+    params.append(limit + 1)
+    cur = connection().cursor()
+    cur.execute(sql, params)
+    rows = [dict(row) for row in cur.fetchall()]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1]["rank"], rows[-1]["id"])
+
+
+def _encode_cursor(kind: str, key: Optional[tuple[float, int]]) -> Optional[str]:
+    if key is None:
+        return None
+    return f"{kind}:{key[0]!r}:{key[1]}"
+
+
+def _decode_cursor(cursor: str) -> tuple[str, tuple[float, int]]:
+    try:
+        kind, rank, item_id = cursor.split(":")
+        if kind not in ("f", "s"):
+            raise ValueError
+        return kind, (float(rank), int(item_id))
+    except ValueError:
+        raise ValueError(f"Ungültiger Cursor: {cursor}")
+
+
+@_cached_search(size=lambda page: len(page[0]), copy=_copy_page)
+def search_page(search_term: str, limit: int = SEARCH_PAGE_SIZE,
+                after: Optional[str] = None) -> tuple[list[dict], Optional[str]]:
+    """Eine Seite der Suche, sortiert nach Rang und ID (Keyset-Paginierung).
+
+    ``after`` ist der Cursor der vorherigen Seite. Rückgabe: Treffer und
+    Cursor der nächsten Seite (``None`` auf der letzten Seite). Findet die
+    Volltextsuche nichts, wird wie bei :func:`search_items` die
+    Teilstring-Suche verwendet.
+    """
+    if limit < 1:
+        raise ValueError("Limit muss mindestens 1 sein")
+    kind, key = _decode_cursor(after) if after else ("f", None)
+    if kind == "f":
+        query = compile_query(search_term)
+        if not query.empty:
+            rows, next_key = _page(_fts_parts(query), limit, key)
+            if rows or key is not None:
+                return rows, _encode_cursor("f", next_key)
+        key = None
+    rows, next_key = _page(_substring_parts(search_term), limit, key)
+    return rows, _encode_cursor("s", next_key)
+
+
+@_cached_search(size=lambda total: 1, copy=int)
+def count_search(search_term: str) -> int:
+    """Anzahl aller Treffer von :func:`search_page` (ohne Ranking)."""
+    cur = connection().cursor()
+    query = compile_query(search_term)
+    if not query.empty:
+        sql, params, _ = _fts_parts(query)
+        cur.execute(f"SELECT COUNT(*) {sql}", params)
+        total = cur.fetchone()[0]
+        if total:
+            return total
+    sql, params, _ = _substring_parts(search_term)
+    cur.execute(f"SELECT COUNT(*) {sql}", params)
+    return cur.fetchone()[0]
+
+
+def iter_search(search_term: str, page_size: int = 200,
+                after: Optional[str] = None) -> Iterator[dict]:
+    """Alle Treffer seitenweise als Generator; hält nur eine Seite im Speicher."""
+    while True:
+        rows, after = search_page(search_term, page_size, after)
+        yield from rows
+        if after is None:
+            return
+
+
+# Spalten, die :func:`search_prefix` liefert (genug für eine Trefferliste)
+PREFIX_COLUMNS = ("id", "name", "kategorie", "status")
+
+
+@_cached_search(size=len, copy=_copy_rows)
+def search_prefix(text: str, limit: int = 20) -> list[dict]:
+    """Schnelle Suche während der Eingabe, z. B. für das TUI-Suchfeld.
+
+    Jedes Wort ist ein Präfix (``esp wro`` findet ``ESP32-WROOM``) und wird
+    über die Präfixindizes von ``items_fts`` beantwortet. Die Treffer kommen
+    in ID-Reihenfolge statt nach Rang: so bricht FTS5 nach ``limit`` Treffern
+    ab, statt bei kurzen Präfixen alle Treffer zu bewerten.
+    """
+    query = compile_query(text)
+    if query.empty:
+        return []
+    columns = ", ".join(f"items.{col}" for col in PREFIX_COLUMNS)
+    cur = connection().cursor()
+    if query.match is None:
+        # Nur Feldfilter/NOT: ohne Präfixindex, aber mit denselben Treffern
+        sql, params, _ = _fts_parts(query)
+        cur.execute(f"SELECT {columns} {sql} ORDER BY items.id LIMIT ?", (*params, limit))
+        return [dict(row) for row in cur.fetchall()]
+    sql = f"""
+        SELECT {columns} FROM items_fts
+        JOIN items ON items.id = items_fts.rowid
+        WHERE items_fts MATCH ?
+    """
+    for condition in query.conditions("items_fts", "items.id"):
+        sql += f" AND {condition}"
+    sql += " ORDER BY items_fts.rowid LIMIT ?"
+    cur.execute(sql, (query.match, *query.params, limit))
+    return [dict(row) for row in cur.fetchall()]
+
+
+def search_items_fts(search_term: str, limit: int = SEARCH_PAGE_SIZE) -> list[dict]:
+    """Volltextsuche mit Ranking, siehe :func:`compile_query` für die Syntax.
+
+    Einfache Begriffe werden als Präfix gesucht (``ESP`` findet ``ESP32``).
+    Liefert die ersten ``limit`` Treffer; weitere über :func:`search_page`.
+    """
+    query = compile_query(search_term)
+    if query.empty:
+        return []
+    return _page(_fts_parts(query), limit, None)[0]
+
+
+def search_items_like(search_term: str, limit: Optional[int] = None) -> list[dict]:
+    """Teilstring-Suche über Name, Kategorie, Status, Notiz und Shop.
+
+    Ab drei Zeichen wird der Trigramm-Index ``items_trgm`` verwendet (gleiche
+    Treffer wie ``LIKE '%begriff%'``), kürzere Begriffe durchsuchen die
+    Tabelle.
+    """
+    sql, params, _ = _substring_parts(search_term)
+    sql = f"SELECT items.* {sql} ORDER BY items.id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    cur = connection().cursor()
+    cur.execute(sql, params)
+    return [dict(row) for row in cur.fetchall()]
+
+
 def get_items_by_filter(kategorie: str | None = None, status: str | None = None) -> list[dict]:
-    """Gefilterte Artikelliste"""
-    conn = get_connection()
-    cur = conn.cursor()
+    """Gefilterte Artikelliste inklusive Bestandsspalten"""
+    cur = connection().cursor()
     where = []
     params: list[Any] = []
     if kategorie:
-        where.append("kategorie = ?")
+        where.append("items.kategorie = ?")
         params.append(kategorie)
     if status:
-        where.append("status = ?")
+        where.append("items.status = ?")
         params.append(status)
     where_clause = " AND ".join(where)
     if where_clause:
         where_clause = "WHERE " + where_clause
     cur.execute(
-        f"SELECT * FROM items {where_clause} ORDER BY id",
+        f"{_ITEMS_WITH_STOCK} {where_clause} ORDER BY items.id",
         params,
     )
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return [dict(row) for row in cur.fetchall()]
 
 
 def list_categories() -> list[dict]:
     """Alle Kategorien laden."""
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute("SELECT id, name FROM categories ORDER BY name")
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return [dict(row) for row in cur.fetchall()]
 
 
 def add_category(name: str) -> int:
     """Neue Kategorie anlegen und ID zurückgeben."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO categories (name) VALUES (?)", (name,))
-    conn.commit()
-    cat_id = cur.lastrowid
-    conn.close()
-    return cat_id
+    conn = connection()
+    with conn:
+        cur = conn.execute("INSERT INTO categories (name) VALUES (?)", (name,))
+    return cur.lastrowid
 
 
 def get_category_items(category_id: int) -> list[dict]:
     """Gibt eine Liste von Artikeln zurück, die einer Kategorie zugeordnet sind."""
-    conn = get_connection()
-    cur = conn.cursor()
+    cur = connection().cursor()
     cur.execute(
         "SELECT id, name FROM items WHERE category_id = ? ORDER BY id",
         (category_id,),
     )
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return [dict(row) for row in cur.fetchall()]
 
 
 def delete_category(category_id: int) -> None:
@@ -720,8 +1538,6 @@ def delete_category(category_id: int) -> None:
         raise ValueError(
             f"Kategorie kann nicht gelöscht werden, da noch {len(items)} Artikel verknüpft sind: {names}{more}"
         )
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM categories WHERE id=?", (category_id,))
-    conn.commit()
-    conn.close()
+    conn = connection()
+    with conn:
+        conn.execute("DELETE FROM categories WHERE id=?", (category_id,))
@@ -0,0 +1,224 @@
+"""Zusammenführen einer fremden Inventardatenbank mit der eigenen.
+
+Die Quelle wird angehängt und mit mengenbasierten ``INSERT ... SELECT``
+übernommen, alles in einer Transaktion:
+
+* Kategorien werden über den Namen zusammengeführt.
+* Artikel behalten ihre ID, sofern sie hier frei ist, d. h. oberhalb der
+  Höchstmarke liegt oder in ``item_id_gaps`` eingetragen ist; alle anderen
+  (vergebene, reservierte und alte IDs unter ``ids.ID_BASE``) erhalten
+  neue IDs aus einem reservierten Block. Die Zuordnung steht in
+  ``temp.merge_id_map``.
+* Bestandsbewegungen kommen aus der Bestandsdatei der Quelle (Standard:
+  ``<quelle>_stock.db`` wie bei :mod:`modules.backup`) oder aus einer
+  alten Quelle mit ``stock_movements`` in der Inventardatei.
+
+Der Volltextindex wird am Ende einmal neu aufgebaut.
+"""
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Any, Optional
+
+from . import ids
+from .backup import stock_backup_path
+from .db import STOCK_SCHEMA, connection
+from .inventory import fts_sync_suspended
+
+SOURCE_SCHEMA = "merge_src"
+SOURCE_STOCK_SCHEMA = "merge_stock"
+
+# Spalten, die aus der Quelle übernommen werden (``category_id`` wird neu zugeordnet)
+ITEM_COLUMNS = (
+    "name", "kategorie", "anzahl", "status", "shop", "notiz",
+    "datum_bestellt", "datum_eingetroffen",
+)
+
+MOVEMENT_COLUMNS = ("movement_type", "quantity", "movement_date", "reference_date", "notes")
+
+
+def _tables(conn: sqlite3.Connection, schema: str) -> set[str]:
+    return {
+        row[0]
+        for row in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")
+    }
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")}
+
+
+def _check_source(conn: sqlite3.Connection) -> None:
+    if "items" not in _tables(conn, SOURCE_SCHEMA):
+        raise ValueError("Ungültige Datenbankdatei: Tabelle items fehlt")
+    missing = set(ITEM_COLUMNS) - _columns(conn, SOURCE_SCHEMA, "items")
+    if missing:
+        raise ValueError(f"Ungültige Datenbankdatei: Spalten fehlen: {', '.join(sorted(missing))}")
+
+
+def _movement_source(conn: sqlite3.Connection) -> Optional[str]:
+    """Schema, aus dem Bewegungen übernommen werden, oder ``None``."""
+    for schema in (SOURCE_STOCK_SCHEMA, SOURCE_SCHEMA):
+        try:
+            tables = _tables(conn, schema)
+        except sqlite3.OperationalError:
+            continue
+        if "stock_movements" in tables:
+            return schema
+    return None
+
+
+def _insert_items(cur: sqlite3.Cursor, where: str, params: tuple = ()) -> int:
+    columns = ", ".join(ITEM_COLUMNS)
+    source_columns = ", ".join(f"s.{col}" for col in ITEM_COLUMNS)
+    cur.execute(
+        f"""
+        INSERT INTO main.items (id, category_id, {columns})
+        SELECT m.new_id, c.id, {source_columns}
+        FROM {SOURCE_SCHEMA}.items s
+        JOIN temp.merge_id_map m ON m.old_id = s.id
+        LEFT JOIN main.categories c ON c.name = s.kategorie
+        WHERE {where}
+        ORDER BY m.new_id
+        """,
+        params,
+    )
+    return cur.rowcount
+
+
+def _merge(conn: sqlite3.Connection) -> dict[str, Any]:
+    result: dict[str, Any] = {"items": 0, "remapped": 0, "categories": 0, "movements": 0}
+    cur = conn.cursor()
+
+    # Kategorien über den Namen zusammenführen
+    before = cur.execute("SELECT COUNT(*) FROM main.categories").fetchone()[0]
+    names = f"SELECT kategorie AS name FROM {SOURCE_SCHEMA}.items"
+    if "categories" in _tables(conn, SOURCE_SCHEMA):
+        names += f" UNION SELECT name FROM {SOURCE_SCHEMA}.categories"
+    cur.execute(
+        f"""
+        INSERT OR IGNORE INTO main.categories (name)
+        SELECT name FROM ({names})
+        WHERE name IS NOT NULL AND name <> ''
+        ORDER BY name
+        """
+    )
+    result["categories"] = cur.execute("SELECT COUNT(*) FROM main.categories").fetchone()[0] - before
+
+    cur.execute("DROP TABLE IF EXISTS temp.merge_id_map")
+    cur.execute(
+        "CREATE TEMP TABLE merge_id_map (old_id INTEGER PRIMARY KEY, new_id INTEGER UNIQUE NOT NULL)"
+    )
+    # Freie IDs bleiben erhalten: oberhalb der Höchstmarke oder in einer
+    # eingetragenen Lücke. Dazwischen liegende IDs können reserviert sein.
+    high_water_mark = ids.high_water_mark(conn)
+    cur.execute(
+        f"""
+        INSERT INTO temp.merge_id_map (old_id, new_id)
+        SELECT s.id, s.id FROM {SOURCE_SCHEMA}.items s
+        WHERE s.id >= ?
+          AND NOT EXISTS (SELECT 1 FROM main.items i WHERE i.id = s.id)
+          AND (
+            s.id > ?
+            OR EXISTS (
+                SELECT 1 FROM main.item_id_gaps g
+                WHERE g.start_id = (
+                    SELECT MAX(start_id) FROM main.item_id_gaps WHERE start_id <= s.id
+                )
+                AND g.end_id >= s.id
+            )
+          )
+        """,
+        (ids.ID_BASE, high_water_mark),
+    )
+    result["items"] += _insert_items(cur, "m.new_id = m.old_id")
+    # Übernommene IDs in Lücken entfernt der Insert-Trigger aus ``item_id_gaps``,
+    # ``sqlite_sequence`` hebt AUTOINCREMENT selbst an; nachzutragen sind nur
+    # die Lücken, die oberhalb der bisherigen Höchstmarke entstanden sind.
+    ids.record_gaps_above(conn, high_water_mark)
+
+    # Kollidierende IDs: neuer, zusammenhängender Block
+    remaining = cur.execute(
+        f"""
+        SELECT COUNT(*) FROM {SOURCE_SCHEMA}.items s
+        WHERE NOT EXISTS (SELECT 1 FROM temp.merge_id_map m WHERE m.old_id = s.id)
+        """
+    ).fetchone()[0]
+    if remaining:
+        block = ids.reserve_ids(conn, remaining)
+        cur.execute(
+            f"""
+            INSERT INTO temp.merge_id_map (old_id, new_id)
+            SELECT s.id, ? + ROW_NUMBER() OVER (ORDER BY s.id) - 1
+            FROM {SOURCE_SCHEMA}.items s
+            WHERE NOT EXISTS (SELECT 1 FROM temp.merge_id_map m WHERE m.old_id = s.id)
+            """,
+            (block.start,),
+        )
+        result["remapped"] = _insert_items(cur, "m.new_id >= ?", (block.start,))
+        result["items"] += result["remapped"]
+
+    movements = _movement_source(conn)
+    if movements is not None:
+        if "movement_types" in _tables(conn, movements):
+            cur.execute(
+                f"""
+                INSERT OR IGNORE INTO {STOCK_SCHEMA}.movement_types (name, description)
+                SELECT name, description FROM {movements}.movement_types
+                """
+            )
+        columns = ", ".join(MOVEMENT_COLUMNS)
+        source_columns = ", ".join(f"sm.{col}" for col in MOVEMENT_COLUMNS)
+        cur.execute(
+            f"""
+            INSERT INTO {STOCK_SCHEMA}.stock_movements (item_id, {columns})
+            SELECT m.new_id, {source_columns}
+            FROM {movements}.stock_movements sm
+            JOIN temp.merge_id_map m ON m.old_id = sm.item_id
+            ORDER BY sm.id
+            """
+        )
+        result["movements"] = cur.rowcount
+    cur.execute("DROP TABLE temp.merge_id_map")
+    return result
+
+
+def merge_database(source: str | Path, stock_source: str | Path | None = None) -> dict[str, Any]:
+    """Führt ``source`` (und dessen Bestandsdatei) mit den eigenen Daten zusammen.
+
+    Rückgabe: Anzahl übernommener ``items`` (davon ``remapped`` mit neuer
+    ID), neuer ``categories`` und übernommener ``movements``.
+    """
+    source = Path(source)
+    if not source.is_file():
+        raise ValueError(f"Datei nicht gefunden: {source}")
+    if stock_source is None:
+        stock_source = stock_backup_path(source)
+        if not stock_source.is_file():
+            stock_source = None
+    elif not Path(stock_source).is_file():
+        raise ValueError(f"Datei nicht gefunden: {stock_source}")
+
+    conn = connection()
+    if conn.in_transaction:
+        conn.commit()
+    # ATTACH ist innerhalb einer Transaktion nicht erlaubt
+    attached = []
+    try:
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {SOURCE_SCHEMA}", (str(source),))
+            attached.append(SOURCE_SCHEMA)
+            if stock_source is not None:
+                conn.execute(f"ATTACH DATABASE ? AS {SOURCE_STOCK_SCHEMA}", (str(stock_source),))
+                attached.append(SOURCE_STOCK_SCHEMA)
+            _check_source(conn)
+        except sqlite3.DatabaseError as exc:
+            raise ValueError(f"Ungültige Datenbankdatei: {exc}")
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            with fts_sync_suspended(conn):
+                return _merge(conn)
+    finally:
+        for schema in attached:
+            conn.execute(f"DETACH DATABASE {schema}")
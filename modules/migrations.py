@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import sqlite3
 
-def _migrate_to_v1(cur: sqlite3.Cursor) -> None:
+def _migrate_to_v1(conn: sqlite3.Connection) -> None:
     """Initial schema with ``items`` table (version 1)."""
+    cur = conn.cursor()
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS items (
@@ -211,30 +212,492 @@ def _migrate_to_v6(conn: sqlite3.Connection) -> None:
         FROM items
     """)
 
-def run_migrations(conn: sqlite3.Connection) -> None:
-    """Run database migrations based on PRAGMA user_version."""
+def _migrate_to_v7(conn: sqlite3.Connection) -> None:
+    """Reconcile the legacy ``stock_movements`` copy with ``stock.db``.
+
+    Version 6 created a second ledger inside ``inventory.db`` that nothing
+    reads. Its rows are carried over into the attached ``stock`` schema for
+    items that have no movements there yet, then the table is dropped so
+    ``stock.stock_movements`` is the only ledger.
+
+    Version 6 seeded built-in and broken items with a bare ``ausgang`` of
+    their quantity, which would leave them at negative stock. Such seed rows
+    are carried over as an ``eingang`` followed by the matching ``verbaut``
+    or ``defekt`` movement.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM main.sqlite_master WHERE type='table' AND name='stock_movements'")
+    if cur.fetchone() is None:
+        return
+    cur.execute("PRAGMA database_list")
+    if "stock" not in {row[1] for row in cur.fetchall()}:
+        raise RuntimeError("stock.db muss für Migration 7 angehängt sein")
+    seed = "m.movement_type = 'ausgang' AND m.notes = 'Initial stock migration'"
+    source = """
+        FROM main.stock_movements m
+        JOIN main.items i ON i.id = m.item_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM stock.stock_movements s WHERE s.item_id = m.item_id
+        )
+    """
+    cur.execute(
+        f"""
+        INSERT INTO stock.stock_movements (
+            item_id, movement_type, quantity, movement_date, reference_date, notes
+        )
+        SELECT item_id, movement_type, quantity, movement_date, reference_date, notes
+        FROM (
+            SELECT m.id AS source_id, 0 AS part, m.item_id,
+                   CASE WHEN {seed} THEN 'eingang' ELSE m.movement_type END AS movement_type,
+                   m.quantity, m.movement_date, m.reference_date, m.notes
+            {source}
+            UNION ALL
+            SELECT m.id, 1, m.item_id,
+                   CASE WHEN i.status = 'defekt' THEN 'defekt' ELSE 'verbaut' END,
+                   m.quantity, m.movement_date, m.reference_date, m.notes
+            {source} AND {seed}
+        )
+        ORDER BY source_id, part
+        """
+    )
+    cur.execute("DROP TABLE main.stock_movements")
+
+def _migrate_to_v8(conn: sqlite3.Connection) -> None:
+    """Free-ID ranges for O(log n) item ID allocation (see ``modules.ids``)."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS item_id_gaps (
+            start_id INTEGER PRIMARY KEY,
+            end_id INTEGER NOT NULL
+        )
+        """
+    )
+    # Deleted six-digit IDs become reusable
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS item_id_gaps_delete AFTER DELETE ON items
+        WHEN OLD.id >= 100000 BEGIN
+            INSERT OR IGNORE INTO item_id_gaps (start_id, end_id) VALUES (OLD.id, OLD.id);
+        END
+        """
+    )
+    # An inserted ID is cut out of the range that contains it
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS item_id_gaps_insert AFTER INSERT ON items
+        WHEN EXISTS (
+            SELECT 1 FROM item_id_gaps
+            WHERE start_id = (SELECT MAX(start_id) FROM item_id_gaps WHERE start_id <= NEW.id)
+              AND end_id >= NEW.id
+        ) BEGIN
+            INSERT INTO item_id_gaps (start_id, end_id)
+            SELECT NEW.id + 1, end_id FROM item_id_gaps
+            WHERE start_id = (SELECT MAX(start_id) FROM item_id_gaps WHERE start_id <= NEW.id)
+              AND end_id > NEW.id;
+            UPDATE item_id_gaps SET end_id = NEW.id - 1
+            WHERE start_id = (SELECT MAX(start_id) FROM item_id_gaps WHERE start_id <= NEW.id);
+            DELETE FROM item_id_gaps WHERE start_id = NEW.id;
+        END
+        """
+    )
+    # Existing holes between 100000 and the highest ID
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO item_id_gaps (start_id, end_id)
+        SELECT prev_id + 1, id - 1 FROM (
+            SELECT id, COALESCE(LAG(id) OVER (ORDER BY id), 99999) AS prev_id
+            FROM items WHERE id >= 100000
+        )
+        WHERE id > prev_id + 1
+        """
+    )
+
+
+def _migrate_to_v9(conn: sqlite3.Connection) -> None:
+    """Sync ``items_fts`` via the FTS5 ``'delete'`` command.
+
+    ``items_fts`` is an external-content table, so removing a row must pass
+    the previously indexed values; the plain ``DELETE`` of v3 left stale
+    tokens behind. Updates only reindex when an indexed column changes.
+    """
+    cur = conn.cursor()
+    for trigger in ("items_fts_insert", "items_fts_delete", "items_fts_update"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cur.execute(
+        """
+        CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN
+            INSERT INTO items_fts(rowid, name, kategorie, shop, notiz)
+            VALUES (NEW.id, NEW.name, NEW.kategorie, NEW.shop, NEW.notiz);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN
+            INSERT INTO items_fts(items_fts, rowid, name, kategorie, shop, notiz)
+            VALUES ('delete', OLD.id, OLD.name, OLD.kategorie, OLD.shop, OLD.notiz);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER items_fts_update AFTER UPDATE OF name, kategorie, shop, notiz ON items BEGIN
+            INSERT INTO items_fts(items_fts, rowid, name, kategorie, shop, notiz)
+            VALUES ('delete', OLD.id, OLD.name, OLD.kategorie, OLD.shop, OLD.notiz);
+            INSERT INTO items_fts(rowid, name, kategorie, shop, notiz)
+            VALUES (NEW.id, NEW.name, NEW.kategorie, NEW.shop, NEW.notiz);
+        END
+        """
+    )
+    # Drop the stale entries left by the old triggers
+    cur.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+
+
+def _migrate_to_v10(conn: sqlite3.Connection) -> None:
+    """Trigram index ``items_trgm`` for substring search (part numbers etc.)."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS items_trgm USING fts5(
+            name, kategorie, status, notiz, shop,
+            content='items',
+            content_rowid='id',
+            tokenize='trigram'
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS items_trgm_insert AFTER INSERT ON items BEGIN
+            INSERT INTO items_trgm(rowid, name, kategorie, status, notiz, shop)
+            VALUES (NEW.id, NEW.name, NEW.kategorie, NEW.status, NEW.notiz, NEW.shop);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS items_trgm_delete AFTER DELETE ON items BEGIN
+            INSERT INTO items_trgm(items_trgm, rowid, name, kategorie, status, notiz, shop)
+            VALUES ('delete', OLD.id, OLD.name, OLD.kategorie, OLD.status, OLD.notiz, OLD.shop);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS items_trgm_update
+        AFTER UPDATE OF name, kategorie, status, notiz, shop ON items BEGIN
+            INSERT INTO items_trgm(items_trgm, rowid, name, kategorie, status, notiz, shop)
+            VALUES ('delete', OLD.id, OLD.name, OLD.kategorie, OLD.status, OLD.notiz, OLD.shop);
+            INSERT INTO items_trgm(rowid, name, kategorie, status, notiz, shop)
+            VALUES (NEW.id, NEW.name, NEW.kategorie, NEW.status, NEW.notiz, NEW.shop);
+        END
+        """
+    )
+    cur.execute("INSERT INTO items_trgm(items_trgm) VALUES ('rebuild')")
+
+
+# Prefix lengths indexed by ``items_fts`` (see v11)
+FTS_PREFIX_LENGTHS = "2 3 4"
+
+
+def _migrate_to_v11(conn: sqlite3.Connection) -> None:
+    """Rebuild ``items_fts`` with prefix indexes for as-you-type search.
+
+    The sync triggers from v9 reference the table by name and keep working.
+    """
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS items_fts")
+    cur.execute(
+        f"""
+        CREATE VIRTUAL TABLE items_fts USING fts5(
+            name, kategorie, shop, notiz,
+            content='items',
+            content_rowid='id',
+            tokenize='porter',
+            prefix='{FTS_PREFIX_LENGTHS}'
+        )
+        """
+    )
+    cur.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+
+
+def _create_change_log(conn: sqlite3.Connection, log: str, table: str, key: str) -> None:
+    """Change log ``log`` for ``table``: one row per ``key`` with the last ``seq``.
+
+    Every insert, update or delete stamps the row's key with a new,
+    increasing ``seq``; readers ask for keys with ``seq`` above the last
+    value they saw. Keeping one row per key bounds the log by the table size.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {log} (
+            item_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{log}_seq ON {log}(seq)")
+    # Upsert rather than INSERT OR REPLACE: the conflict policy of the firing
+    # statement (e.g. INSERT OR IGNORE) would override REPLACE inside the trigger
+    stamp = (
+        f"INSERT INTO {log} (item_id, seq) SELECT {{r}}.{key}, COALESCE(MAX(seq), 0) + 1 FROM {log} WHERE 1 "
+        "ON CONFLICT (item_id) DO UPDATE SET seq = excluded.seq;"
+    )
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {log}_{event.lower()} AFTER {event} ON {table} BEGIN
+                {stamp.format(r=row)}
+            END
+            """
+        )
+
+
+def _migrate_to_v12(conn: sqlite3.Connection) -> None:
+    """Change log for ``items`` so the TUI can refresh only changed rows."""
+    _create_change_log(conn, "item_changes", "items", "id")
+
+# --- stock.db -------------------------------------------------------------------
+
+# Contribution of a movement row ``{r}`` to each ``stock_balances`` column
+BALANCE_DELTAS = {
+    'current': """CASE
+            WHEN {r}.movement_type = 'eingang' THEN {r}.quantity
+            WHEN {r}.movement_type IN ('ausgang', 'storno', 'defekt', 'verbaut') THEN -{r}.quantity
+            ELSE 0
+        END""",
+    'ordered': "CASE WHEN {r}.movement_type = 'bestellung' THEN {r}.quantity ELSE 0 END",
+    'used': "CASE WHEN {r}.movement_type = 'verbaut' THEN {r}.quantity ELSE 0 END",
+    'defect': "CASE WHEN {r}.movement_type = 'defekt' THEN {r}.quantity ELSE 0 END",
+}
+
+# Balances recomputed from the ledger, one row per item
+BALANCE_LEDGER_SQL = "SELECT item_id, {}, COUNT(*) AS movement_count FROM stock_movements GROUP BY item_id".format(
+    ", ".join(
+        f"SUM({expr.format(r='stock_movements')}) AS {col}" for col, expr in BALANCE_DELTAS.items()
+    )
+)
+
+
+def _balance_add_sql(r: str) -> str:
+    columns = ", ".join(BALANCE_DELTAS)
+    values = ", ".join(expr.format(r=r) for expr in BALANCE_DELTAS.values())
+    updates = ", ".join(f"{col} = {col} + excluded.{col}" for col in BALANCE_DELTAS)
+    return f"""
+        INSERT INTO stock_balances (item_id, {columns}, movement_count)
+        SELECT {r}.item_id, {values}, 1 WHERE true
+        ON CONFLICT(item_id) DO UPDATE SET
+            {updates}, movement_count = movement_count + 1;
+    """
+
+
+def _balance_remove_sql(r: str) -> str:
+    updates = ", ".join(
+        f"{col} = {col} - ({expr.format(r=r)})" for col, expr in BALANCE_DELTAS.items()
+    )
+    return f"""
+        UPDATE stock_balances SET {updates}, movement_count = movement_count - 1
+        WHERE item_id = {r}.item_id;
+        DELETE FROM stock_balances WHERE item_id = {r}.item_id AND movement_count <= 0;
+    """
+
+
+def _stock_migrate_to_v1(conn: sqlite3.Connection) -> None:
+    """Movement types and the ``stock_movements`` ledger."""
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS movement_types (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            description TEXT
+        )
+    """)
+    cur.executemany(
+        "INSERT OR IGNORE INTO movement_types (name, description) VALUES (?, ?)",
+        [
+            ('eingang', 'Wareneingang'),
+            ('ausgang', 'Warenausgang'),
+            ('bestellung', 'Neue Bestellung'),
+            ('storno', 'Stornierung'),
+            ('defekt', 'Als defekt markiert'),
+            ('verbaut', 'In Projekt verbaut'),
+        ],
+    )
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            movement_type TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            movement_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            reference_date TEXT,
+            notes TEXT,
+            FOREIGN KEY (movement_type) REFERENCES movement_types(name)
+        )
+    """)
+
+
+def _stock_migrate_to_v2(conn: sqlite3.Connection) -> None:
+    """Materialized ``stock_balances`` maintained by ledger triggers."""
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='stock_balances'")
+    exists = cur.fetchone() is not None
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS stock_balances (
+            item_id INTEGER PRIMARY KEY,
+            current INTEGER NOT NULL DEFAULT 0,
+            ordered INTEGER NOT NULL DEFAULT 0,
+            used INTEGER NOT NULL DEFAULT 0,
+            defect INTEGER NOT NULL DEFAULT 0,
+            movement_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_stock_balances_current ON stock_balances(current)"
+    )
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS stock_balances_insert
+        AFTER INSERT ON stock_movements BEGIN
+            {_balance_add_sql('NEW')}
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS stock_balances_delete
+        AFTER DELETE ON stock_movements BEGIN
+            {_balance_remove_sql('OLD')}
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS stock_balances_update
+        AFTER UPDATE ON stock_movements BEGIN
+            {_balance_remove_sql('OLD')}
+            {_balance_add_sql('NEW')}
+        END
+    """)
+    if not exists:
+        cur.execute(
+            f"INSERT INTO stock_balances (item_id, {', '.join(BALANCE_DELTAS)}, movement_count) "
+            f"{BALANCE_LEDGER_SQL}"
+        )
+
+
+def _stock_migrate_to_v3(conn: sqlite3.Connection) -> None:
+    """Indexes for per-item history and ledger aggregation."""
+    cur = conn.cursor()
+    # History: WHERE item_id = ? ORDER BY movement_date DESC without a sort step
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_stock_movements_item_date
+        ON stock_movements(item_id, movement_date)
+        """
+    )
+    # Covering index for balance sums per item (GROUP BY item_id)
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_stock_movements_balance
+        ON stock_movements(item_id, movement_type, quantity)
+        """
+    )
+
+
+
+def _stock_migrate_to_v4(conn: sqlite3.Connection) -> None:
+    """Full-text index over movement notes (project names, order numbers)."""
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS movement_notes_fts USING fts5(
+            notes,
+            content='stock_movements',
+            content_rowid='id',
+            tokenize='porter',
+            prefix='2 3'
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS movement_notes_fts_insert AFTER INSERT ON stock_movements
+        WHEN NEW.notes IS NOT NULL AND NEW.notes <> '' BEGIN
+            INSERT INTO movement_notes_fts(rowid, notes) VALUES (NEW.id, NEW.notes);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS movement_notes_fts_delete AFTER DELETE ON stock_movements
+        WHEN OLD.notes IS NOT NULL AND OLD.notes <> '' BEGIN
+            INSERT INTO movement_notes_fts(movement_notes_fts, rowid, notes)
+            VALUES ('delete', OLD.id, OLD.notes);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS movement_notes_fts_update AFTER UPDATE OF notes ON stock_movements
+        BEGIN
+            INSERT INTO movement_notes_fts(movement_notes_fts, rowid, notes)
+            SELECT 'delete', OLD.id, OLD.notes WHERE OLD.notes IS NOT NULL AND OLD.notes <> '';
+            INSERT INTO movement_notes_fts(rowid, notes)
+            SELECT NEW.id, NEW.notes WHERE NEW.notes IS NOT NULL AND NEW.notes <> '';
+        END
+        """
+    )
+    cur.execute("INSERT INTO movement_notes_fts(movement_notes_fts) VALUES ('rebuild')")
+
+
+def _stock_migrate_to_v5(conn: sqlite3.Connection) -> None:
+    """Change log for ``stock_balances`` (see :func:`_create_change_log`)."""
+    _create_change_log(conn, "balance_changes", "stock_balances", "item_id")
+
+
+INVENTORY_MIGRATIONS = [
+    _migrate_to_v1,
+    _migrate_to_v2,
+    _migrate_to_v3,
+    _migrate_to_v4,
+    _migrate_to_v5,
+    _migrate_to_v6,
+    _migrate_to_v7,
+    _migrate_to_v8,
+    _migrate_to_v9,
+    _migrate_to_v10,
+    _migrate_to_v11,
+    _migrate_to_v12,
+]
+
+STOCK_MIGRATIONS = [
+    _stock_migrate_to_v1,
+    _stock_migrate_to_v2,
+    _stock_migrate_to_v3,
+    _stock_migrate_to_v4,
+    _stock_migrate_to_v5,
+]
+
+
+def _run_chain(conn: sqlite3.Connection, migrations: list) -> None:
+    """Apply every migration above the database's ``PRAGMA user_version``.
+
+    Migration ``n`` (1-based position in ``migrations``) brings the schema to
+    version ``n``; the version is bumped after each step.
+    """
     cur = conn.cursor()
     cur.execute("PRAGMA user_version")
     version = cur.fetchone()[0]
-
-    if version < 1:
-        _migrate_to_v1(cur)
-        version = 1
-        cur.execute("PRAGMA user_version = 1")
-
-    if version < 2:
-        _migrate_to_v2(conn)
-        cur.execute("PRAGMA user_version = 2")
-    if version < 3:
-        _migrate_to_v3(conn)
-        cur.execute("PRAGMA user_version = 3")
-    if version < 4:
-        _migrate_to_v4(conn)
-        cur.execute("PRAGMA user_version = 4")
-    if version < 5:
-        _migrate_to_v5(conn)
-        cur.execute("PRAGMA user_version = 5")
-    if version < 6:
-        _migrate_to_v6(conn)
-        cur.execute("PRAGMA user_version = 6")
+    for target, migrate in enumerate(migrations, start=1):
+        if version < target:
+            migrate(conn)
+            cur.execute(f"PRAGMA user_version = {target}")
     conn.commit()
+
+
+def run_migrations(conn: sqlite3.Connection) -> None:
+    """Run inventory database migrations based on PRAGMA user_version."""
+    _run_chain(conn, INVENTORY_MIGRATIONS)
+
+
+def run_stock_migrations(conn: sqlite3.Connection) -> None:
+    """Run stock database migrations based on PRAGMA user_version."""
+    _run_chain(conn, STOCK_MIGRATIONS)
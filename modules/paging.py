@@ -0,0 +1,170 @@
+"""Seitenweises Laden der Artikelliste für sehr große Bestände.
+
+:class:`ItemPager` liefert Zeilen der nach ID sortierten Artikelliste über
+ihre Position, lädt sie aber nur seitenweise: fortlaufendes Blättern nutzt
+Keyset-Paginierung ab der letzten ID der Vorgängerseite. Bei einem Sprung
+(z. B. ans Ende) wird die Startgrenze ab der nächstgelegenen bekannten
+Seitengrenze bzw. vom Listenende abgezählt (``OFFSET``), sodass die Kosten
+vom Sprungabstand und nicht von der Listenlänge abhängen. Im Speicher
+bleiben höchstens ``max_pages`` Seiten (LRU). Die nächste Seite kann mit
+:meth:`ItemPager.prefetch` von einem Hintergrund-Thread vorgeladen werden,
+der eine eigene Datenbankverbindung nutzt.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from . import inventory
+
+# Zeilen pro Seite
+PAGE_SIZE = 200
+
+# Seiten im Speicher (bei 200 Zeilen höchstens 3200 Artikel)
+MAX_PAGES = 16
+
+
+class ItemPager:
+    """Positionszugriff auf die (mit ``flt`` gefilterte) Artikelliste mit begrenztem Seiten-Cache."""
+
+    def __init__(self, page_size: int = PAGE_SIZE, max_pages: int = MAX_PAGES,
+                 flt: Optional[inventory.ItemFilter] = None) -> None:
+        if page_size < 1 or max_pages < 2:
+            raise ValueError("page_size muss >= 1 und max_pages >= 2 sein")
+        self.flt = flt
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._pages: OrderedDict[int, list[dict]] = OrderedDict()
+        # Seite -> letzte ID der Vorgängerseite (Keyset-Grenzen)
+        self._after: dict[int, Optional[int]] = {0: None}
+        self._count: Optional[int] = None
+        # Erhöht bei invalidate(); ältere Vorabladungen werden verworfen
+        self._generation = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"loads": 0, "prefetched": 0, "hits": 0}
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = inventory.count_items(self.flt)
+        return self._count
+
+    def row(self, position: int) -> Optional[dict]:
+        """Zeile an ``position`` oder ``None`` außerhalb der Liste."""
+        if position < 0 or position >= len(self):
+            return None
+        rows = self.page(position // self.page_size)
+        offset = position % self.page_size
+        return rows[offset] if offset < len(rows) else None
+
+    def peek(self, position: int) -> Optional[dict]:
+        """Zeile an ``position``, nur falls ihre Seite schon im Speicher ist."""
+        if position < 0 or (self._count is not None and position >= self._count):
+            return None
+        with self._lock:
+            rows = self._pages.get(position // self.page_size)
+        offset = position % self.page_size
+        return rows[offset] if rows is not None and offset < len(rows) else None
+
+    def page(self, number: int) -> list[dict]:
+        """Seite ``number``; aus dem Cache oder sofort geladen."""
+        with self._lock:
+            rows = self._pages.get(number)
+            if rows is not None:
+                self._pages.move_to_end(number)
+                self.stats["hits"] += 1
+                return rows
+            generation = self._generation
+        rows = self._load(number)
+        self._store(number, rows, generation)
+        self.stats["loads"] += 1
+        return rows
+
+    def position(self, item_id: int) -> int:
+        """Position von ``item_id`` (bzw. der nächstgrößeren ID)."""
+        return inventory.item_position(item_id, self.flt)
+
+    def _load(self, number: int) -> list[dict]:
+        with self._lock:
+            known = number in self._after
+            after = self._after.get(number)
+        if not known:
+            # Sprung: Grenze ab der nächsten bekannten Stelle abzählen
+            target = number * self.page_size - 1
+            after = inventory.item_id_at(target, self.flt, self._anchor(target))
+        return inventory.list_items_page(after, self.page_size, self.flt)
+
+    def _anchor(self, target: int) -> tuple[int, Optional[int]]:
+        """Bekannte Seitengrenze oder Listenende mit dem kürzesten Weg zu ``target``."""
+        with self._lock:
+            anchors = [(page * self.page_size - 1, after) for page, after in self._after.items()]
+        anchors.append((len(self), None))
+        return min(anchors, key=lambda anchor: abs(target - anchor[0]))
+
+    def _store(self, number: int, rows: list[dict], generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._pages[number] = rows
+            self._pages.move_to_end(number)
+            if len(rows) == self.page_size:
+                self._after[number + 1] = rows[-1]["id"]
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def cached_pages(self) -> list[int]:
+        """Nummern der Seiten im Speicher, zuletzt benutzte zuletzt."""
+        with self._lock:
+            return list(self._pages)
+
+    def prefetch(self, number: int) -> None:
+        """Seite ``number`` im Hintergrund laden, falls sie fehlt."""
+        if number < 0 or number * self.page_size >= len(self):
+            return
+        with self._lock:
+            if number in self._pages:
+                return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._thread.start()
+        self._queue.put(number)
+
+    def _prefetch_loop(self) -> None:
+        while True:
+            number = self._queue.get()
+            try:
+                if number is None:
+                    return
+                with self._lock:
+                    if number in self._pages:
+                        continue
+                    generation = self._generation
+                self._store(number, self._load(number), generation)
+                self.stats["prefetched"] += 1
+            except Exception:
+                # Vorabladen ist optional; der nächste Zugriff lädt selbst
+                pass
+            finally:
+                self._queue.task_done()
+
+    def wait(self) -> None:
+        """Wartet, bis alle angeforderten Vorabladungen erledigt sind."""
+        self._queue.join()
+
+    def invalidate(self) -> None:
+        """Cache und Seitengrenzen verwerfen (nach Änderungen an den Daten)."""
+        with self._lock:
+            self._generation += 1
+            self._pages.clear()
+            self._after = {0: None}
+            self._count = None
+
+    def close(self) -> None:
+        """Hintergrund-Thread beenden."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
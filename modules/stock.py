@@ -1,74 +1,62 @@
+import json
 import sqlite3
 from datetime import datetime
-from pathlib import Path
+from typing import Any, Optional
 
-DB_FILE = Path(__file__).parent.parent / "database" / "stock.db"
-DB_FILE.parent.mkdir(exist_ok=True)  # Stelle sicher, dass der Ordner existiert
+from . import db
+from .inventory import cached_validate_date, compile_query
+from .migrations import BALANCE_DELTAS, BALANCE_LEDGER_SQL
+
+DB_FILE = db.STOCK_DB_FILE
 
 def get_connection() -> sqlite3.Connection:
-    """Datenbankverbindung herstellen."""
+    """Neue, nicht verwaltete Datenbankverbindung herstellen (Aufrufer schließt)."""
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     return conn
 
+
+def _connection() -> sqlite3.Connection:
+    """Langlebige Verbindung des aktuellen Threads zur Bestandsdatenbank."""
+    return db.connection(DB_FILE)
+
 def init_db() -> None:
-    """Initialisiere die Bestandsdatenbank."""
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    # Bewegungsarten
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS movement_types (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            description TEXT
-        )
-    """)
-    
-    # Standard-Bewegungsarten einfügen
-    movement_types = [
-        ('eingang', 'Wareneingang'),
-        ('ausgang', 'Warenausgang'),
-        ('bestellung', 'Neue Bestellung'),
-        ('storno', 'Stornierung'),
-        ('defekt', 'Als defekt markiert'),
-        ('verbaut', 'In Projekt verbaut')
-    ]
-    cur.executemany(
-        "INSERT OR IGNORE INTO movement_types (name, description) VALUES (?, ?)",
-        movement_types
-    )
-    
-    # Bestandsbewegungen
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS stock_movements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            item_id INTEGER NOT NULL,
-            movement_type TEXT NOT NULL,
-            quantity INTEGER NOT NULL,
-            movement_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            reference_date TEXT,
-            notes TEXT,
-            FOREIGN KEY (movement_type) REFERENCES movement_types(name)
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    """Initialisiere die Bestandsdatenbank (versionierte Migrationen)."""
+    from . import migrations
+    conn = _connection()
+    try:
+        migrations.run_stock_migrations(conn)
+    except Exception:
+        conn.rollback()
+        raise
+
+# Bewegungsarten, einmal pro Prozess aus ``movement_types`` geladen
+_movement_types: frozenset[str] | None = None
+
+# Zeilen pro Transaktion bei add_movements()
+MOVEMENT_CHUNK_SIZE = 5000
+
+# Anzahl der Fehlermeldungen, die add_movements() aufbewahrt
+MAX_REPORTED_ERRORS = 100
+
+def movement_types() -> frozenset[str]:
+    """Gültige Bewegungsarten (zwischengespeichert)."""
+    global _movement_types
+    if _movement_types is None:
+        cur = _connection().execute("SELECT name FROM movement_types")
+        _movement_types = frozenset(row[0] for row in cur.fetchall())
+    return _movement_types
 
 def add_movement(item_id: int, movement_type: str, quantity: int, notes: str = "", reference_date: str = "") -> int:
     """Neue Bestandsbewegung hinzufügen."""
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    try:
-        # Prüfe ob Bewegungsart existiert
-        cur.execute("SELECT 1 FROM movement_types WHERE name = ?", (movement_type,))
-        if not cur.fetchone():
-            raise ValueError(f"Ungültige Bewegungsart: {movement_type}")
-        
+    # Prüfe ob Bewegungsart existiert
+    if movement_type not in movement_types():
+        raise ValueError(f"Ungültige Bewegungsart: {movement_type}")
+
+    conn = _connection()
+    with conn:
         # Füge Bewegung hinzu
-        cur.execute(
+        cur = conn.execute(
             """
             INSERT INTO stock_movements (
                 item_id, movement_type, quantity, notes, reference_date
@@ -76,92 +64,351 @@ def add_movement(item_id: int, movement_type: str, quantity: int, notes: str = "
             """,
             (item_id, movement_type, quantity, notes, reference_date)
         )
-        movement_id = cur.lastrowid
-        conn.commit()
-        return movement_id
-    
-    finally:
-        conn.close()
+        return cur.lastrowid
+
+def _validate_movement(record: dict) -> tuple:
+    """Prüft eine Bewegung und liefert die Werte für den Insert."""
+    try:
+        item_id = int(record.get("item_id"))
+    except (TypeError, ValueError):
+        raise ValueError("Ungültige Artikel-ID")
+    if item_id <= 0:
+        raise ValueError("Ungültige Artikel-ID")
+    movement_type = str(record.get("movement_type") or record.get("type") or "").strip()
+    if movement_type not in movement_types():
+        raise ValueError(f"Ungültige Bewegungsart: {movement_type}")
+    try:
+        quantity = int(record.get("quantity"))
+    except (TypeError, ValueError):
+        raise ValueError("Ungültige Menge")
+    if quantity <= 0:
+        raise ValueError("Menge muss positiv sein")
+    notes = str(record.get("notes") or "").strip()
+    reference_date = cached_validate_date(str(record.get("reference_date") or "").strip())
+    return (item_id, movement_type, quantity, notes, reference_date)
+
+_INSERT_MOVEMENT_SQL = """
+    INSERT INTO stock_movements (
+        item_id, movement_type, quantity, notes, reference_date
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+def add_movements(movements, chunk_size: int = MOVEMENT_CHUNK_SIZE) -> dict:
+    """Viele Bestandsbewegungen in Blöcken schreiben.
+
+    ``movements`` ist ein Iterable von Dictionaries mit ``item_id``,
+    ``movement_type`` (oder ``type``), ``quantity`` sowie optional ``notes``
+    und ``reference_date``. Jeder Block wird in einer eigenen Transaktion
+    geschrieben. Ungültige Zeilen und Zeilen mit unbekannter Artikel-ID
+    werden abgewiesen, ohne den Rest abzubrechen. Rückgabe: ``inserted``, ``error_count`` und ``errors``
+    (Paare aus 1-basierter Position und Meldung).
+    """
+    result = {"inserted": 0, "error_count": 0, "errors": []}
+
+    def reject(position: int, message: str) -> None:
+        result["error_count"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append((position, message))
+
+    chunk: list[tuple[int, tuple]] = []
+    for position, record in enumerate(movements, start=1):
+        try:
+            chunk.append((position, _validate_movement(record)))
+        except ValueError as exc:
+            reject(position, str(exc))
+            continue
+        if len(chunk) >= chunk_size:
+            _write_movement_chunk(chunk, result, reject)
+            chunk = []
+    if chunk:
+        _write_movement_chunk(chunk, result, reject)
+    return result
+
+def _unknown_item_ids(item_ids) -> set[int]:
+    """Artikel-IDs, die in ``items`` nicht existieren (eine Abfrage pro Block)."""
+    cur = db.connection().execute(
+        """
+        SELECT j.value FROM json_each(?) j
+        LEFT JOIN items i ON i.id = j.value
+        WHERE i.id IS NULL
+        """,
+        (json.dumps(sorted(item_ids)),),
+    )
+    return {row[0] for row in cur}
+
+def _write_movement_chunk(chunk: list[tuple[int, tuple]], result: dict, reject) -> None:
+    # Die Bestandsdatei kennt keine Artikel; ohne Prüfung entstünden
+    # verwaiste Salden für nicht existierende IDs
+    unknown = _unknown_item_ids({values[0] for _, values in chunk})
+    if unknown:
+        for position, values in chunk:
+            if values[0] in unknown:
+                reject(position, f"Unbekannte Artikel-ID: {values[0]}")
+        chunk = [entry for entry in chunk if entry[1][0] not in unknown]
+        if not chunk:
+            return
+    conn = _connection()
+    try:
+        with conn:
+            conn.executemany(_INSERT_MOVEMENT_SQL, [values for _, values in chunk])
+        result["inserted"] += len(chunk)
+        return
+    except sqlite3.IntegrityError:
+        pass
+    # Block einzeln wiederholen, um die fehlerhaften Zeilen zu finden
+    with conn:
+        conn.execute("BEGIN")
+        for position, values in chunk:
+            try:
+                conn.execute("SAVEPOINT movement_row")
+                conn.execute(_INSERT_MOVEMENT_SQL, values)
+                conn.execute("RELEASE movement_row")
+                result["inserted"] += 1
+            except sqlite3.IntegrityError as exc:
+                conn.execute("ROLLBACK TO movement_row")
+                conn.execute("RELEASE movement_row")
+                reject(position, str(exc))
+
+_BALANCE_SELECT = """
+    current AS current_stock,
+    ordered AS ordered_quantity,
+    used AS used_quantity,
+    defect AS defect_quantity
+"""
+
+EMPTY_STOCK = {
+    'current_stock': 0,
+    'ordered_quantity': 0,
+    'used_quantity': 0,
+    'defect_quantity': 0,
+}
+
+
+# Letzte Bewegungen eines Artikels (Index idx_stock_movements_item_date)
+_HISTORY_SQL = """
+    SELECT 
+        movement_type, quantity, movement_date, reference_date, notes
+    FROM stock_movements
+    WHERE item_id = ?
+    ORDER BY movement_date DESC
+    LIMIT 10
+"""
 
 def get_item_stock(item_id: int) -> dict:
     """Hole aktuellen Bestand und Bewegungen eines Artikels."""
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    try:
-        # Berechne aktuellen Bestand
-        cur.execute("""
-            SELECT 
-                COALESCE(SUM(
-                    CASE 
-                        WHEN movement_type = 'eingang' THEN quantity
-                        WHEN movement_type IN ('ausgang', 'storno', 'defekt', 'verbaut') THEN -quantity
-                        ELSE 0
-                    END
-                ), 0) as current_stock,
-                COALESCE(SUM(
-                    CASE WHEN movement_type = 'bestellung' THEN quantity ELSE 0 END
-                ), 0) as ordered_quantity,
-                COALESCE(SUM(
-                    CASE WHEN movement_type = 'verbaut' THEN quantity ELSE 0 END
-                ), 0) as used_quantity,
-                COALESCE(SUM(
-                    CASE WHEN movement_type = 'defekt' THEN quantity ELSE 0 END
-                ), 0) as defect_quantity
-            FROM stock_movements
-            WHERE item_id = ?
-        """, (item_id,))
-        stock_info = dict(cur.fetchone())
-        
-        # Hole letzte Bewegungen
-        cur.execute("""
-            SELECT 
-                movement_type, quantity, movement_date, reference_date, notes
-            FROM stock_movements
-            WHERE item_id = ?
-            ORDER BY movement_date DESC
-            LIMIT 10
-        """, (item_id,))
-        stock_info['movements'] = [dict(row) for row in cur.fetchall()]
-        
-        return stock_info
-    
-    finally:
-        conn.close()
+    cur = _connection().cursor()
+
+    # Aktueller Bestand aus der Saldentabelle
+    cur.execute(f"""
+        SELECT {_BALANCE_SELECT}
+        FROM stock_balances
+        WHERE item_id = ?
+    """, (item_id,))
+    row = cur.fetchone()
+    stock_info = dict(row) if row else dict(EMPTY_STOCK)
+
+    # Hole letzte Bewegungen
+    cur.execute(_HISTORY_SQL, (item_id,))
+    stock_info['movements'] = [dict(row) for row in cur.fetchall()]
+
+    return stock_info
+
+def get_stock_for_items(item_ids) -> dict[int, dict]:
+    """Bestandszahlen mehrerer Artikel in einer Abfrage.
+
+    Liefert ``{item_id: {current_stock, ordered_quantity, used_quantity,
+    defect_quantity}}``; Artikel ohne Bewegungen erhalten Nullwerte.
+    """
+    ids = [int(i) for i in item_ids]
+    result = {item_id: dict(EMPTY_STOCK) for item_id in ids}
+    if not ids:
+        return result
+    cur = _connection().cursor()
+    cur.execute(f"""
+        SELECT item_id, {_BALANCE_SELECT}
+        FROM stock_balances
+        WHERE item_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(ids),))
+    for row in cur:
+        info = dict(row)
+        result[info.pop('item_id')] = info
+    return result
+
+def get_all_stock() -> dict[int, dict]:
+    """Bestandszahlen aller Artikel mit Bewegungen.
+
+    Artikel ohne Bewegungen fehlen im Ergebnis, siehe ``EMPTY_STOCK``.
+    """
+    cur = _connection().cursor()
+    cur.execute(f"SELECT item_id, {_BALANCE_SELECT} FROM stock_balances")
+    result = {}
+    for row in cur:
+        info = dict(row)
+        result[info.pop('item_id')] = info
+    return result
 
 def get_low_stock_items(threshold: int = 5) -> list:
     """Finde Artikel mit niedrigem Bestand."""
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    try:
-        cur.execute("""
-            SELECT 
-                item_id,
-                COALESCE(SUM(
-                    CASE 
-                        WHEN movement_type = 'eingang' THEN quantity
-                        WHEN movement_type IN ('ausgang', 'storno', 'defekt', 'verbaut') THEN -quantity
-                        ELSE 0
-                    END
-                ), 0) as current_stock
-            FROM stock_movements
-            GROUP BY item_id
-            HAVING current_stock <= ?
-        """, (threshold,))
-        
-        return [dict(row) for row in cur.fetchall()]
-    
-    finally:
-        conn.close()
+    cur = _connection().cursor()
+    cur.execute("""
+        SELECT item_id, current AS current_stock
+        FROM stock_balances
+        WHERE current <= ?
+        ORDER BY current, item_id
+    """, (threshold,))
+
+    return [dict(row) for row in cur.fetchall()]
+
+
+def verify_balances() -> list[dict]:
+    """Vergleicht ``stock_balances`` mit dem Ledger.
+
+    Liefert je abweichendem Artikel ein Dictionary mit den gespeicherten
+    (``stored``) und den aus ``stock_movements`` berechneten Werten (``ledger``).
+    """
+    columns = list(BALANCE_DELTAS) + ['movement_count']
+    cur = _connection().cursor()
+    cur.execute(f"""
+        WITH ledger AS ({BALANCE_LEDGER_SQL})
+        SELECT l.item_id, {', '.join(f'l.{c} AS l_{c}, b.{c} AS b_{c}' for c in columns)}
+        FROM ledger l LEFT JOIN stock_balances b ON b.item_id = l.item_id
+        WHERE b.item_id IS NULL OR {' OR '.join(f'l.{c} != b.{c}' for c in columns)}
+        UNION ALL
+        SELECT b.item_id, {', '.join(f'NULL, b.{c}' for c in columns)}
+        FROM stock_balances b
+        WHERE b.item_id NOT IN (SELECT item_id FROM ledger)
+        ORDER BY 1
+    """)
+    drift = []
+    for row in cur.fetchall():
+        stored = {c: row[f'b_{c}'] for c in columns}
+        ledger = {c: row[f'l_{c}'] for c in columns}
+        drift.append({
+            'item_id': row['item_id'],
+            'stored': stored if row['b_movement_count'] is not None else None,
+            'ledger': ledger if row['l_movement_count'] is not None else None,
+        })
+    return drift
+
+
+def recompute_balances() -> list[dict]:
+    """Baut ``stock_balances`` aus dem Ledger neu auf.
+
+    Gibt die vor dem Neuaufbau gefundenen Abweichungen zurück (siehe
+    :func:`verify_balances`).
+    """
+    conn = _connection()
+    with conn:
+        drift = verify_balances()
+        conn.execute("DELETE FROM stock_balances")
+        conn.execute(
+            f"INSERT INTO stock_balances (item_id, {', '.join(BALANCE_DELTAS)}, movement_count) {BALANCE_LEDGER_SQL}"
+        )
+    return drift
 
 
 def delete_movements_for_item(item_id: int) -> None:
     """Entfernt alle Bewegungen für einen Artikel (bei Löschung des Artikels)."""
-    conn = get_connection()
-    cur = conn.cursor()
+    conn = _connection()
+    with conn:
+        conn.execute("DELETE FROM stock_movements WHERE item_id = ?", (item_id,))
+
+
+# Strukturierte Felder der Bewegungssuche, z. B. ``typ:used artikel:1000001``
+MOVEMENT_SEARCH_FIELDS = (
+    ("typ", "m.movement_type"),
+    ("artikel", "m.item_id"),
+)
+
+_MOVEMENT_SEARCH_COLUMNS = """
+    m.id, m.item_id, items.name AS item_name, m.movement_type, m.quantity,
+    m.movement_date, m.reference_date, m.notes
+"""
+
+
+def _movement_search_parts(text: str) -> tuple[str, list[Any], Optional[str]]:
+    """``FROM ... WHERE ...``, Parameter und Rang-Ausdruck der Bewegungssuche."""
+    query = compile_query(text, fields=(), structured=MOVEMENT_SEARCH_FIELDS)
+    if query.empty:
+        raise ValueError("Leere Suchanfrage")
+    schema = db.STOCK_SCHEMA
+    params = list(query.params)
+    if query.match is not None:
+        sql = f"""
+            FROM {schema}.movement_notes_fts f
+            JOIN {schema}.stock_movements m ON m.id = f.rowid
+            LEFT JOIN items ON items.id = m.item_id
+            WHERE movement_notes_fts MATCH ?
+        """
+        params.insert(0, query.match)
+        rank = "f.rank"
+    else:
+        sql = f"""
+            FROM {schema}.stock_movements m
+            LEFT JOIN items ON items.id = m.item_id
+            WHERE 1
+        """
+        if query.exclude is not None:
+            sql += f"""
+                AND m.id NOT IN (SELECT rowid FROM {schema}.movement_notes_fts
+                                 WHERE movement_notes_fts MATCH ?)
+            """
+            params.insert(0, query.exclude)
+        rank = None
+    for condition in query.conditions(f"{schema}.movement_notes_fts", "m.id"):
+        sql += f" AND {condition}"
+    return sql, params, rank
+
+
+def _decode_movement_cursor(cursor: str) -> tuple[float, int]:
     try:
-        cur.execute("DELETE FROM stock_movements WHERE item_id = ?", (item_id,))
-        conn.commit()
-    finally:
-        conn.close()
+        kind, rank, movement_id = cursor.split(":")
+        if kind != "m":
+            raise ValueError
+        return float(rank), int(movement_id)
+    except ValueError:
+        raise ValueError(f"Ungültiger Cursor: {cursor}")
+
+
+def search_movements(text: str, limit: int = 50,
+                     after: Optional[str] = None) -> tuple[list[dict], Optional[str]]:
+    """Volltextsuche in den Notizen der Bestandsbewegungen.
+
+    Treffer enthalten den Artikelnamen (``item_name``) und einen
+    Textausschnitt (``snippet``), sortiert nach Rang und Bewegungs-ID.
+    ``after`` ist der Cursor der vorherigen Seite; Rückgabe wie bei
+    :func:`modules.inventory.search_page`.
+    """
+    if limit < 1:
+        raise ValueError("Limit muss mindestens 1 sein")
+    key = _decode_movement_cursor(after) if after else None
+    sql, params, rank = _movement_search_parts(text)
+    if rank is None:
+        select = f"SELECT {_MOVEMENT_SEARCH_COLUMNS}, 0 AS rank, NULL AS snippet {sql}"
+        if key is not None:
+            select += " AND m.id > ?"
+            params.append(key[1])
+        select += " ORDER BY m.id LIMIT ?"
+    else:
+        snippet = "snippet(movement_notes_fts, 0, '[', ']', '…', 12)"
+        select = f"SELECT {_MOVEMENT_SEARCH_COLUMNS}, {rank} AS rank, {snippet} AS snippet {sql}"
+        if key is not None:
+            select += f" AND ({rank}, m.id) > (?, ?)"
+            params.extend(key)
+        select += f" ORDER BY {rank}, m.id LIMIT ?"
+    params.append(limit + 1)
+    cur = db.connection().cursor()
+    cur.execute(select, params)
+    rows = [dict(row) for row in cur.fetchall()]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, f"m:{rows[-1]['rank']!r}:{rows[-1]['id']}"
+
+
+def count_movement_search(text: str) -> int:
+    """Anzahl aller Treffer von :func:`search_movements`."""
+    sql, params, _ = _movement_search_parts(text)
+    cur = db.connection().cursor()
+    cur.execute(f"SELECT COUNT(*) {sql}", params)
+    return cur.fetchone()[0]
@@ -1,7 +1,12 @@
 """Textbasierte Benutzeroberfläche (TUI) für das Warenwirtschaftssystem."""
+import asyncio
+import sqlite3
+
+from textual import work
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Horizontal, Vertical, ScrollableContainer
+from textual.coordinate import Coordinate
 from textual.widgets import (
     Header,
     Footer,
@@ -13,8 +18,14 @@ from textual.widgets import (
     Label
 )
 from textual.screen import ModalScreen
-from . import inventory, stock
-from .db import get_connection
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from rich.cells import set_cell_size
+from rich.segment import Segment
+from . import aio, inventory
+from .paging import ItemPager
 
 class StockOverview(Static):
     """Bestandsübersicht für ausgewählten Artikel."""
@@ -36,36 +47,43 @@ class StockOverview(Static):
                 yield Label("Letzte Bewegungen:")
                 yield Static("", id="movements")
 
-    def update_info(self, item_id: int | None) -> None:
-        """Aktualisiere Bestandsinformationen."""
-        no_selection = self.query_one("#no_selection")
-        stock_info = self.query_one("#stock_info")
-        
+    async def update_info(self, item_id: int | None, prefetch=()) -> None:
+        """Aktualisiere Bestandsinformationen.
+
+        Liegen die Details schon in :data:`inventory.detail_cache`, werden
+        sie sofort ohne Datenbankzugriff angezeigt. Danach prüft der
+        DB-Thread den Cache, lädt fehlende Details für ``item_id`` und die
+        Artikel in ``prefetch`` (z. B. Nachbarzeilen) und aktualisiert die
+        Anzeige, falls sich etwas geändert hat.
+        """
         if item_id is None:
-            no_selection.remove_class("hidden")
-            stock_info.add_class("hidden")
-            return
-            
-        info = stock.get_item_stock(item_id)
-        item = inventory.get_item(item_id)
-        
-        if not item:
+            self.query_one("#no_selection").remove_class("hidden")
+            self.query_one("#stock_info").add_class("hidden")
             return
-            
-        no_selection.add_class("hidden")
-        stock_info.remove_class("hidden")
-        
+        cached = inventory.detail_cache.peek(item_id)
+        if cached is not None:
+            self.show_details(cached)
+        details = await aio.run(inventory.detail_cache.load, [item_id, *prefetch])
+        item = details.get(item_id)
+        if item is not None and item is not cached:
+            self.show_details(item)
+
+    def show_details(self, item: dict) -> None:
+        """Details aus :func:`inventory.get_item_details` anzeigen."""
+        self.query_one("#no_selection").add_class("hidden")
+        self.query_one("#stock_info").remove_class("hidden")
+
         self.query_one("#item_name").update(f"Name: {item['name']}")
         self.query_one("#item_category").update(f"Kategorie: {item.get('kategorie','-')}")
         self.query_one("#item_status").update(f"Status: {item.get('status','-')}")
         self.query_one("#item_shop").update(f"Shop: {item.get('shop','-') or '-'}")
-        self.query_one("#current_stock").update(f"Aktuell: {info['current_stock']}")
-        self.query_one("#ordered").update(f"Bestellt: {info['ordered_quantity']}")
-        self.query_one("#used").update(f"Verbaut: {info['used_quantity']}")
-        self.query_one("#defect").update(f"Defekt: {info['defect_quantity']}")
+        self.query_one("#current_stock").update(f"Aktuell: {item['current_stock']}")
+        self.query_one("#ordered").update(f"Bestellt: {item['ordered_quantity']}")
+        self.query_one("#used").update(f"Verbaut: {item['used_quantity']}")
+        self.query_one("#defect").update(f"Defekt: {item['defect_quantity']}")
         # Bewegungen komprimiert darstellen (max 5)
         lines = []
-        for m in info.get('movements', [])[:5]:
+        for m in item.get('movements', [])[:5]:
             mt = m.get('movement_type','')
             qty = m.get('quantity','')
             date = (m.get('reference_date') or m.get('movement_date') or '')
@@ -114,8 +132,9 @@ class QuickActions(Static):
 class ItemDialog(ModalScreen):
     """Dialog für Artikel erstellen/bearbeiten."""
     
-    def __init__(self, item: dict | None = None) -> None:
+    def __init__(self, categories: list[dict], item: dict | None = None) -> None:
         super().__init__()
+        self.categories = categories
         self.item = item or {}
     
     BINDINGS = [
@@ -135,11 +154,7 @@ class ItemDialog(ModalScreen):
                 id="name"
             )
             
-            categories = inventory.list_categories()
-            if not categories:
-                inventory.add_category("Standard")
-                categories = inventory.list_categories()
-            
+            categories = self.categories
             cat_options = [(c["name"], str(c["id"])) for c in categories]
             current_cat = str(self.item.get("category_id", "")) if self.item else str(categories[0]["id"])
             yield Select(
@@ -205,10 +220,10 @@ class ItemDialog(ModalScreen):
 class StockDialog(ModalScreen):
     """Dialog für Bestandsbewegungen."""
     
-    def __init__(self, item_id: int) -> None:
+    def __init__(self, item_id: int, item: dict) -> None:
         super().__init__()
         self.item_id = item_id
-        self.item = inventory.get_item(item_id)
+        self.item = item
     
     BINDINGS = [
         Binding("escape", "close_dialog", "Schließen")
@@ -284,6 +299,263 @@ class StockDialog(ModalScreen):
         self.dismiss(None)
 
 
+# Spalten der Artikeltabelle: (Schlüssel, Überschrift)
+TABLE_COLUMNS = (
+    ("id", "ID"),
+    ("name", "Name"),
+    ("kategorie", "Kategorie"),
+    ("current_stock", "Bestand"),
+    ("ordered_quantity", "Bestellt"),
+    ("status", "Status"),
+    ("shop", "Shop"),
+)
+
+
+def _load_items(flt: inventory.ItemFilter | None = None) -> tuple[inventory.ChangeToken, list[dict]]:
+    """Stand der Änderungsprotokolle und alle (gefilterten) Artikel; für den DB-Thread."""
+    token = inventory.change_token()
+    return token, [dict(item) for item in inventory.list_items_with_stock(flt=flt)]
+
+
+def _row_cells(item: dict) -> tuple[str, ...]:
+    """Zellinhalte einer Tabellenzeile in der Reihenfolge von ``TABLE_COLUMNS``."""
+    return (
+        f"{item['id']:06d}",
+        item['name'],
+        item.get('kategorie', 'N/A'),
+        str(item['current_stock']),
+        str(item['ordered_quantity']),
+        item['status'],
+        item.get('shop', '-') or '-',
+    )
+
+
+# Wartezeit nach der letzten Eingabe, bevor gesucht wird (Sekunden)
+SEARCH_DEBOUNCE = 0.25
+
+# Ab dieser Artikelzahl nutzt die TUI die virtualisierte Tabelle; DataTable
+# braucht zum Zeichnen von 2000 Zeilen bereits rund eine halbe Sekunde
+VIRTUAL_THRESHOLD = 2000
+
+# Spaltenbreiten der virtualisierten Tabelle (Reihenfolge wie TABLE_COLUMNS)
+VIRTUAL_WIDTHS = (6, 30, 16, 7, 8, 13, 16)
+
+# Platzhalter für Zeilen, deren Seite noch geladen wird
+LOADING_CELLS = ("…",) + ("",) * (len(TABLE_COLUMNS) - 1)
+
+# Zeilen über und unter dem Cursor, deren Details im Hintergrund vorgeladen werden
+DETAIL_PREFETCH = 10
+
+
+def _warm_pager(flt: inventory.ItemFilter | None = None,
+                item_id: int | None = None) -> tuple[ItemPager, int]:
+    """Neuer Pager mit Anzahl und der Seite um ``item_id`` im Cache.
+
+    Läuft im DB-Thread (siehe :mod:`modules.aio`); Rückgabe: Pager und
+    Position von ``item_id`` (0 ohne ID).
+    """
+    pager = ItemPager(flt=flt)
+    position = pager.position(item_id) if item_id is not None else 0
+    if len(pager):
+        position = min(position, len(pager) - 1)
+        pager.page(position // pager.page_size)
+    return pager, position
+
+
+class VirtualItemTable(ScrollView, can_focus=True):
+    """Artikeltabelle, die nur die sichtbaren Zeilen aus einem :class:`ItemPager` holt.
+
+    Die Tabelle kennt nur die Gesamtzahl der Zeilen; beim Zeichnen werden die
+    sichtbaren Positionen aus dem Seiten-Cache gelesen und die nächste Seite
+    im Hintergrund vorgeladen. Speicherbedarf und Startzeit hängen daher
+    nicht von der Größe des Bestands ab. Fehlt eine Seite (z. B. nach einem
+    Sprung ans Ende), wird ein Platzhalter gezeichnet und die Seite im
+    DB-Thread geladen; die UI fragt die Datenbank nie selbst ab.
+    """
+
+    BINDINGS = [
+        Binding("up", "cursor_up", show=False),
+        Binding("down", "cursor_down", show=False),
+        Binding("pageup", "page_up", show=False),
+        Binding("pagedown", "page_down", show=False),
+        Binding("home", "first", show=False),
+        Binding("end", "last", show=False),
+        Binding("enter", "select", show=False),
+    ]
+
+    COMPONENT_CLASSES = {"virtual-item-table--header", "virtual-item-table--cursor"}
+
+    DEFAULT_CSS = """
+    VirtualItemTable > .virtual-item-table--header {
+        text-style: bold;
+        color: $accent;
+    }
+    VirtualItemTable > .virtual-item-table--cursor {
+        background: $accent;
+        color: $text;
+    }
+    """
+
+    class Selected(Message):
+        """Enter auf einer Zeile."""
+
+        def __init__(self, item_id: int) -> None:
+            super().__init__()
+            self.item_id = item_id
+
+    class Highlighted(Message):
+        """Cursor steht auf einer anderen Zeile (oder einem anderen Pager)."""
+
+        def __init__(self, row: int) -> None:
+            super().__init__()
+            self.row = row
+
+    def __init__(self, pager: ItemPager, **kwargs) -> None:
+        """``pager`` sollte mit :func:`_warm_pager` vorbereitet sein, damit
+        das erste Zeichnen nicht auf die Datenbank wartet."""
+        super().__init__(**kwargs)
+        self.pager = pager
+        self.cursor_row = 0
+        # Seiten, die gerade im DB-Thread geladen werden
+        self._loading: set[int] = set()
+        self._update_size()
+
+    @property
+    def row_count(self) -> int:
+        return len(self.pager)
+
+    def _update_size(self) -> None:
+        width = sum(VIRTUAL_WIDTHS) + len(VIRTUAL_WIDTHS) - 1
+        # Zeile 0 ist die Kopfzeile
+        self.virtual_size = Size(width, len(self.pager) + 1)
+
+    def _line(self, cells, style) -> Strip:
+        text = " ".join(set_cell_size(str(cell), width) for cell, width in zip(cells, VIRTUAL_WIDTHS))
+        return Strip([Segment(text, style)])
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        if y == 0:
+            style = self.get_component_rich_style("virtual-item-table--header")
+            strip = self._line([label for _, label in TABLE_COLUMNS], style)
+        else:
+            position = scroll_y + y - 1
+            if position >= self.row_count:
+                return Strip.blank(width, self.rich_style)
+            style = self.rich_style
+            if position == self.cursor_row:
+                style = self.get_component_rich_style("virtual-item-table--cursor")
+            item = self.pager.peek(position)
+            if item is None:
+                self._request_page(position // self.pager.page_size)
+                strip = self._line(LOADING_CELLS, style)
+            else:
+                strip = self._line(_row_cells(item), style)
+        return strip.crop_extend(scroll_x, scroll_x + width, style)
+
+    def _request_page(self, number: int) -> None:
+        """Seite ``number`` im DB-Thread laden und danach neu zeichnen."""
+        if number not in self._loading:
+            self._loading.add(number)
+            self.run_worker(self._load_page(self.pager, number), group="pages")
+
+    async def _load_page(self, pager: ItemPager, number: int) -> None:
+        try:
+            await aio.run(pager.page, number)
+        except sqlite3.Error:
+            # Platzhalter bleibt; beim nächsten Zeichnen erneut versuchen
+            return
+        finally:
+            if pager is self.pager:
+                self._loading.discard(number)
+        if pager is not self.pager:
+            return
+        self.refresh()
+        if self.cursor_row // pager.page_size == number:
+            # Detailansicht wartet auf die Zeile unter dem Cursor
+            self.post_message(self.Highlighted(self.cursor_row))
+
+    def _prefetch(self) -> None:
+        """Seiten direkt über und unter dem sichtbaren Bereich vorladen."""
+        top = self.scroll_offset.y
+        bottom = top + max(self.size.height - 2, 0)
+        size = self.pager.page_size
+        self.pager.prefetch(bottom // size + 1)
+        if top % size < size // 4:
+            self.pager.prefetch(top // size - 1)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self._prefetch()
+
+    def move_cursor(self, row: int) -> None:
+        """Cursor auf ``row`` setzen und die Zeile sichtbar machen."""
+        old, self.cursor_row = self.cursor_row, max(0, min(row, self.row_count - 1))
+        if self.cursor_row != old:
+            self.post_message(self.Highlighted(self.cursor_row))
+        visible = max(self.size.height - 1, 1)
+        top = self.scroll_offset.y
+        if self.cursor_row < top:
+            self.scroll_to(y=self.cursor_row, animate=False)
+        elif self.cursor_row >= top + visible:
+            self.scroll_to(y=self.cursor_row - visible + 1, animate=False)
+        self.refresh()
+
+    def selected_item_id(self) -> int | None:
+        """ID des Artikels unter dem Cursor oder ``None`` (auch solange
+        seine Seite noch lädt)."""
+        item = self.pager.peek(self.cursor_row)
+        return item["id"] if item else None
+
+    def use_pager(self, pager: ItemPager, cursor_row: int = 0) -> None:
+        """Anderen Pager (z. B. mit neuem Filter) anzeigen."""
+        old, self.pager = self.pager, pager
+        if old is not pager:
+            old.close()
+            self._loading.clear()
+        self._update_size()
+        self.move_cursor(cursor_row)
+        self.post_message(self.Highlighted(self.cursor_row))
+        self._prefetch()
+
+    async def reload(self) -> None:
+        """Daten neu lesen; der Cursor bleibt auf demselben Artikel."""
+        pager, position = await aio.run(_warm_pager, self.pager.flt, self.selected_item_id())
+        self.use_pager(pager, position)
+
+    def action_cursor_up(self) -> None:
+        self.move_cursor(self.cursor_row - 1)
+
+    def action_cursor_down(self) -> None:
+        self.move_cursor(self.cursor_row + 1)
+
+    def action_page_up(self) -> None:
+        self.move_cursor(self.cursor_row - max(self.size.height - 2, 1))
+
+    def action_page_down(self) -> None:
+        self.move_cursor(self.cursor_row + max(self.size.height - 2, 1))
+
+    def action_first(self) -> None:
+        self.move_cursor(0)
+
+    def action_last(self) -> None:
+        self.move_cursor(self.row_count - 1)
+
+    def action_select(self) -> None:
+        item_id = self.selected_item_id()
+        if item_id is not None:
+            self.post_message(self.Selected(item_id))
+
+    def on_click(self, event) -> None:
+        offset = event.get_content_offset(self)
+        if offset is not None and offset.y >= 1:
+            self.move_cursor(self.scroll_offset.y + offset.y - 1)
+
+    def on_unmount(self) -> None:
+        self.pager.close()
+
+
 class InventoryApp(App):
     """Hauptanwendung."""
     
@@ -365,24 +637,45 @@ class InventoryApp(App):
 
     _help_open = False
 
+    # Stand der Änderungsprotokolle beim letzten Laden (siehe sync_table)
+    _change_token = None
+
+    # Aktiver Filter aus Suchfeld und Auswahllisten (siehe apply_filters)
+    _filter = inventory.ItemFilter()
+
+    def __init__(self, virtual: bool | None = None) -> None:
+        """``virtual``: virtualisierte Tabelle erzwingen/abschalten; ``None``
+        wählt sie ab :data:`VIRTUAL_THRESHOLD` Artikeln."""
+        super().__init__()
+        self.virtual = virtual
+
     def compose(self) -> ComposeResult:
         """Compose the main application layout."""
         yield Header()
         yield QuickActions()
-        
-        table = DataTable(id="items")
-        table.add_columns(
-            "ID", "Name", "Kategorie", "Bestand", "Bestellt", "Status", "Shop"
-        )
-        yield table
-        
+        # Die Tabelle folgt in on_mount, sobald die Artikelzahl bekannt ist
         yield StockOverview()
         yield Footer()
 
-    def on_mount(self) -> None:
+    async def on_mount(self) -> None:
         """Initialisierung nach dem Start."""
-        self.refresh_table()
-        self.refresh_categories()
+        if self.virtual is None:
+            self.virtual = await aio.inventory.count_items() >= VIRTUAL_THRESHOLD
+        if self.virtual:
+            self._change_token = await aio.inventory.change_token()
+            pager, _ = await aio.run(_warm_pager)
+            table = VirtualItemTable(pager, id="items")
+        else:
+            table = DataTable(id="items")
+            for key, label in TABLE_COLUMNS:
+                table.add_column(label, key=key)
+        await self.mount(table, before=self.query_one(StockOverview))
+        if not self.virtual:
+            await self.refresh_table()
+        await self.refresh_categories()
+
+    def on_unmount(self) -> None:
+        aio.executor.close()
 
     def action_toggle_help(self) -> None:
         """Zeige/Verberge eine einfache Hilfe-Ansicht."""
@@ -413,36 +706,119 @@ class InventoryApp(App):
         self._help_open = True
         self.push_screen(HelpScreen(), callback=_closed)
 
-    def refresh_table(self) -> None:
-        """Aktualisiere die Artikeltabelle."""
+    def _selected_item_id(self) -> int | None:
+        """ID des Artikels unter dem Cursor oder ``None``."""
+        if self.virtual:
+            return self.query_one(VirtualItemTable).selected_item_id()
         table = self.query_one(DataTable)
-        table.clear()
-        
-        items = inventory.list_items()
-        for row in items:
-            # Convert Row to dict
-            item = dict(zip(row.keys(), row))
-            stock_info = stock.get_item_stock(item["id"])
-            table.add_row(
-                f"{item['id']:06d}",
-                item['name'],
-                item.get('kategorie', 'N/A'),
-                str(stock_info['current_stock']),
-                str(stock_info['ordered_quantity']),
-                item['status'],
-                item.get('shop', '-') or '-',
-            )
-        # Select first row by default to make buttons work without manual selection
+        if not table.row_count or table.cursor_row is None:
+            return None
+        row_key, _ = table.coordinate_to_cell_key(table.cursor_coordinate)
+        return int(row_key.value)
+
+    def _neighbour_ids(self) -> list[int]:
+        """IDs der Zeilen um den Cursor, soweit ohne Datenbankzugriff bekannt."""
+        if self.virtual:
+            table = self.query_one(VirtualItemTable)
+            rows = (table.pager.peek(position) for position in
+                    range(table.cursor_row - DETAIL_PREFETCH, table.cursor_row + DETAIL_PREFETCH + 1))
+            return [row["id"] for row in rows if row is not None]
+        table = self.query_one(DataTable)
+        cursor = table.cursor_row or 0
+        return [
+            int(table.coordinate_to_cell_key(Coordinate(row, 0)).row_key.value)
+            for row in range(max(cursor - DETAIL_PREFETCH, 0), min(cursor + DETAIL_PREFETCH + 1, table.row_count))
+        ]
+
+    @work(exclusive=True, group="details")
+    async def follow_cursor(self) -> None:
+        """Details zum Artikel unter dem Cursor anzeigen und Nachbarn vorladen.
+
+        Bereits geladene Details erscheinen ohne Datenbankzugriff; beim
+        Gedrückthalten der Pfeiltasten bricht jeder Schritt den vorherigen
+        Ladeauftrag ab (``exclusive``).
+        """
         try:
-            table.cursor_type = "row"
-            if table.row_count:
-                table.move_cursor(row=0, column=0)
-        except Exception:
-            pass
+            await self.query_one(StockOverview).update_info(self._selected_item_id(), self._neighbour_ids())
+        except sqlite3.Error as e:
+            self.notify(f"Fehler: {str(e)}", severity="error")
+
+    def on_data_table_row_highlighted(self, event) -> None:
+        """Cursor in der Tabelle bewegt."""
+        self.follow_cursor()
+
+    def on_virtual_item_table_highlighted(self, event: VirtualItemTable.Highlighted) -> None:
+        """Cursor in der virtualisierten Tabelle bewegt."""
+        self.follow_cursor()
+
+    def _restore_cursor(self, item_id: int | None, row: int) -> None:
+        """Cursor wieder auf ``item_id`` setzen, sonst auf die Zeile ``row``."""
+        table = self.query_one(DataTable)
+        if not table.row_count:
+            return
+        if item_id is not None and str(item_id) in table.rows:
+            row = table.get_row_index(str(item_id))
+        row = min(row, table.row_count - 1)
+        # move_cursor sortiert intern alle Zeilen; nur bei Bedarf aufrufen
+        if row != table.cursor_row:
+            table.move_cursor(row=row)
+
+    async def refresh_table(self) -> None:
+        """Artikeltabelle komplett neu laden (Zeilen nach Artikel-ID verschlüsselt)."""
+        if self.virtual:
+            self._change_token = await aio.inventory.change_token()
+            await self.query_one(VirtualItemTable).reload()
+            return
+        table = self.query_one(DataTable)
+        table.cursor_type = "row"
+        # Stand vor dem Laden merken: spätere Änderungen holt sync_table nach
+        self._change_token, items = await aio.run(_load_items, self._filter)
+        selected, row = self._selected_item_id(), table.cursor_row or 0
+        self._fill_table(items)
+        self._restore_cursor(selected, row)
+
+    def _fill_table(self, items: list[dict]) -> None:
+        table = self.query_one(DataTable)
+        table.clear()
+        for item in items:
+            table.add_row(*_row_cells(item), key=str(item['id']))
+
+    async def sync_table(self) -> None:
+        """Nur die seit dem letzten Laden geänderten Zeilen aktualisieren.
+
+        Geänderte Artikel werden zellweise aktualisiert, neue angehängt und
+        gelöschte entfernt; der Cursor bleibt auf demselben Artikel.
+        """
+        changes, self._change_token = await aio.inventory.changes_since(self._change_token, self._filter)
+        if changes is None:
+            await self.refresh_table()
+            return
+        if not changes:
+            return
+        # Detailansicht der geänderten Artikel nicht mehr aus dem Cache zeigen
+        inventory.detail_cache.invalidate(changes)
+        self.follow_cursor()
+        if self.virtual:
+            # Seitengrenzen können sich verschoben haben: neu laden
+            await self.query_one(VirtualItemTable).reload()
+            return
+        table = self.query_one(DataTable)
+        selected, row = self._selected_item_id(), table.cursor_row or 0
+        for item_id, item in sorted(changes.items()):
+            key = str(item_id)
+            if item is None:
+                if key in table.rows:
+                    table.remove_row(key)
+            elif key in table.rows:
+                for (column, _), value in zip(TABLE_COLUMNS, _row_cells(item)):
+                    table.update_cell(key, column, value)
+            else:
+                table.add_row(*_row_cells(item), key=key)
+        self._restore_cursor(selected, row)
 
-    def refresh_categories(self) -> None:
+    async def refresh_categories(self) -> None:
         """Aktualisiere Kategorie-Filter."""
-        categories = inventory.list_categories()
+        categories = await aio.inventory.list_categories()
         cat_select = self.query_one("#category_filter")
         options = [("Alle", "")] + [(c["name"], str(c["id"])) for c in categories]
         try:
@@ -451,20 +827,35 @@ class InventoryApp(App):
         except Exception:
             pass
 
-    def on_data_table_row_selected(self, event) -> None:
+    async def on_data_table_row_selected(self, event) -> None:
         """Reagiere auf Tabellenauswahl."""
-        table = event.control
-        if table.row_count and table.cursor_row is not None:
-            item_id = int(table.get_row_at(table.cursor_row)[0])
-            self.query_one(StockOverview).update_info(item_id)
+        item_id = self._selected_item_id()
+        if item_id is not None:
+            await self.query_one(StockOverview).update_info(item_id)
+
+    async def on_virtual_item_table_selected(self, event: VirtualItemTable.Selected) -> None:
+        """Reagiere auf Auswahl in der virtualisierten Tabelle."""
+        await self.query_one(StockOverview).update_info(event.item_id)
+
+    async def _item_categories(self) -> list[dict]:
+        """Kategorien für den Artikeldialog (legt bei Bedarf "Standard" an)."""
+        categories = await aio.inventory.list_categories()
+        if not categories:
+            await aio.inventory.add_category("Standard")
+            categories = await aio.inventory.list_categories()
+        return categories
 
     async def action_manage_categories(self) -> None:
         """Kategorieverwaltung anzeigen."""
         class CategoryDialog(ModalScreen[str | None]):
+            def __init__(self, cats: list[dict]):
+                super().__init__()
+                self.cats = cats
+
             def compose(self) -> ComposeResult:
                 with Vertical(id="dialog"):
                     yield Label("Kategorien verwalten", classes="heading")
-                    cats = inventory.list_categories()
+                    cats = self.cats
                     options = [(c["name"], str(c["id"])) for c in cats]
                     yield Select(options=options, id="cat_select", prompt="Kategorie auswählen")
                     yield Label("Verknüpfte Artikel:")
@@ -473,56 +864,57 @@ class InventoryApp(App):
                         yield Button("Kategorie löschen", id="delete_category", variant="error")
                         yield Button("Schließen", id="close")
 
-            def on_mount(self) -> None:
+            async def on_mount(self) -> None:
                 sel = self.query_one("#cat_select", Select)
                 # Wenn noch keine Auswahl getroffen wurde, nimm die erste vorhandene Kategorie
-                if sel.value == Select.BLANK:
-                    cats = inventory.list_categories()
+                if sel.is_blank():
+                    cats = self.cats
                     if cats:
                         sel.value = str(cats[0]["id"]) if isinstance(cats[0], dict) else str(cats[0][0])
-                self.refresh_usage()
+                await self.refresh_usage()
 
-            def on_select_changed(self, event: Select.Changed) -> None:
+            async def on_select_changed(self, event: Select.Changed) -> None:
                 if event.select.id == "cat_select":
-                    self.refresh_usage()
+                    await self.refresh_usage()
 
-            def refresh_usage(self) -> None:
+            async def refresh_usage(self) -> None:
                 sel = self.query_one("#cat_select", Select)
                 value = sel.value
                 # Keine Auswahl: Anzeige leeren und Löschen deaktivieren
-                if (value is None) or (value == "") or (value == Select.BLANK):
+                if (value is None) or (value == "") or sel.is_blank():
                     self.query_one("#cat_items", Static).update("-")
                     del_btn = self.query_one("#delete_category", Button)
                     del_btn.disabled = True
                     return
-                items = inventory.get_category_items(int(value))
+                items = await aio.inventory.get_category_items(int(value))
                 lines = [f"- {it['id']:06d} {it['name']}" for it in items[:10]]
                 more = "" if len(items) <= 10 else f"\n(+{len(items)-10} weitere)"
                 self.query_one("#cat_items", Static).update("\n".join(lines) + more if lines else "-")
                 del_btn = self.query_one("#delete_category", Button)
                 del_btn.disabled = len(items) > 0
 
-            def on_button_pressed(self, event: Button.Pressed) -> None:
+            async def on_button_pressed(self, event: Button.Pressed) -> None:
                 if event.button.id == "close":
                     self.dismiss(None)
                 elif event.button.id == "delete_category":
                     sel = self.query_one("#cat_select", Select)
-                    if (sel.value is None) or (sel.value == "") or (sel.value == Select.BLANK):
+                    if (sel.value is None) or (sel.value == "") or sel.is_blank():
                         self.dismiss(None)
                         return
                     try:
-                        inventory.delete_category(int(sel.value))
+                        await aio.inventory.delete_category(int(sel.value))
                         self.dismiss("deleted")
                     except Exception as e:
                         self.app.notify(f"{e}", severity="error")
-                        self.refresh_usage()
+                        await self.refresh_usage()
 
-        def _after(result: str | None):
+        async def _after(result: str | None):
             if result == "deleted":
                 self.notify("Kategorie gelöscht")
-                self.refresh_categories()
+                await self.refresh_categories()
 
-        self.push_screen(CategoryDialog(), callback=_after)
+        cats = await aio.inventory.list_categories()
+        self.push_screen(CategoryDialog(cats), callback=_after)
 
     async def on_button_pressed(self, event: Button.Pressed) -> None:
         """Reagiere auf Buttonklicks."""
@@ -540,61 +932,59 @@ class InventoryApp(App):
 
     async def action_new_item(self) -> None:
         """Neuen Artikel anlegen."""
-        dialog = ItemDialog()
-        def _on_dismiss(result):
+        dialog = ItemDialog(await self._item_categories())
+        async def _on_dismiss(result):
             if result:
                 try:
                     # Neue Kategorie anlegen, falls angegeben
                     new_cat = (result.get("new_category") or "").strip()
                     if new_cat:
-                        cat_id = inventory.add_category(new_cat)
+                        cat_id = await aio.inventory.add_category(new_cat)
                         result["category_id"] = str(cat_id)
                     result.pop("new_category", None)
-                    item_id = inventory.add_item(result)
+                    item_id = await aio.inventory.add_item(result)
                     self.notify(f"Artikel {item_id} angelegt")
-                    self.refresh_table()
+                    await self.sync_table()
                 except Exception as e:
                     self.notify(f"Fehler: {str(e)}", severity="error")
         self.push_screen(dialog, callback=_on_dismiss)
 
     async def action_edit_item(self) -> None:
         """Artikel bearbeiten."""
-        table = self.query_one(DataTable)
-        if not table.row_count or table.cursor_row is None:
+        item_id = self._selected_item_id()
+        if item_id is None:
             self.notify("Kein Artikel ausgewählt", severity="warning")
             return
             
-        item_id = int(table.get_row_at(table.cursor_row)[0])
-        item = inventory.get_item(item_id)
+        item = await aio.inventory.get_item(item_id)
         if not item:
             self.notify("Artikel nicht gefunden", severity="error")
             return
             
-        dialog = ItemDialog(item)
-        def _on_dismiss_edit(result, item_id=item_id):
+        dialog = ItemDialog(await self._item_categories(), item)
+        async def _on_dismiss_edit(result, item_id=item_id):
             if result:
                 try:
                     # Neue Kategorie anlegen, falls angegeben
                     new_cat = (result.get("new_category") or "").strip()
                     if new_cat:
-                        cat_id = inventory.add_category(new_cat)
+                        cat_id = await aio.inventory.add_category(new_cat)
                         result["category_id"] = str(cat_id)
                     result.pop("new_category", None)
-                    inventory.update_item_fields(item_id, result)
+                    await aio.inventory.update_item_fields(item_id, result)
                     self.notify(f"Artikel {item_id} aktualisiert")
-                    self.refresh_table()
+                    await self.sync_table()
                 except Exception as e:
                     self.notify(f"Fehler: {str(e)}", severity="error")
         self.push_screen(dialog, callback=_on_dismiss_edit)
 
     async def action_delete_item(self) -> None:
         """Artikel löschen."""
-        table = self.query_one(DataTable)
-        if not table.row_count or table.cursor_row is None:
+        item_id = self._selected_item_id()
+        if item_id is None:
             self.notify("Kein Artikel ausgewählt", severity="warning")
             return
             
-        item_id = int(table.get_row_at(table.cursor_row)[0])
         # Bestätigungsdialog anzeigen
         class ConfirmDialog(ModalScreen[bool]):
             def __init__(self, message: str):
@@ -613,36 +1003,14 @@ class InventoryApp(App):
                 elif event.button.id == "close":
                     self.dismiss(False)
 
-        def _on_confirm(result: bool | None):
+        async def _on_confirm(result: bool | None):
             if not result:
                 return
             try:
-                inventory.remove_item_by_id(item_id)
-                # Bewegungen aus Bestandsdatenbank entfernen, um ID-Wiederverwendung sauber zu halten
-                try:
-                    stock.delete_movements_for_item(item_id)
-                except Exception:
-                    pass
-                # Nach dem Löschen Sequenz so anpassen, dass gelöschte höchste ID wiederverwendet wird
-                try:
-                    conn = get_connection()
-                    cur = conn.cursor()
-                    cur.execute("SELECT MAX(id) FROM items")
-                    max_id = cur.fetchone()[0]
-                    if max_id is None:
-                        cur.execute("DELETE FROM sqlite_sequence WHERE name='items'")
-                    else:
-                        cur.execute("UPDATE sqlite_sequence SET seq=? WHERE name='items'", (max_id,))
-                    conn.commit()
-                except Exception:
-                    pass
-                finally:
-                    try:
-                        conn.close()
-                    except Exception:
-                        pass
+                # Löscht auch Bewegungen und Saldo (IDs werden wiederverwendet)
+                await aio.inventory.remove_item_by_id(item_id)
                 self.notify(f"Artikel {item_id} gelöscht")
-                self.refresh_table()
+                await self.sync_table()
             except Exception as e:
                 self.notify(f"Fehler: {str(e)}", severity="error")
 
@@ -650,20 +1018,23 @@ class InventoryApp(App):
 
     async def action_stock_movement(self) -> None:
         """Bestandsbewegung hinzufügen."""
-        table = self.query_one(DataTable)
-        if not table.row_count or table.cursor_row is None:
+        item_id = self._selected_item_id()
+        if item_id is None:
             self.notify("Kein Artikel ausgewählt", severity="warning")
             return
             
-        item_id = int(table.get_row_at(table.cursor_row)[0])
-        dialog = StockDialog(item_id)
-        def _on_dismiss_stock(result, item_id=item_id):
+        item = await aio.inventory.get_item(item_id)
+        if not item:
+            self.notify("Artikel nicht gefunden", severity="error")
+            return
+        dialog = StockDialog(item_id, item)
+        async def _on_dismiss_stock(result, item_id=item_id):
             if result:
                 try:
-                    stock.add_movement(**result)
+                    await aio.stock.add_movement(**result)
                     self.notify("Bestandsbewegung hinzugefügt")
-                    self.refresh_table()
-                    self.query_one(StockOverview).update_info(item_id)
+                    # sync_table aktualisiert auch die Detailansicht
+                    await self.sync_table()
                 except Exception as e:
                     self.notify(f"Fehler: {str(e)}", severity="error")
         self.push_screen(dialog, callback=_on_dismiss_stock)
@@ -671,17 +1042,64 @@ class InventoryApp(App):
     def on_input_changed(self, event: Input.Changed) -> None:
         """Handle Sucheingabe."""
         if event.input.id == "search":
-            self.refresh_table()  # TODO: Implement search filter
+            self.apply_filters(self._current_filter())
 
     def on_select_changed(self, event: Select.Changed) -> None:
         """Handle Filter-Änderungen."""
         if event.select.id in ["category_filter", "status_filter"]:
-            self.refresh_table()  # TODO: Implement filters
+            self.apply_filters(self._current_filter())
+
+    def _current_filter(self) -> inventory.ItemFilter:
+        """Filter aus Suchfeld, Kategorie- und Statusauswahl."""
+        category = self.query_one("#category_filter", Select).value
+        status = self.query_one("#status_filter", Select).value
+        return inventory.ItemFilter(
+            text=self.query_one("#search", Input).value,
+            category_id=int(category) if isinstance(category, str) and category else None,
+            status=status if isinstance(status, str) else "",
+        )
+
+    def _load_filtered(self, flt: inventory.ItemFilter):
+        """Gefilterte Daten laden (läuft im DB-Thread, nicht in der UI)."""
+        if self.virtual:
+            # Anzahl und erste Seite schon hier holen, nicht beim Zeichnen
+            return inventory.change_token(), _warm_pager(flt)[0]
+        return _load_items(flt)
+
+    @work(exclusive=True, group="filter")
+    async def apply_filters(self, flt: inventory.ItemFilter) -> None:
+        """Tabelle nach ``flt`` filtern, entprellt und ohne die UI zu blockieren.
+
+        Jeder neue Aufruf bricht den vorherigen ab (``exclusive``): während
+        der Wartezeit kostet das nichts, eine laufende Abfrage wird im
+        DB-Thread abgebrochen (:func:`aio.run_interruptible`).
+        """
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        try:
+            token, result = await aio.run_interruptible(self._load_filtered, flt)
+        except sqlite3.Error as e:
+            self.notify(f"Fehler: {str(e)}", severity="error")
+            return
+        self._filter = flt
+        if self.virtual:
+            self._change_token = token
+            self.query_one(VirtualItemTable).use_pager(result)
+            return
+        table = self.query_one(DataTable)
+        # Gleiche Trefferliste (z. B. beim Weitertippen): nicht neu zeichnen,
+        # aber Änderungen seit dem alten Stand zeilenweise nachholen
+        if [str(item['id']) for item in result] == [key.value for key in table.rows]:
+            await self.sync_table()
+            return
+        self._change_token = token
+        self._fill_table(result)
+        if table.row_count:
+            table.move_cursor(row=0)
 
 
-def main() -> None:
+def main(virtual: bool | None = None) -> None:
     """Start the TUI application."""
-    app = InventoryApp()
+    app = InventoryApp(virtual=virtual)
     app.run()
 
 
@@ -0,0 +1,43 @@
+"""Gemeinsame Test-Konfiguration."""
+
+import os
+import pathlib
+import sys
+import tempfile
+
+import pytest
+
+# Tests arbeiten auf einem temporären Datenverzeichnis statt auf database/
+os.environ.setdefault("WWS_DATA_DIR", tempfile.mkdtemp(prefix="wws-test-"))
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+# Erst nach WWS_DATA_DIR importieren: db legt die Pfade beim Import fest
+from modules import aio, db  # noqa: E402
+
+
+def _reset(init: bool) -> None:
+    aio.executor.close()
+    db.close_connections()
+    for path in (db.DB_FILE, db.STOCK_DB_FILE):
+        if path.exists():
+            os.remove(path)
+    if init:
+        db.init_db()
+
+
+@pytest.fixture
+def empty_db():
+    """Beide Datenbankdateien gelöscht; Verbindungen und DB-Thread geschlossen."""
+    _reset(init=False)
+
+
+@pytest.fixture
+def fresh_db():
+    """Frisch angelegte, leere Datenbanken.
+
+    Liefert eine Funktion, die innerhalb des Tests erneut zurücksetzt (z. B.
+    nach dem Export einer zweiten Datenbank).
+    """
+    _reset(init=True)
+    return lambda: _reset(init=True)
@@ -0,0 +1,104 @@
+"""Tests for the async data access facade used by the TUI."""
+
+import asyncio
+import pathlib
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import aio, db, inventory
+
+
+@pytest.fixture(autouse=True)
+def reset_stats(fresh_db):
+    aio.executor.reset_stats()
+
+
+def test_module_functions_run_in_db_thread():
+    async def scenario():
+        item_id = await aio.inventory.add_item({"name": "ESP32", "status": "bestellt"})
+        await aio.stock.add_movement(item_id, "eingang", 3)
+        info = await aio.stock.get_item_stock(item_id)
+        try:
+            await aio.stock.add_movement(item_id, "unbekannt", 1)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("ValueError erwartet")
+        return item_id, info
+
+    item_id, info = asyncio.run(scenario())
+    assert inventory.get_item(item_id)["name"] == "ESP32"
+    assert info["current_stock"] == 3
+    stats = aio.stats()
+    assert stats["completed"] == 3 and stats["failed"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_locked_database_does_not_block_event_loop():
+    blocker = sqlite3.connect(db.DB_FILE, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        ticks = 0
+
+        async def release():
+            await asyncio.sleep(0.3)
+            blocker.execute("COMMIT")
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        releaser = asyncio.create_task(release())
+        item_id = await aio.inventory.add_item({"name": "BME280", "status": "bestellt"})
+        ticker.cancel()
+        await releaser
+        return item_id, ticks
+
+    item_id, ticks = asyncio.run(scenario())
+    blocker.close()
+    assert inventory.get_item(item_id)["name"] == "BME280"
+    # Die Loop lief weiter, während der Schreibzugriff auf die Sperre wartete
+    assert ticks >= 10
+    assert aio.stats()["wait_ms_max"] + aio.stats()["run_ms_max"] >= 250
+
+
+def test_bounded_queue_and_interrupt():
+    executor = aio.DBExecutor(max_queue=2)
+
+    def slow(value):
+        time.sleep(0.02)
+        return value
+
+    async def scenario():
+        results = await asyncio.gather(*(executor.run(slow, i) for i in range(6)))
+        long_query = asyncio.create_task(executor.run_interruptible(
+            lambda: db.connection().execute(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                "SELECT COUNT(*) FROM n"
+            ).fetchone()
+        ))
+        await asyncio.sleep(0.1)
+        long_query.cancel()
+        started = time.perf_counter()
+        after = await executor.run(slow, "weiter")
+        return results, after, time.perf_counter() - started
+
+    try:
+        results, after, waited = asyncio.run(scenario())
+    finally:
+        executor.close()
+    assert results == list(range(6))
+    assert after == "weiter" and waited < 1
+    stats = executor.stats()
+    assert stats["full_waits"] > 0
+    assert stats["max_queue_depth"] <= 2
+    assert stats["failed"] == 1
@@ -0,0 +1,132 @@
+"""Tests for the online backup of both databases."""
+
+import pathlib
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import backup, db, inventory, stock
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def _add(name, anzahl):
+    item_id = inventory.add_item({"name": name, "kategorie": "Test", "status": "eingetroffen"})
+    stock.add_movement(item_id, "eingang", anzahl)
+    return item_id
+
+
+def _count(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_is_consistent_snapshot_during_writes(tmp_path):
+    for i in range(200):
+        _add(f"Teil {i:03d} " + "x" * 200, 1)
+    calls = []
+
+    def progress(schema, remaining, total):
+        calls.append((schema, remaining))
+        # Parallele Schreibzugriffe blockieren nicht und landen nicht in der Sicherung
+        _add(f"Neu {len(calls)}", 1)
+
+    files = backup.backup(tmp_path / "b.db", pages=1, progress=progress)
+
+    assert {schema for schema, _ in calls} == {"main", "stock"}
+    assert len(calls) > 2
+    assert _count(files["main"], "SELECT COUNT(*) FROM items") == 200
+    assert _count(files["stock"], "SELECT COUNT(*) FROM stock_movements") == 200
+    assert _count(files["stock"], "SELECT SUM(current) FROM stock_balances") == 200
+    assert len(inventory.list_items()) == 200 + len(calls)
+
+
+def test_export_and_import_round_trip(tmp_path):
+    item_id = _add("Widerstand", 7)
+    target = tmp_path / "export.db"
+    db.export_db(str(target))
+    assert backup.stock_backup_path(target).exists()
+
+    inventory.remove_item_by_id(item_id)
+    _add("Kondensator", 2)
+
+    db.import_db(str(target))
+    items = inventory.list_items_with_stock()
+    assert [(row["name"], row["current_stock"]) for row in items] == [("Widerstand", 7)]
+
+
+def test_import_rejects_invalid_file(tmp_path):
+    _add("Diode", 1)
+    bogus = tmp_path / "bogus.db"
+    bogus.write_bytes(b"not a database" * 100)
+    with pytest.raises(ValueError):
+        db.import_db(str(bogus))
+    assert len(inventory.list_items()) == 1
+
+
+def test_incremental_backup_stores_only_changed_pages(tmp_path):
+    for i in range(300):
+        _add(f"Teil {i:03d} " + "x" * 200, 1)
+    first = backup.backup_incremental(tmp_path / "inc")
+    assert first["new_pages"] > 0
+
+    _add("Nachzügler", 4)
+    second = backup.backup_incremental(tmp_path / "inc", compression="lzma")
+    assert 0 < second["new_pages"] < first["new_pages"]
+    assert second["pages"] >= first["pages"]
+    assert backup.list_manifests(tmp_path / "inc") == [first["timestamp"], second["timestamp"]]
+
+    backup.restore_incremental(tmp_path / "inc", at=first["timestamp"], target=tmp_path / "r.db")
+    assert _count(tmp_path / "r.db", "SELECT COUNT(*) FROM items") == 300
+    assert _count(tmp_path / "r_stock.db", "SELECT SUM(current) FROM stock_balances") == 300
+
+    backup.restore_incremental(tmp_path / "inc")
+    assert len(inventory.list_items()) == 301
+    assert stock.verify_balances() == []
+
+
+def test_restore_incremental_without_backup(tmp_path):
+    with pytest.raises(ValueError):
+        backup.restore_incremental(tmp_path / "leer")
+
+
+def test_incremental_backup_reads_live_files_without_snapshot(tmp_path):
+    for i in range(100):
+        _add(f"Teil {i:03d}", 1)
+    calls = []
+
+    def progress(schema, remaining, total):
+        calls.append(schema)
+        # Schreiben während des Lesens landet nicht in der Sicherung
+        _add(f"Neu {len(calls)}", 1)
+
+    result = backup.backup_incremental(tmp_path / "inc", pages=1, progress=progress)
+    assert result["snapshot"] is False
+    assert not list((tmp_path / "inc").glob("tmp*"))
+    assert {"main", "stock"} <= set(calls)
+    backup.restore_incremental(tmp_path / "inc", target=tmp_path / "r.db")
+    assert _count(tmp_path / "r.db", "SELECT COUNT(*) FROM items") == 100
+    assert _count(tmp_path / "r_stock.db", "SELECT SUM(current) FROM stock_balances") == 100
+
+
+def test_incremental_backup_falls_back_to_snapshot_with_old_reader(tmp_path):
+    _add("Widerstand", 3)
+    reader = sqlite3.connect(db.DB_FILE, isolation_level=None)
+    reader.execute("BEGIN")
+    reader.execute("SELECT COUNT(*) FROM items").fetchone()
+    # Der alte Leser verhindert, dass diese Änderung in die Datei übernommen wird
+    _add("Kondensator", 2)
+    try:
+        result = backup.backup_incremental(tmp_path / "inc")
+    finally:
+        reader.close()
+    assert result["snapshot"] is True
+    backup.restore_incremental(tmp_path / "inc", target=tmp_path / "r.db")
+    assert _count(tmp_path / "r.db", "SELECT COUNT(*) FROM items") == 2
@@ -0,0 +1,57 @@
+"""Tests for the managed connection layer."""
+
+import pathlib
+import sys
+import threading
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db
+
+
+def setup_module(module):
+    db.close_connections()
+    db.init_db()
+
+
+def test_connection_is_reused_per_thread():
+    conn = db.connection()
+    assert db.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_close_connections_reopens():
+    conn = db.connection()
+    db.close_connections()
+    assert db.connection() is not conn
+
+
+def test_connection_stats_count_statements():
+    db.connection()
+    db.reset_connection_stats()
+    db.connection().execute("SELECT 1").fetchone()
+    db.connection().execute("SELECT 2").fetchone()
+    stats = db.connection_stats()
+    assert stats["connections"] == 0
+    assert stats["statements"] == 2
+
+
+def test_connection_stats_count_statements_from_all_threads():
+    def run():
+        conn = db.connection()
+        for _ in range(2000):
+            conn.execute("SELECT 1")
+
+    db.reset_connection_stats()
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert db.connection_stats()["statements"] == 8 * 2000
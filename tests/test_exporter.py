@@ -0,0 +1,59 @@
+"""Tests for the streaming CSV/JSONL export."""
+
+import csv
+import json
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import exporter, inventory, stock
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def _add(name, anzahl=0):
+    item_id = inventory.add_item({"name": name, "kategorie": "Test", "status": "eingetroffen"})
+    if anzahl:
+        stock.add_movement(item_id, "eingang", anzahl)
+    return item_id
+
+
+def test_export_joined_csv_includes_stock(tmp_path):
+    first = _add("Widerstand", 10)
+    _add("Kondensator")
+    target = tmp_path / "joined.csv"
+
+    result = exporter.export(str(target), "csv", "joined", fetch_size=1)
+
+    assert result["rows"] == 2
+    with open(target, newline="", encoding="utf-8") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [row["name"] for row in rows] == ["Widerstand", "Kondensator"]
+    assert rows[0]["id"] == str(first)
+    assert rows[0]["current_stock"] == "10"
+    assert rows[1]["current_stock"] == "0"
+
+
+def test_export_movements_jsonl(tmp_path):
+    item_id = _add("Diode", 3)
+    stock.add_movement(item_id, "ausgang", 1)
+    target = tmp_path / "movements.jsonl"
+
+    result = exporter.export(str(target), "jsonl", "movements")
+
+    lines = target.read_text(encoding="utf-8").splitlines()
+    assert result["rows"] == len(lines) == 2
+    records = [json.loads(line) for line in lines]
+    assert [r["movement_type"] for r in records] == ["eingang", "ausgang"]
+    assert records[0]["item_id"] == item_id
+
+
+def test_iter_rows_is_lazy():
+    _add("LED")
+    rows = exporter.iter_rows("items")
+    assert "name" in next(rows)
+    assert next(rows)[1] == "LED"
@@ -6,12 +6,13 @@ import sys
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 
-from modules.db import DB_FILE, init_db, get_connection
+from modules.db import DB_FILE, close_connections, init_db, get_connection
 from modules.inventory import search_items_fts
 
 
 def setup_module(module):
     # Ensure a fresh database for testing
+    close_connections()
     if DB_FILE.exists():
         os.remove(DB_FILE)
     init_db()
@@ -40,3 +41,214 @@ def test_fts_basic_search():
     results = search_items_fts('"Arduino Nano"')
     assert results[0]["name"] == "Arduino Nano"
 
+
+
+def test_fts_stays_in_sync_on_update_and_delete():
+    from modules import fts, inventory
+    from modules.db import connection
+
+    item_id = inventory.add_item({"name": "Raspberry Pico", "kategorie": "MCU"})
+    conn = connection()
+    with conn:
+        conn.execute("UPDATE items SET name = 'Raspberry Zero' WHERE id = ?", (item_id,))
+    assert search_items_fts("Pico") == []
+    assert [r["id"] for r in search_items_fts("Zero")] == [item_id]
+
+    inventory.remove_item_by_id(item_id)
+    assert search_items_fts("Zero") == []
+    assert fts.maintain("integrity-check")["ok"]
+
+
+def test_fts_maintenance_reports_segments():
+    from modules import fts, inventory
+
+    for i in range(5):
+        inventory.remove_item_by_id(inventory.add_item({"name": f"Temp {i}", "kategorie": "MCU"}))
+    before = fts.stats()
+    assert before["segments"] > 1
+
+    result = fts.maintain("optimize")
+    assert result["before"] == before
+    assert result["after"]["segments"] == 1
+    assert fts.maintain("automerge", 8)["ok"]
+    assert len(search_items_fts("ESP32 OR Arduino")) == 2
+
+
+def test_substring_search_uses_trigram_index():
+    from modules import db, inventory
+
+    item_id = inventory.add_item(
+        {"name": "Transistor 2N2222A", "kategorie": "Halbleiter", "shop": "Reichelt"}
+    )
+    assert [r["id"] for r in inventory.search_items_like("n2222")] == [item_id]
+    assert [r["id"] for r in inventory.search_items_like("eichel")] == [item_id]
+    assert any(r["name"] == "ESP32-WROOM" for r in inventory.search_items_like("WROOM"))
+    assert inventory.search_items_like('2N"2') == []
+    # Kurze Begriffe: Tabellensuche
+    assert any(r["id"] == item_id for r in inventory.search_items_like("2N"))
+
+    plan = " ".join(
+        db.query_plan(db.connection(), "SELECT rowid FROM items_trgm WHERE items_trgm MATCH ?", ('"2222"',))
+    )
+    assert "VIRTUAL TABLE INDEX" in plan
+    inventory.remove_item_by_id(item_id)
+    assert inventory.search_items_like("2N2222") == []
+
+
+def test_compile_query_scopes_and_filters():
+    from modules.inventory import compile_query
+
+    query = compile_query('kategorie:"MCU" status:bestellt esp')
+    assert query.match == '(kategorie : "MCU") AND ("esp"*)'
+    assert query.where == ("items.status = ?",)
+    assert query.params == ("bestellt",)
+    assert compile_query("x NOT y").match == '("x"*) NOT ("y"*)'
+    assert compile_query("NOT y").match is None
+    assert compile_query("NOT y").exclude == '"y"*'
+    # Doppelte Verneinung hebt sich auf
+    assert compile_query("NOT NOT esp") == compile_query("esp")
+    assert compile_query("NOT NOT NOT y") == compile_query("NOT y")
+    assert compile_query("x NOT NOT y").match == '("x"*) AND ("y"*)'
+    assert compile_query("NOT NOT status:defekt") == compile_query("status:defekt")
+    assert compile_query('"Arduino Nano').match == '"Arduino Nano"'
+    assert compile_query("foo:bar").match == '"foo:bar"*'
+    assert compile_query("AND (").empty
+    assert compile_query("esp") is compile_query("esp")
+
+
+def test_fts_search_never_raises_on_user_syntax():
+    from modules import inventory
+
+    for text in ['"', "((", ")", "AND", "OR OR", "*", 'name:"', "NOT", "kategorie:(MCU"]:
+        inventory.search_items_fts(text)
+    names = {r["name"] for r in inventory.search_items_fts("kategorie:(MCU")}
+    assert {"ESP32-WROOM", "Arduino Nano"} <= names
+    names = [r["name"] for r in inventory.search_items_fts("kategorie:MCU NOT nano")]
+    assert "Arduino Nano" not in names and "ESP32-WROOM" in names
+    assert all(r["status"] == "bestellt" for r in inventory.search_items_fts("status:bestellt"))
+    assert [r["name"] for r in inventory.search_items_fts("ESP")] == ["ESP32-WROOM"]
+
+
+def test_keyset_pagination_covers_all_hits():
+    from modules import inventory
+
+    ids = [inventory.add_item({"name": f"Widerstand {i} Ohm", "kategorie": "Passiv"}) for i in range(23)]
+    try:
+        assert inventory.count_search("Widerstand") == 23
+        seen, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = inventory.search_page("Widerstand", limit=5, after=cursor)
+            seen.extend(row["id"] for row in rows)
+            pages += 1
+            if cursor is None:
+                break
+        assert pages == 5
+        assert sorted(seen) == sorted(ids)
+        assert [row["id"] for row in inventory.iter_search("Widerstand", page_size=4)] == seen
+
+        # Teilstring-Treffer (keine Volltexttreffer) werden ebenso geblättert
+        assert inventory.count_search("derstan") == 23
+        rows, cursor = inventory.search_page("derstan", limit=20)
+        assert cursor.startswith("s:")
+        rest, cursor = inventory.search_page("derstan", limit=20, after=cursor)
+        assert cursor is None
+        assert [r["id"] for r in rows + rest] == sorted(ids)
+    finally:
+        for item_id in ids:
+            inventory.remove_item_by_id(item_id)
+
+
+def test_search_prefix_uses_prefix_index():
+    from modules import db, inventory
+
+    sql = db.connection().execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'items_fts'"
+    ).fetchone()[0]
+    assert "prefix='2 3 4'" in sql
+
+    assert [r["name"] for r in inventory.search_prefix("es wr")] == ["ESP32-WROOM"]
+    assert {r["name"] for r in inventory.search_prefix("ardu")} == {"Arduino Nano"}
+    assert set(inventory.search_prefix("esp")[0]) == set(inventory.PREFIX_COLUMNS)
+    assert inventory.search_prefix("") == []
+    assert len(inventory.search_prefix("E", limit=1)) == 1
+
+
+def test_search_cache_hits_until_data_changes():
+    from modules import db, inventory
+
+    inventory.search_cache.clear()
+    before = inventory.search_cache_stats()
+    db.reset_connection_stats()
+    for text in ("ESP", "ES", "ESP", "ES", "ESP"):
+        inventory.search_prefix(text)
+    stats = inventory.search_cache_stats()
+    assert stats["misses"] - before["misses"] == 2
+    assert stats["hits"] - before["hits"] == 3
+    # Nur die Versionsabfrage pro Aufruf, keine Suche bei Treffern
+    assert db.connection_stats()["statements"] == 5 + 2
+
+    rows, _ = inventory.search_page("  ESP32 ")
+    rows[0]["name"] = "verändert"
+    assert inventory.search_page("ESP32")[0][0]["name"] == "ESP32-WROOM"
+
+    item_id = inventory.add_item({"name": "ESP8266", "kategorie": "MCU"})
+    try:
+        assert item_id in [r["id"] for r in inventory.search_prefix("ESP")]
+        assert inventory.search_cache_stats()["invalidations"] > stats["invalidations"]
+    finally:
+        inventory.remove_item_by_id(item_id)
+
+
+def test_search_cache_hits_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from modules import db, inventory
+
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        # Die neue Verbindung des Worker-Threads zählt einmal als Änderung
+        worker.submit(db.data_version).result()
+        inventory.search_prefix("ESP")
+        before = inventory.search_cache_stats()
+        worker.submit(inventory.search_prefix, "ESP").result()
+        inventory.search_prefix("ESP")
+        worker.submit(inventory.search_prefix, "ESP").result()
+    stats = inventory.search_cache_stats()
+    assert stats["misses"] == before["misses"]
+    assert stats["hits"] - before["hits"] == 3
+
+
+def test_search_cache_evicts_by_size():
+    from modules.inventory import SearchCache
+
+    cache = SearchCache(max_entries=2, max_rows=5)
+    for key in ("a", "b", "c"):
+        cache.get((key,), lambda: [1], len)
+    assert cache.stats()["entries"] == 2
+    cache.get(("d",), lambda: [1, 2, 3, 4], len)
+    stats = cache.stats()
+    assert stats["rows"] <= 5
+    assert stats["evictions"] >= 2
+    assert cache.get(("d",), lambda: None, len) == [1, 2, 3, 4]
+
+
+def test_structured_fields_inside_or_not_and_groups():
+    from modules import inventory
+
+    inventory.add_item({"name": "Relais 5V", "status": "defekt"})
+    inventory.add_item({"name": "BME280", "status": "verbaut"})
+
+    def names(query):
+        return sorted(row["name"] for row in inventory.search_page(query)[0])
+
+    assert names("esp OR status:defekt") == ["ESP32-WROOM", "Relais 5V"]
+    assert names("status:(defekt OR verbaut)") == ["BME280", "Relais 5V"]
+    assert inventory.count_search("status:(defekt OR verbaut)") == 2
+    assert "Relais 5V" not in names("NOT status:(defekt OR verbaut)")
+    assert names("(esp OR relais) NOT status:defekt") == ["ESP32-WROOM"]
+
+    query = inventory.compile_query("esp OR status:defekt")
+    assert query.match is None
+    assert query.conditions("items_fts", "items.id") == [
+        "(items.id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)) OR (items.status = ?)"
+    ]
+    assert query.params == ('"esp"*', "defekt")
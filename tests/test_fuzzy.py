@@ -0,0 +1,58 @@
+"""Tests for the typo-tolerant item lookup."""
+
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db, fuzzy, inventory
+
+
+@pytest.fixture(autouse=True)
+def items(fresh_db):
+    for name in ("ESP32-WROOM", "Arduino Nano", "Arduino Uno", "DHT22 Sensor", "Widerstand 10k"):
+        inventory.add_item({"name": name, "kategorie": "Test"})
+
+
+def test_levenshtein_with_limit():
+    assert fuzzy.levenshtein("esp23", "esp32", 2) == 2
+    assert fuzzy.levenshtein("kitten", "sitting", 3) == 3
+    assert fuzzy.levenshtein("kitten", "sitting", 1) == 2
+    assert fuzzy.levenshtein("abc", "abcdef", 1) == 2
+
+
+def test_fuzzy_search_ranks_by_distance():
+    assert [r["name"] for r in fuzzy.search("ESP23")] == ["ESP32-WROOM"]
+    assert [r["name"] for r in fuzzy.search("Ardiuno Nan")] == ["Arduino Nano"]
+    results = fuzzy.search("Wiederstand")
+    assert results[0]["name"] == "Widerstand 10k"
+    assert results[0]["distance"] == 1
+    assert fuzzy.search("xyz") == []
+    assert len(fuzzy.search("Ardiuno", limit=1)) == 1
+
+
+def test_index_is_rebuilt_after_changes():
+    index = fuzzy.get_index()
+    assert fuzzy.get_index() is index
+
+    item_id = inventory.add_item({"name": "Raspberry Pico", "kategorie": "Test"})
+    assert [r["id"] for r in fuzzy.search("Rasberry")] == [item_id]
+    assert fuzzy.get_index() is not index
+
+    # Änderungen über eine andere Verbindung (data_version)
+    index = fuzzy.get_index()
+    conn = db.get_connection()
+    conn.execute("UPDATE items SET name = 'Raspberry Zero' WHERE id = ?", (item_id,))
+    conn.commit()
+    conn.close()
+    assert [r["id"] for r in fuzzy.search("Zer0")] == [item_id]
+    assert fuzzy.get_index() is not index
+
+
+def test_repetitive_tokens_are_found():
+    index = fuzzy.FuzzyIndex([(1, "Kabel 2222"), (2, "R 1111 Ohm"), (3, "Modul aaaa")])
+    assert index.search("2223") == [(1, 1)]
+    assert index.search("1112") == [(2, 1)]
+    assert index.search("aaab") == [(3, 1)]
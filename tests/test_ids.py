@@ -0,0 +1,60 @@
+"""Tests for item ID allocation."""
+
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db, ids, inventory
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def _gaps():
+    return [tuple(row) for row in db.connection().execute("SELECT start_id, end_id FROM item_id_gaps")]
+
+
+def test_ids_start_at_base_and_reuse_smallest_gap():
+    created = [inventory.add_item({"name": f"Teil {i}"}) for i in range(4)]
+    assert created == [100000, 100001, 100002, 100003]
+
+    inventory.remove_item_by_id(100002)
+    inventory.remove_item_by_id(100001)
+    assert _gaps() == [(100001, 100001), (100002, 100002)]
+    assert inventory.add_item({"name": "Neu"}) == 100001
+    assert inventory.add_item({"name": "Neu 2"}) == 100002
+    assert inventory.add_item({"name": "Neu 3"}) == 100004
+    assert _gaps() == []
+
+
+def test_reserved_block_is_skipped_and_released_ids_are_reused():
+    inventory.add_item({"name": "Erster"})
+    block = ids.IdBlock(db.connection(), 10)
+    assert block.take() == 100001
+    assert inventory.add_item({"name": "Nach Block"}) == 100011
+
+    block.release()
+    assert _gaps() == [(100002, 100010)]
+    # Ein explizit eingefügter Artikel teilt den Lückenbereich
+    with db.connection() as conn:
+        conn.execute("INSERT INTO items (id, name, kategorie, status) VALUES (100005, 'X', 'Standard', 'bestellt')")
+    assert _gaps() == [(100002, 100004), (100006, 100010)]
+    assert inventory.add_item({"name": "Lücke"}) == 100002
+
+
+def test_migration_records_existing_holes():
+    conn = db.connection()
+    with conn:
+        conn.execute("DROP TABLE item_id_gaps")
+        conn.execute("DROP TRIGGER item_id_gaps_insert")
+        conn.execute("DROP TRIGGER item_id_gaps_delete")
+        conn.executemany(
+            "INSERT INTO items (id, name, kategorie, status) VALUES (?, 'A', 'Standard', 'bestellt')",
+            [(100000,), (100003,), (100004,), (100008,)],
+        )
+        conn.execute("PRAGMA user_version = 7")
+    db.init_db()
+    assert _gaps() == [(100001, 100002), (100005, 100007)]
@@ -0,0 +1,59 @@
+"""Tests for the bulk item importer."""
+
+import json
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db, importer, inventory, stock
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def _triggers():
+    return {
+        row[0]
+        for row in db.connection().execute("SELECT name FROM sqlite_master WHERE type='trigger'")
+    }
+
+
+def test_import_csv_with_errors(tmp_path):
+    source = tmp_path / "items.csv"
+    source.write_text(
+        "name,kategorie,status,anzahl,datum_eingetroffen\n"
+        "ESP32-WROOM,MCU,eingetroffen,5,01.02.2024\n"
+        ",MCU,bestellt,1,\n"
+        "DHT22,Sensor,bestellt,3,\n"
+        "BME280,Sensor,falsch,1,\n",
+        encoding="utf-8",
+    )
+    triggers = _triggers()
+    result = importer.import_items(importer.iter_records(source), batch_size=2)
+
+    assert result["imported"] == 2
+    assert result["movements"] == 2
+    assert [line for line, _ in result["errors"]] == [3, 5]
+    assert _triggers() == triggers
+
+    items = {row["name"]: dict(row) for row in inventory.list_items_with_stock()}
+    assert items["ESP32-WROOM"]["current_stock"] == 5
+    assert items["ESP32-WROOM"]["datum_eingetroffen"] == "2024-02-01"
+    assert items["DHT22"]["ordered_quantity"] == 3
+    assert {c["name"] for c in inventory.list_categories()} == {"MCU", "Sensor"}
+    # Volltextindex wurde nach dem Import neu aufgebaut
+    assert [r["name"] for r in inventory.search_items_fts("DHT22")] == ["DHT22"]
+    assert stock.verify_balances() == []
+
+
+def test_import_jsonl(tmp_path):
+    source = tmp_path / "items.jsonl"
+    lines = [json.dumps({"name": f"Widerstand {i}", "kategorie": "Passiv"}) for i in range(5)]
+    source.write_text("\n".join(lines + ["{kaputt"]) + "\n", encoding="utf-8")
+    result = importer.import_items(importer.iter_records(source))
+    assert result["imported"] == 5
+    assert result["error_count"] == 1
+    assert [r["id"] for r in inventory.list_items()] == list(range(100000, 100005))
@@ -0,0 +1,166 @@
+"""Tests for inventory queries across both databases."""
+
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db, inventory, migrations, stock
+
+
+def test_v7_moves_legacy_movements_into_stock_db(empty_db):
+    conn = db.get_connection()
+    migrations._run_chain(conn, migrations.INVENTORY_MIGRATIONS[:1])
+    conn.executemany(
+        "INSERT INTO items (id, name, kategorie, anzahl, status) VALUES (?, ?, ?, ?, ?)",
+        [(1, "DHT22", "Sensor", 4, "eingetroffen"), (2, "ESP32", "MCU", 2, "eingetroffen")],
+    )
+    conn.commit()
+    migrations._run_chain(conn, migrations.INVENTORY_MIGRATIONS[:6])
+    conn.close()
+    stock.init_db()
+    stock.add_movement(2, "eingang", 10)
+
+    db.init_db()
+
+    tables = {
+        row[0]
+        for row in db.connection().execute("SELECT name FROM main.sqlite_master WHERE type='table'")
+    }
+    assert "stock_movements" not in tables
+    assert stock.get_item_stock(1)["current_stock"] == 4
+    # Artikel 2 hatte bereits Bewegungen in stock.db und wird nicht doppelt gebucht
+    assert stock.get_item_stock(2)["current_stock"] == 10
+
+
+def test_joined_listing_and_reports(fresh_db):
+    first = inventory.add_item({"name": "Arduino Nano", "status": "eingetroffen"})
+    second = inventory.add_item({"name": "BME280", "status": "bestellt"})
+    stock.add_movement(first, "eingang", 8)
+    stock.add_movement(second, "bestellung", 3)
+
+    db.reset_connection_stats()
+    rows = [dict(row) for row in inventory.list_items_with_stock()]
+    assert db.connection_stats()["statements"] == 1
+    assert [(r["id"], r["current_stock"], r["ordered_quantity"]) for r in rows] == [
+        (first, 8, 0),
+        (second, 0, 3),
+    ]
+
+    filtered = inventory.get_items_by_filter(status="eingetroffen")
+    assert [(r["name"], r["current_stock"]) for r in filtered] == [("Arduino Nano", 8)]
+
+    low = inventory.list_low_stock(5)
+    assert [r["name"] for r in low] == ["BME280"]
+
+
+def test_changes_since_returns_only_changed_rows(fresh_db):
+    first = inventory.add_item({"name": "Arduino Nano", "status": "eingetroffen"})
+    second = inventory.add_item({"name": "BME280", "status": "bestellt"})
+    token = inventory.change_token()
+    assert inventory.changes_since(token) == ({}, token)
+    assert inventory.changes_since(None)[0] is None
+
+    inventory.update_item_fields(first, {"name": "Arduino Nano Every"})
+    stock.add_movement(second, "eingang", 2)
+    third = inventory.add_item({"name": "DHT22", "status": "bestellt"})
+    inventory.remove_item_by_id(third)
+    changes, token = inventory.changes_since(token)
+    assert set(changes) == {first, second, third}
+    assert changes[first]["name"] == "Arduino Nano Every"
+    assert changes[second]["current_stock"] == 2
+    assert changes[third] is None
+    assert inventory.changes_since(token) == ({}, token)
+
+    # Neuerer Stand als die Datenbank (z. B. nach einem Import): neu laden
+    assert inventory.changes_since((token[0] + 1, token[1]))[0] is None
+
+
+def test_v7_books_in_v6_seed_rows_of_used_and_broken_items(empty_db):
+    conn = db.get_connection()
+    migrations._run_chain(conn, migrations.INVENTORY_MIGRATIONS[:1])
+    conn.executemany(
+        "INSERT INTO items (id, name, kategorie, anzahl, status) VALUES (?, ?, ?, ?, ?)",
+        [(1, "Relais", "Bauteil", 3, "verbaut"), (2, "LCD", "Anzeige", 2, "defekt"),
+         (3, "ESP32", "MCU", 5, "eingetroffen")],
+    )
+    conn.commit()
+    migrations._run_chain(conn, migrations.INVENTORY_MIGRATIONS[:6])
+    conn.close()
+
+    stock.init_db()
+    db.init_db()
+
+    relais, lcd, esp = (stock.get_item_stock(item_id) for item_id in (1, 2, 3))
+    assert (relais["current_stock"], relais["used_quantity"]) == (0, 3)
+    assert (lcd["current_stock"], lcd["defect_quantity"]) == (0, 2)
+    assert esp["current_stock"] == 5
+    assert [m["movement_type"] for m in relais["movements"]] == ["verbaut", "eingang"]
+    assert stock.verify_balances() == []
+
+def test_item_filter_pushes_search_and_filters_to_sql(fresh_db):
+    mcu = inventory.add_category("MCU")
+    nano = inventory.add_item({"name": "Arduino Nano", "category_id": str(mcu), "status": "eingetroffen"})
+    uno = inventory.add_item({"name": "Arduino Uno", "category_id": str(mcu), "status": "bestellt"})
+    inventory.add_item({"name": "BME280", "status": "bestellt"})
+
+    def ids(flt):
+        return [row["id"] for row in inventory.list_items_with_stock(flt=flt)]
+
+    assert ids(inventory.ItemFilter(text="ardu")) == [nano, uno]
+    assert ids(inventory.ItemFilter(text="ardu", status="bestellt")) == [uno]
+    assert ids(inventory.ItemFilter(category_id=mcu)) == [nano, uno]
+    assert ids(inventory.ItemFilter(text="NOT nano", category_id=mcu)) == [uno]
+    assert inventory.count_items(inventory.ItemFilter(text="ardu")) == 2
+    assert inventory.item_id_at(1, inventory.ItemFilter(text="ardu")) == uno
+
+    # Änderungen außerhalb des Filters erscheinen als entfernt
+    token = inventory.change_token()
+    inventory.update_item_fields(uno, {"status": "eingetroffen"})
+    changes, _ = inventory.changes_since(token, inventory.ItemFilter(status="bestellt"))
+    assert changes == {uno: None}
+
+
+def test_detail_cache_serves_memory_until_data_changes(fresh_db):
+    import threading
+
+    nano = inventory.add_item({"name": "Arduino Nano", "status": "eingetroffen"})
+    uno = inventory.add_item({"name": "Arduino Uno", "status": "bestellt"})
+    for quantity in range(1, 13):
+        stock.add_movement(nano, "eingang", quantity, notes=f"Lieferung {quantity}")
+
+    details = inventory.get_item_details([nano, uno, 999])
+    assert set(details) == {nano, uno}
+    assert details[nano]["current_stock"] == 78
+    assert details[nano]["movements"] == stock.get_item_stock(nano)["movements"]
+    assert details[uno]["movements"] == []
+
+    cache = inventory.DetailCache()
+    assert cache.peek(nano) is None
+    loaded = cache.load([nano, uno])
+    assert cache.peek(uno) is loaded[uno]
+    assert cache.load([nano])[nano] is loaded[nano]
+    assert cache.stats()["loads"] == 1
+
+    # Bewegung über eine andere Verbindung (eigener Thread): Cache ist veraltet
+    thread = threading.Thread(target=stock.add_movement, args=(uno, "eingang", 5))
+    thread.start()
+    thread.join()
+    assert cache.load([uno])[uno]["current_stock"] == 5
+    assert cache.stats()["invalidations"] == 1
+
+    inventory.remove_item_by_id(nano)
+    assert cache.load([nano, uno]).keys() == {uno}
+
+
+def test_removed_item_id_is_reused_without_stock(fresh_db):
+    old = inventory.add_item({"name": "Relais", "status": "eingetroffen"})
+    stock.add_movement(old, "eingang", 7, notes="Altbestand")
+    inventory.remove_item_by_id(old)
+
+    new = inventory.add_item({"name": "Taster", "status": "bestellt"})
+    assert new == old
+    info = stock.get_item_stock(new)
+    assert info["current_stock"] == 0
+    assert info["movements"] == []
+    assert stock.search_movements("altbestand")[0] == []
@@ -0,0 +1,99 @@
+"""Tests for merging another inventory database."""
+
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db, ids, inventory, merge, stock
+
+
+def _add(name, kategorie, anzahl=0):
+    item_id = inventory.add_item({"name": name, "kategorie": kategorie, "status": "eingetroffen"})
+    if anzahl:
+        stock.add_movement(item_id, "eingang", anzahl)
+    return item_id
+
+
+def _other_workshop(tmp_path, reset):
+    """Zweite Datenbank mit eigenen IDs; als Sicherung neben tmp_path abgelegt."""
+    _add("Lötzinn", "Verbrauch", 3)
+    _add("Multimeter", "Werkzeug", 1)
+    inventory.remove_item_by_id(_add("Gelöscht", "Werkzeug"))
+    far = _add("Oszilloskop", "Messgerät", 2)
+    with db.connection() as conn:
+        conn.execute("UPDATE items SET id = 100010 WHERE id = ?", (far,))
+    conn.execute("UPDATE stock.stock_movements SET item_id = 100010 WHERE item_id = ?", (far,))
+    conn.commit()
+    target = tmp_path / "other.db"
+    db.export_db(str(target))
+    reset()
+    return target
+
+
+def test_merge_remaps_conflicts_and_dedupes_categories(tmp_path, fresh_db):
+    source = _other_workshop(tmp_path, fresh_db)
+    inventory.add_category("Werkzeug")
+    own = _add("Widerstand", "Werkzeug", 5)
+
+    result = merge.merge_database(source)
+
+    assert result == {"items": 3, "remapped": 1, "categories": 2, "movements": 3}
+    items = {row["name"]: dict(row) for row in inventory.list_items_with_stock()}
+    assert items["Widerstand"]["id"] == own
+    assert items["Widerstand"]["current_stock"] == 5
+    # 100000 war belegt und wurde neu vergeben, 100010 blieb erhalten
+    assert items["Lötzinn"]["id"] not in (own, 100000)
+    assert items["Lötzinn"]["current_stock"] == 3
+    assert items["Multimeter"]["id"] == 100001
+    assert items["Oszilloskop"]["id"] == 100010
+    assert items["Oszilloskop"]["current_stock"] == 2
+    assert sorted(c["name"] for c in inventory.list_categories()) == [
+        "Messgerät", "Standard", "Verbrauch", "Werkzeug"
+    ]
+    assert items["Lötzinn"]["category_id"] == next(
+        c["id"] for c in inventory.list_categories() if c["name"] == "Verbrauch"
+    )
+    assert stock.verify_balances() == []
+    assert [row["name"] for row in inventory.search_items_fts("Oszilloskop")] == ["Oszilloskop"]
+
+    # Lücke 100002..100009 ist wieder vergebbar
+    with db.connection() as conn:
+        assert ids.next_item_id(conn) == 100002
+
+
+def test_merge_keeps_only_free_ids(tmp_path, fresh_db):
+    for name in ("A", "B", "C", "D"):
+        _add(name, "Werkzeug")
+    source = tmp_path / "other.db"
+    db.export_db(str(source))
+    fresh_db()
+
+    own = _add("Widerstand", "Werkzeug")
+    inventory.remove_item_by_id(_add("Gelöscht", "Werkzeug"))
+    with db.connection() as conn:
+        reserved = ids.reserve_ids(conn, 2)
+    assert (own, list(reserved)) == (100000, [100002, 100003])
+
+    result = merge.merge_database(source)
+
+    assert result["remapped"] == 3
+    items = {row["name"]: row["id"] for row in inventory.list_items()}
+    # 100001 war als Lücke eingetragen, 100002/100003 sind reserviert
+    assert items["B"] == 100001
+    assert sorted((items["A"], items["C"], items["D"])) == [100004, 100005, 100006]
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM item_id_gaps").fetchone()[0] == 0
+        assert ids.next_item_id(conn) == 100007
+
+
+def test_merge_rejects_invalid_source(tmp_path, fresh_db):
+    bogus = tmp_path / "bogus.db"
+    bogus.write_bytes(b"kaputt" * 1000)
+    _add("Widerstand", "Werkzeug")
+    with pytest.raises(ValueError):
+        merge.merge_database(bogus)
+    assert len(inventory.list_items()) == 1
+    assert db.connection().execute("PRAGMA database_list").fetchall()[-1]["name"] == "stock"
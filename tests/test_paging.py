@@ -0,0 +1,81 @@
+"""Tests for the paged item list behind the virtualized TUI table."""
+
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db, inventory, stock
+from modules.paging import ItemPager
+
+
+@pytest.fixture(autouse=True)
+def items(fresh_db):
+    conn = db.connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO items (name, kategorie, anzahl, status) VALUES (?, ?, ?, ?)",
+            [(f"Teil {i}", "K", 1, "bestellt") for i in range(95)],
+        )
+
+
+def test_rows_by_position_with_bounded_cache():
+    pager = ItemPager(page_size=10, max_pages=3)
+    ids = [row["id"] for row in inventory.list_items_with_stock()]
+    assert len(pager) == 95
+    assert [pager.row(i)["id"] for i in range(25)] == ids[:25]
+    # Sprung ans Ende ohne die Seiten dazwischen zu laden
+    assert pager.row(94)["id"] == ids[94]
+    assert pager.row(95) is None
+    assert len(pager.cached_pages()) == 3
+    assert pager.cached_pages()[-1] == 9
+    assert pager.row(50)["id"] == ids[50]
+    assert pager.position(ids[50]) == 50
+
+
+def test_prefetch_and_invalidate():
+    pager = ItemPager(page_size=10, max_pages=4)
+    pager.row(0)
+    pager.prefetch(1)
+    pager.wait()
+    assert 1 in pager.cached_pages()
+    assert pager.stats["prefetched"] == 1
+
+    first = pager.row(0)["id"]
+    stock.add_movement(first, "eingang", 3)
+    inventory.remove_item_by_id(pager.row(1)["id"])
+    pager.invalidate()
+    assert pager.cached_pages() == []
+    assert len(pager) == 94
+    assert pager.row(0)["current_stock"] == 3
+    pager.close()
+
+
+def test_peek_never_loads():
+    pager = ItemPager(page_size=10, max_pages=4)
+    assert pager.peek(0) is None
+    assert pager.stats["loads"] == 0
+    row = pager.row(3)
+    assert pager.peek(3) is row
+    assert pager.peek(10) is None
+    assert pager.stats["loads"] == 1
+    pager.close()
+
+
+def test_jump_counts_from_nearest_anchor():
+    ids = [row["id"] for row in inventory.list_items_with_stock()]
+    # Vom Ende, von einer Seitengrenze vorwärts und rückwärts
+    assert inventory.item_id_at(90, anchor=(len(ids), None)) == ids[90]
+    assert inventory.item_id_at(45, anchor=(39, ids[39])) == ids[45]
+    assert inventory.item_id_at(30, anchor=(39, ids[39])) == ids[30]
+    assert inventory.item_id_at(len(ids), anchor=(len(ids), None)) is None
+
+    pager = ItemPager(page_size=10, max_pages=4)
+    assert pager._anchor(89) == (len(pager), None)
+    pager.row(0)
+    assert pager._anchor(19) == (9, ids[9])
+    assert pager.row(len(pager) - 1)["id"] == ids[-1]
+    assert pager.row(55)["id"] == ids[55]
+    pager.close()
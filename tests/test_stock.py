@@ -0,0 +1,146 @@
+"""Tests for stock aggregation."""
+
+import os
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from modules import db, migrations, stock
+
+
+def setup_module(module):
+    db.close_connections()
+    if stock.DB_FILE.exists():
+        os.remove(stock.DB_FILE)
+    stock.init_db()
+    stock.add_movement(1, "eingang", 10)
+    stock.add_movement(1, "verbaut", 3)
+    stock.add_movement(1, "defekt", 1)
+    stock.add_movement(2, "bestellung", 5)
+
+
+def test_get_stock_for_items_matches_single_lookup():
+    result = stock.get_stock_for_items([1, 2, 3])
+    for item_id in (1, 2):
+        single = stock.get_item_stock(item_id)
+        single.pop("movements")
+        assert result[item_id] == single
+    assert result[3] == stock.EMPTY_STOCK
+    assert result[1]["current_stock"] == 6
+
+
+def test_get_all_stock_single_statement():
+    db.reset_connection_stats()
+    all_stock = stock.get_all_stock()
+    assert db.connection_stats()["statements"] == 1
+    assert set(all_stock) == {1, 2}
+    assert all_stock[2]["ordered_quantity"] == 5
+
+
+def test_balances_follow_movement_changes():
+    conn = db.connection(stock.DB_FILE)
+    movement_id = stock.add_movement(4, "eingang", 7)
+    assert stock.get_item_stock(4)["current_stock"] == 7
+    with conn:
+        conn.execute("UPDATE stock_movements SET quantity = 2 WHERE id = ?", (movement_id,))
+    assert stock.get_item_stock(4)["current_stock"] == 2
+    assert {"item_id": 4, "current_stock": 2} in stock.get_low_stock_items(5)
+    stock.delete_movements_for_item(4)
+    assert 4 not in stock.get_all_stock()
+    assert stock.verify_balances() == []
+
+
+def test_recompute_reports_and_fixes_drift():
+    conn = db.connection(stock.DB_FILE)
+    with conn:
+        conn.execute("UPDATE stock_balances SET current = 99 WHERE item_id = 1")
+        conn.execute("INSERT INTO stock_balances (item_id, current, movement_count) VALUES (42, 1, 1)")
+    drift = stock.recompute_balances()
+    assert [d["item_id"] for d in drift] == [1, 42]
+    assert drift[0]["stored"]["current"] == 99
+    assert drift[0]["ledger"]["current"] == 6
+    assert drift[1]["ledger"] is None
+    assert stock.verify_balances() == []
+    assert stock.get_item_stock(1)["current_stock"] == 6
+
+
+def test_stock_queries_use_indexes():
+    conn = db.connection(stock.DB_FILE)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(migrations.STOCK_MIGRATIONS)
+
+    history = db.query_plan(conn, stock._HISTORY_SQL, (1,))
+    assert any("USING INDEX idx_stock_movements_item_date (item_id=?)" in p for p in history)
+    assert not any("TEMP B-TREE" in p for p in history)
+
+    ledger = db.query_plan(conn, migrations.BALANCE_LEDGER_SQL)
+    assert any("USING COVERING INDEX idx_stock_movements_balance" in p for p in ledger)
+    assert not any("TEMP B-TREE" in p for p in ledger)
+
+    low = db.query_plan(
+        conn, "SELECT item_id FROM stock_balances WHERE current <= ?", (5,)
+    )
+    assert any("SEARCH stock_balances" in p and "idx_stock_balances_current" in p for p in low)
+
+
+def test_add_movements_rejects_rows_without_aborting():
+    db.init_db()
+    conn = db.connection()
+    with conn:
+        item_id = conn.execute(
+            "INSERT INTO items (name, kategorie, anzahl, status) VALUES (?, ?, ?, ?)",
+            ("Kondensator", "Bauteile", 0, "verfügbar"),
+        ).lastrowid
+    unknown = item_id + 1000
+    before = stock.get_item_stock(item_id)["current_stock"]
+    result = stock.add_movements(
+        [
+            {"item_id": item_id, "movement_type": "eingang", "quantity": "4"},
+            {"item_id": item_id, "movement_type": "unbekannt", "quantity": 1},
+            {"item_id": "x", "type": "eingang", "quantity": 1},
+            {"item_id": item_id, "type": "ausgang", "quantity": 1, "reference_date": "31.01.2024"},
+            {"item_id": item_id, "movement_type": "eingang", "quantity": 0},
+            {"item_id": unknown, "movement_type": "eingang", "quantity": 2},
+            {"item_id": item_id, "movement_type": "eingang", "quantity": 1},
+        ],
+        chunk_size=2,
+    )
+    assert result["inserted"] == 3
+    assert result["errors"][-1] == (6, f"Unbekannte Artikel-ID: {unknown}")
+    assert [position for position, _ in result["errors"]] == [2, 3, 5, 6]
+    assert stock.get_item_stock(item_id)["current_stock"] == before + 4
+    assert stock.get_item_stock(item_id)["movements"][0]["reference_date"] in {"", "2024-01-31"}
+    # Keine verwaisten Salden für die unbekannte ID
+    assert stock.get_stock_for_items([unknown])[unknown] == stock.EMPTY_STOCK
+    assert stock.get_item_stock(unknown)["movements"] == []
+
+
+def test_search_movements_ranks_and_pages_notes():
+    db.init_db()
+    conn = db.connection()
+    with conn:
+        item_id = conn.execute(
+            "INSERT INTO items (name, kategorie, anzahl, status) VALUES (?, ?, ?, ?)",
+            ("Lötstation", "Werkzeug", 1, "verfügbar"),
+        ).lastrowid
+    first = stock.add_movement(item_id, "verbaut", 1, notes="Projekt Gewächshaus Sensoren")
+    second = stock.add_movement(item_id, "eingang", 2, notes="Lieferung für Projekt Gewächshaus")
+    stock.add_movement(item_id, "eingang", 1, notes="Lagerauffüllung")
+
+    rows, cursor = stock.search_movements("gewächshaus", limit=1)
+    assert len(rows) == 1 and cursor is not None
+    assert rows[0]["item_name"] == "Lötstation"
+    assert "[" in rows[0]["snippet"]
+    more, cursor = stock.search_movements("gewächshaus", limit=1, after=cursor)
+    assert cursor is None
+    assert {rows[0]["id"], more[0]["id"]} == {first, second}
+    assert stock.count_movement_search("gewächshaus") == 2
+
+    rows, _ = stock.search_movements("projekt typ:verbaut")
+    assert [row["id"] for row in rows] == [first]
+
+    # Trigger halten den Index bei Änderungen aktuell
+    with stock._connection() as stock_conn:
+        stock_conn.execute("UPDATE stock_movements SET notes = 'Garten' WHERE id = ?", (first,))
+    assert stock.count_movement_search("gewächshaus") == 1
+    assert stock.count_movement_search("garten") == 1
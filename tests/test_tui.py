@@ -0,0 +1,36 @@
+"""Tests for the TUI, driven headless through Textual's test pilot."""
+
+import asyncio
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from textual.widgets import DataTable
+
+from modules import inventory, stock, tui
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_reapplied_filter_keeps_changes_to_visible_rows():
+    nano = inventory.add_item({"name": "Arduino Nano", "status": "bestellt"})
+    inventory.add_item({"name": "Arduino Uno", "status": "bestellt"})
+
+    async def scenario():
+        app = tui.InventoryApp(virtual=False)
+        async with app.run_test():
+            await app.apply_filters(inventory.ItemFilter(text="ardu")).wait()
+            # Änderungen außerhalb der TUI, danach gleiche Trefferliste
+            inventory.update_item_fields(nano, {"name": "Arduino Nano Every"})
+            stock.add_movement(nano, "eingang", 4)
+            await app.apply_filters(inventory.ItemFilter(text="arduino")).wait()
+            table = app.query_one(DataTable)
+            return table.get_cell(str(nano), "name"), table.get_cell(str(nano), "current_stock")
+
+    name, current = asyncio.run(scenario())
+    assert name == "Arduino Nano Every"
+    assert str(current) == "4"
@@ -0,0 +1,113 @@
+"""Benchmark: Präfixsuche mit und ohne FTS5-Präfixindex.
+
+Legt in einem temporären Datenverzeichnis ``--items`` Artikel mit
+zufälligen Teilenummern an und misst typische Tastendruck-Abfragen
+(2-5 Zeichen) gegen ``items_fts`` (mit ``prefix='2 3 4'``) und eine
+Vergleichstabelle ohne Präfixindex; "Rang" ist die bisherige, nach Rang
+sortierte Abfrage ohne Präfixindex. ``search_prefix`` wird mit leerem
+Such-Cache gemessen, "Cache" ist ein wiederholter Aufruf (Cache-Treffer).
+
+    python tools/bench_prefix.py [--items 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+QUERIES = ("es", "esp", "esp3", "wid", "kond", "st", "sm", "100", "lm3", "ne55", "a", "x7")
+
+WORDS = (
+    "ESP32 WROOM Arduino Nano Widerstand Kondensator Elko Diode Transistor "
+    "Sensor Stecker Buchse Kabel Platine Relais Schalter Taster LED Display "
+    "Spannungsregler Quarz Spule Sicherung Lüfter Motor Treiber Modul"
+).split()
+
+
+def _part_number(rng: random.Random) -> str:
+    letters = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 3)))
+    digits = "".join(rng.choices(string.digits, k=rng.randint(2, 5)))
+    suffix = "".join(rng.choices(string.ascii_uppercase + string.digits, k=rng.randint(0, 3)))
+    return f"{letters}{digits}{suffix}"
+
+
+def _records(count: int):
+    rng = random.Random(42)
+    for i in range(count):
+        yield i + 2, {
+            "name": f"{rng.choice(WORDS)} {_part_number(rng)} {rng.choice(WORDS)}",
+            "kategorie": rng.choice(WORDS),
+            "shop": rng.choice(("Reichelt", "Mouser", "LCSC", "Conrad", "")),
+            "notiz": _part_number(rng) if rng.random() < 0.3 else "",
+            "status": "eingetroffen",
+        }
+
+
+def _time(conn, sql: str, params: tuple, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["WWS_DATA_DIR"] = tempfile.mkdtemp(prefix="bench_prefix_")
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from modules import db, importer, inventory
+
+    db.init_db()
+    importer.import_items(_records(args.items))
+    conn = db.connection()
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE bench_noprefix USING fts5(
+            name, kategorie, shop, notiz, content='items', content_rowid='id', tokenize='porter'
+        )
+        """
+    )
+    conn.execute("INSERT INTO bench_noprefix(bench_noprefix) VALUES ('rebuild')")
+    conn.commit()
+
+    print(f"{args.items} Artikel, bestes Ergebnis aus {args.repeat} Läufen (ms)")
+    print(f"{'Eingabe':<8} {'Treffer':>8} {'Rang':>8} {'ohne':>8} {'mit':>8} {'search_prefix':>14} {'Cache':>8}")
+    for text in QUERIES:
+        match = inventory.compile_query(text).match
+        hits = conn.execute("SELECT COUNT(*) FROM items_fts WHERE items_fts MATCH ?", (match,)).fetchone()[0]
+        ranked = _time(
+            conn, "SELECT rowid FROM bench_noprefix WHERE bench_noprefix MATCH ? ORDER BY rank LIMIT 20",
+            (match,), args.repeat,
+        )
+        plain = _time(
+            conn, "SELECT rowid FROM bench_noprefix WHERE bench_noprefix MATCH ? ORDER BY rowid LIMIT 20",
+            (match,), args.repeat,
+        )
+        indexed = _time(
+            conn, "SELECT rowid FROM items_fts WHERE items_fts MATCH ? ORDER BY rowid LIMIT 20",
+            (match,), args.repeat,
+        )
+        best = cached = float("inf")
+        for _ in range(args.repeat):
+            # Ohne Leeren wäre jeder Lauf nach dem ersten ein Cache-Treffer
+            inventory.search_cache.clear()
+            start = time.perf_counter()
+            inventory.search_prefix(text)
+            best = min(best, time.perf_counter() - start)
+            start = time.perf_counter()
+            inventory.search_prefix(text)
+            cached = min(cached, time.perf_counter() - start)
+        print(f"{text:<8} {hits:>8} {ranked:>8.2f} {plain:>8.2f} {indexed:>8.2f} {best * 1000:>14.2f} {cached * 1000:>8.2f}")
+    db.close_connections()
+
+
+if __name__ == "__main__":
+    main()